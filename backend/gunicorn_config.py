@@ -7,7 +7,14 @@ backlog = 2048
 
 # Worker processes
 workers = int(os.getenv('WEB_CONCURRENCY', '2'))
-worker_class = "sync"
+# Threaded workers: LLM routes spend most of their time waiting on provider
+# HTTP calls, and a sync worker would be pinned for each one. Threads park on
+# the socket without monkey-patching, which the per-worker asyncio loop
+# (main.run_async) and psycopg2 need. That loop offloads the blocking SDK calls
+# to a pool sized from GUNICORN_THREADS, so concurrent LLM requests overlap
+# rather than queue behind one another. Keep threads within DB_POOL_SIZE + DB_MAX_OVERFLOW.
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.getenv('GUNICORN_THREADS', '16'))
 worker_connections = 1000
 timeout = 30
 keepalive = 2
@@ -242,8 +242,8 @@ class AdministrativeAutomationAgent:
             error_message=None
         )
         
-        # Save to database
-        try:
+        # Save to database off the event loop
+        def _db():
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
             
@@ -263,6 +263,9 @@ class AdministrativeAutomationAgent:
             
             conn.commit()
             conn.close()
+
+        try:
+            await asyncio.to_thread(_db)
             
             # Process task asynchronously
             asyncio.create_task(self._process_automation_task(task_id))
@@ -622,7 +625,7 @@ class AdministrativeAutomationAgent:
     # Helper methods for database operations
     async def _get_employee_data(self, employee_id: str) -> Optional[Dict[str, Any]]:
         """Get employee data from database."""
-        try:
+        def _db():
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
             
@@ -637,14 +640,16 @@ class AdministrativeAutomationAgent:
             
             conn.close()
             return None
-            
+
+        try:
+            return await asyncio.to_thread(_db)
         except Exception as e:
             print(f"Error getting employee data: {str(e)}")
             return None
     
     async def _update_task_status(self, task_id: str, status: AutomationStatus):
         """Update task status in database."""
-        try:
+        def _db():
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
             
@@ -656,13 +661,15 @@ class AdministrativeAutomationAgent:
             
             conn.commit()
             conn.close()
-            
+
+        try:
+            await asyncio.to_thread(_db)
         except Exception as e:
             print(f"Error updating task status: {str(e)}")
     
     async def _get_task(self, task_id: str) -> Optional[Dict[str, Any]]:
         """Get task details from database."""
-        try:
+        def _db():
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
             
@@ -677,14 +684,16 @@ class AdministrativeAutomationAgent:
             
             conn.close()
             return None
-            
+
+        try:
+            return await asyncio.to_thread(_db)
         except Exception as e:
             print(f"Error getting task: {str(e)}")
             return None
     
     async def get_automation_status(self, user_id: str) -> Dict[str, Any]:
         """Get automation status and metrics for a user."""
-        try:
+        def _db():
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
             
@@ -725,7 +734,9 @@ class AdministrativeAutomationAgent:
                 'total_tasks': sum(status_counts.values()),
                 'success_rate': status_counts.get('completed', 0) / max(sum(status_counts.values()), 1) * 100
             }
-            
+
+        try:
+            return await asyncio.to_thread(_db)
         except Exception as e:
             return {'error': str(e)}
 
@@ -0,0 +1,13 @@
+import os
+from flask_caching import Cache
+import redis
+
+# Redis when REDIS_URL is configured, otherwise a per-process cache for local dev
+cache = Cache(config={
+    'CACHE_TYPE': 'RedisCache' if os.getenv('REDIS_URL') else 'SimpleCache',
+    'CACHE_REDIS_URL': os.getenv('REDIS_URL'),
+    'CACHE_DEFAULT_TIMEOUT': 300
+})
+
+# Raw client for counters that don't fit the key/value cache API (None without Redis)
+redis_client = redis.Redis.from_url(os.getenv('REDIS_URL')) if os.getenv('REDIS_URL') else None
@@ -0,0 +1,147 @@
+"""
+Redis mirror of free-trial coin balances.
+
+When REDIS_URL is configured, coin checks on LLM routes decrement
+coins:<user_id> atomically in Redis instead of writing the subscription row
+on every request. Spent coins accumulate in coins_pending:<user_id>:<day> and
+are written back to Subscription.coins_balance by flush_coin_deltas(). Keying
+them by the refresh day they were spent against means a daily refresh makes
+older deltas moot instead of subtracting them from the new balance. Each app
+process runs it every COIN_FLUSH_INTERVAL seconds in a background thread
+(ensure_coin_flusher), and it is also exposed as `flask hr_advisor flush-coins`.
+"""
+
+import os
+import threading
+import time
+from datetime import date
+from src.cache import redis_client
+from src.models.user import db
+from src.models.subscription import Subscription
+
+# Seconds between background write-backs of coins spent through Redis
+COIN_FLUSH_INTERVAL = int(os.getenv('COIN_FLUSH_INTERVAL', '30'))
+
+# Pending deltas outlive their day only long enough for a late flush to see them
+PENDING_COINS_TTL = 2 * 86400
+
+# Held by whichever process is flushing, so deltas are written back once
+FLUSH_LOCK_KEY = 'coins_flush_lock'
+
+_flusher_pid = None
+_flusher_lock = threading.Lock()
+
+def _balance_key(user_id):
+    return f'coins:{user_id}'
+
+def _pending_key(user_id, day):
+    return f'coins_pending:{user_id}:{day}'
+
+def _seed_balance(user_id, db_balance):
+    """
+    Seed a missing coins:<user_id> counter.
+
+    Today's spends still waiting in coins_pending are not in the DB value yet,
+    so they are subtracted; otherwise a lost counter would hand them back.
+    """
+    pending = int(redis_client.get(_pending_key(user_id, date.today().isoformat())) or 0)
+    redis_client.set(_balance_key(user_id), db_balance - pending, nx=True)
+
+def prime_coin_balance(user_id, balance, reset=False):
+    """
+    Mirror a subscription's coin balance into Redis.
+
+    At login the counter is only seeded when missing, since the DB value may
+    lag unflushed spends. reset=True (daily refresh, plan change) overwrites
+    it and drops any pending deltas the new balance supersedes.
+    """
+    if redis_client is None:
+        return
+    if reset:
+        redis_client.set(_balance_key(user_id), balance)
+        redis_client.delete(_pending_key(user_id, date.today().isoformat()))
+    else:
+        _seed_balance(user_id, balance)
+
+def try_spend_coins(user_id, coins_needed, db_balance, day):
+    """
+    Atomically deduct coins in Redis.
+
+    Returns (True, remaining) on success or (False, balance) when the user
+    can't afford it. db_balance seeds the counter if Redis lost the key; day
+    is the subscription's last_coin_refresh the spend is recorded against.
+    """
+    key = _balance_key(user_id)
+    if redis_client.get(key) is None:
+        _seed_balance(user_id, db_balance)
+    remaining = redis_client.decrby(key, coins_needed)
+    if remaining < 0:
+        redis_client.incrby(key, coins_needed)
+        return False, remaining + coins_needed
+    pending_key = _pending_key(user_id, day.isoformat())
+    redis_client.incrby(pending_key, coins_needed)
+    redis_client.expire(pending_key, PENDING_COINS_TTL)
+    return True, remaining
+
+def flush_coin_deltas():
+    """
+    Write coins spent through Redis back to the active subscriptions.
+
+    Pending counters are only decremented once the commit succeeds, so a
+    failed flush leaves them for the next run; a Redis lock keeps the worker
+    processes from applying the same deltas twice. Deltas from a day the
+    subscription has since been refreshed past match no row and are dropped.
+    """
+    if redis_client is None:
+        return 0
+    lock = redis_client.lock(FLUSH_LOCK_KEY, timeout=COIN_FLUSH_INTERVAL * 2)
+    if not lock.acquire(blocking=False):
+        return 0
+    try:
+        return _flush_locked()
+    finally:
+        lock.release()
+
+def _flush_locked():
+    written = []
+    for key in redis_client.scan_iter(_pending_key('*', '*')):
+        _, user_id, day = key.decode().split(':')
+        spent = int(redis_client.get(key) or 0)
+        if not spent:
+            continue
+        matched = Subscription.query.filter_by(
+            user_id=user_id, status='active', last_coin_refresh=date.fromisoformat(day)
+        ).update(
+            {Subscription.coins_balance: Subscription.coins_balance - spent},
+            synchronize_session=False
+        )
+        written.append((key, spent, matched))
+    db.session.commit()
+    for key, spent, matched in written:
+        if matched:
+            redis_client.decrby(key, spent)
+        else:
+            redis_client.delete(key)
+    return sum(1 for _, _, matched in written if matched)
+
+def ensure_coin_flusher(app):
+    """Start this process's background flush loop once (per worker: threads don't survive fork)"""
+    global _flusher_pid
+    if redis_client is None or _flusher_pid == os.getpid():
+        return
+    with _flusher_lock:
+        if _flusher_pid == os.getpid():
+            return
+        _flusher_pid = os.getpid()
+    
+    def run():
+        while True:
+            time.sleep(COIN_FLUSH_INTERVAL)
+            with app.app_context():
+                try:
+                    flush_coin_deltas()
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Coin flush failed: {str(e)}")
+    
+    threading.Thread(target=run, name='coin-flush', daemon=True).start()
@@ -57,6 +57,7 @@ class MultiLLMOrchestrator:
         self.anthropic_client = None
         self.openrouter_client = None
         self.groq_client = None
+        self._http_session = None
         self.setup_clients()
         
     def setup_clients(self):
@@ -91,6 +92,14 @@ class MultiLLMOrchestrator:
         except Exception as e:
             print(f"Error setting up LLM clients: {e}")
 
+    async def _get_http_session(self) -> aiohttp.ClientSession:
+        """Shared aiohttp session so keep-alive connections and DNS lookups are reused"""
+        if self._http_session is None or self._http_session.closed:
+            self._http_session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=100, ttl_dns_cache=300)
+            )
+        return self._http_session
+
     async def get_official_sources(self, query: str, country: str) -> List[SourceReference]:
         """Search for official government and legal sources"""
         sources = []
@@ -143,20 +152,20 @@ class MultiLLMOrchestrator:
             # Using DuckDuckGo instant answer API (free alternative)
             search_url = f"https://api.duckduckgo.com/?q={query}&format=json&no_html=1&skip_disambig=1"
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(search_url) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        
-                        # Extract results from DuckDuckGo response
-                        if 'RelatedTopics' in data:
-                            for topic in data['RelatedTopics'][:limit]:
-                                if isinstance(topic, dict) and 'Text' in topic:
-                                    results.append({
-                                        'title': topic.get('Text', '')[:100],
-                                        'url': topic.get('FirstURL', ''),
-                                        'snippet': topic.get('Text', '')
-                                    })
+            session = await self._get_http_session()
+            async with session.get(search_url) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    
+                    # Extract results from DuckDuckGo response
+                    if 'RelatedTopics' in data:
+                        for topic in data['RelatedTopics'][:limit]:
+                            if isinstance(topic, dict) and 'Text' in topic:
+                                results.append({
+                                    'title': topic.get('Text', '')[:100],
+                                    'url': topic.get('FirstURL', ''),
+                                    'snippet': topic.get('Text', '')
+                                })
                                     
         except Exception as e:
             print(f"Web search error: {e}")
@@ -183,7 +192,8 @@ class MultiLLMOrchestrator:
         
         start_time = time.time()
         try:
-            response = self.openai_client.chat.completions.create(
+            response = await asyncio.to_thread(
+                self.openai_client.chat.completions.create,
                 model=model,
                 messages=[
                     {"role": "system", "content": system_context},
@@ -220,7 +230,7 @@ class MultiLLMOrchestrator:
             model_instance = genai.GenerativeModel(model)
             full_prompt = f"{system_context}\n\nUser Query: {prompt}"
             
-            response = model_instance.generate_content(full_prompt)
+            response = await asyncio.to_thread(model_instance.generate_content, full_prompt)
             response_time = time.time() - start_time
             
             return LLMResponse(
@@ -255,7 +265,8 @@ class MultiLLMOrchestrator:
         
         start_time = time.time()
         try:
-            response = self.anthropic_client.messages.create(
+            response = await asyncio.to_thread(
+                self.anthropic_client.messages.create,
                 model=model,
                 max_tokens=800,
                 system=system_context,
@@ -296,7 +307,8 @@ class MultiLLMOrchestrator:
         
         start_time = time.time()
         try:
-            response = self.openrouter_client.chat.completions.create(
+            response = await asyncio.to_thread(
+                self.openrouter_client.chat.completions.create,
                 model=model,
                 messages=[
                     {"role": "system", "content": system_context},
@@ -346,7 +358,8 @@ class MultiLLMOrchestrator:
         
         start_time = time.time()
         try:
-            response = self.groq_client.chat.completions.create(
+            response = await asyncio.to_thread(
+                self.groq_client.chat.completions.create,
                 model=model,
                 messages=[
                     {"role": "system", "content": system_context},
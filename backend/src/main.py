@@ -1,16 +1,19 @@
-from flask import Flask, request, jsonify, redirect, make_response
+from flask import Flask, request, redirect, make_response
 from flask_sqlalchemy import SQLAlchemy
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
 import uuid
-from datetime import datetime, timedelta
+from datetime import datetime, date, timedelta
 import os
 import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import secrets 
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from urllib.parse import urlparse
+from sqlalchemy.exc import IntegrityError
 import re
 from llm_orchestrator import orchestrator
 from workflow_automation_agent import workflow_agent
@@ -19,15 +22,56 @@ from ai_governance_agent import governance_agent
 from proactive_compliance_agent import compliance_agent
 from predictive_analytics_agent import predictive_agent
 from country_detection import CountryDetector
+from cache import cache
+from responses import ojson, ok, fail
+from pagination import decode_cursor, keyset_page
 
 app = Flask(__name__)
 app.config["SECRET_KEY"] = "your-secret-key"
 app.config["JWT_SECRET_KEY"] = "jwt-secret-string"
-app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///hr_advisor.db"
+# Symmetric HMAC signing: verifying a token on every @jwt_required() call is a
+# single SHA-256 HMAC, so there's nothing worth caching (unlike RS256)
+app.config["JWT_ALGORITHM"] = "HS256"
+app.config["SQLALCHEMY_DATABASE_URI"] = os.getenv("SQLALCHEMY_DATABASE_URI", "sqlite:///hr_advisor.db")
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
+# Reuse connections per worker for server databases (Postgres, usually via
+# PgBouncer on :6432); SQLite keeps SQLAlchemy's default file pool
+if not app.config["SQLALCHEMY_DATABASE_URI"].startswith("sqlite"):
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "20")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "40")),
+        "pool_pre_ping": True,
+        "pool_recycle": 1800
+    }
+
+# Flask 3 ignores the old JSON_SORT_KEYS/JSONIFY_PRETTYPRINT_REGULAR keys;
+# configure the JSON provider directly for anything still going through it
+app.json.sort_keys = False
+app.json.compact = True
+
 db = SQLAlchemy(app)
 jwt = JWTManager(app)
+cache.init_app(app)
+
+# One event loop per worker process, started on first use (threads don't
+# survive gunicorn's preload fork). Keeping it alive lets agents reuse
+# loop-bound resources such as aiohttp sessions across requests. Agents must
+# not block it: sync SDK and sqlite3 calls go through asyncio.to_thread, whose
+# pool is sized so every gunicorn thread can have a call in flight.
+ASYNC_OFFLOAD_WORKERS = int(os.getenv('GUNICORN_THREADS', '16')) * 2
+_async_loop = None
+_async_loop_lock = threading.Lock()
+
+def run_async(coro):
+    """Run an agent coroutine on the worker's shared event loop and wait for the result."""
+    global _async_loop
+    with _async_loop_lock:
+        if _async_loop is None:
+            _async_loop = asyncio.new_event_loop()
+            _async_loop.set_default_executor(ThreadPoolExecutor(max_workers=ASYNC_OFFLOAD_WORKERS))
+            threading.Thread(target=_async_loop.run_forever, daemon=True).start()
+    return asyncio.run_coroutine_threadsafe(coro, _async_loop).result()
 
 # Automatic CORS handler that works with ANY Vercel deployment URL
 @app.after_request
@@ -146,12 +190,12 @@ class User(db.Model):
             'email': self.email,
             'first_name': self.first_name,
             'email_verified': self.email_verified,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'created_at': self.created_at,
             'coins': self.coins,
             'country_context': self.country_context,
             'subscription_plan': self.subscription_plan.to_dict() if self.subscription_plan else None,
-            'subscription_start_date': self.subscription_start_date.isoformat() if self.subscription_start_date else None,
-            'subscription_end_date': self.subscription_end_date.isoformat() if self.subscription_end_date else None
+            'subscription_start_date': self.subscription_start_date,
+            'subscription_end_date': self.subscription_end_date
         }
 
 class PromptHistory(db.Model):
@@ -173,10 +217,13 @@ class PromptHistory(db.Model):
             'response_text': self.response_text,
             'country_context': self.country_context,
             'coins_consumed': self.coins_consumed,
-            'timestamp': self.timestamp.isoformat() if self.timestamp else None,
+            'timestamp': self.timestamp,
             'prompt_type': self.prompt_type
         }
 
+# Serves the per-user "latest N prompts" history reads in index order
+db.Index('ix_prompt_history_user_time', PromptHistory.user_id, PromptHistory.timestamp.desc())
+
 class Employee(db.Model):
     __tablename__ = 'employee'
     employee_id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
@@ -250,23 +297,23 @@ class Employee(db.Model):
             'location': self.location,
             'employment_type': self.employment_type,
             'work_arrangement': self.work_arrangement,
-            'hire_date': self.hire_date.isoformat() if self.hire_date else None,
-            'termination_date': self.termination_date.isoformat() if self.termination_date else None,
+            'hire_date': self.hire_date,
+            'termination_date': self.termination_date,
             'status': self.status,
             'termination_type': self.termination_type,
             'termination_reason': self.termination_reason,
             'salary': self.salary,
             'currency': self.currency,
-            'date_of_birth': self.date_of_birth.isoformat() if self.date_of_birth else None,
+            'date_of_birth': self.date_of_birth,
             'gender': self.gender,
             'age': self.age,
             'ethnicity': self.ethnicity,
             'nationality': self.nationality,
             'marital_status': self.marital_status,
             'engagement_score': self.engagement_score,
-            'last_engagement_survey': self.last_engagement_survey.isoformat() if self.last_engagement_survey else None,
+            'last_engagement_survey': self.last_engagement_survey,
             'performance_rating': self.performance_rating,
-            'last_performance_review': self.last_performance_review.isoformat() if self.last_performance_review else None,
+            'last_performance_review': self.last_performance_review,
             'total_leave_days': self.total_leave_days,
             'sick_leave_taken': self.sick_leave_taken,
             'vacation_leave_taken': self.vacation_leave_taken,
@@ -274,10 +321,13 @@ class Employee(db.Model):
             'emergency_contact_name': self.emergency_contact_name,
             'emergency_contact_phone': self.emergency_contact_phone,
             'emergency_contact_relationship': self.emergency_contact_relationship,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
         }
 
+# Per-user employee listing walks this index in employee_id order (keyset pages and the count)
+db.Index('ix_employee_user_id', Employee.user_id, Employee.employee_id)
+
 # Initialize database on startup
 init_database()
 
@@ -326,7 +376,7 @@ def health():
             user_count = User.query.count()
             plan_count = SubscriptionPlan.query.count()
             
-        return jsonify({
+        return ojson({
             'status': 'healthy', 
             'message': 'HR Advisor API is running',
             'database': 'connected',
@@ -334,7 +384,7 @@ def health():
             'subscription_plans': plan_count
         })
     except Exception as e:
-        return jsonify({
+        return ojson({
             'status': 'unhealthy',
             'message': 'HR Advisor API is running but database has issues',
             'database': 'error',
@@ -346,14 +396,14 @@ def test_hr_advisor():
     """Test endpoint to debug HR advisor issues"""
     try:
         data = request.get_json()
-        return jsonify({
+        return ojson({
             'status': 'success',
             'message': 'HR advisor test endpoint working',
             'received_data': data,
             'method': request.method
         })
     except Exception as e:
-        return jsonify({
+        return ojson({
             'status': 'error',
             'message': f'Test endpoint error: {str(e)}'
         }), 500
@@ -367,7 +417,7 @@ def test_hr_advisor_auth():
         user = User.query.get(user_id)
         data = request.get_json()
         
-        return jsonify({
+        return ojson({
             'status': 'success',
             'message': 'HR advisor authenticated test endpoint working',
             'user_id': user_id,
@@ -376,7 +426,7 @@ def test_hr_advisor_auth():
             'method': request.method
         })
     except Exception as e:
-        return jsonify({
+        return ojson({
             'status': 'error',
             'message': f'Authenticated test endpoint error: {str(e)}'
         }), 500
@@ -387,11 +437,7 @@ def register():
         data = request.get_json()
         
         if not data or not data.get('email') or not data.get('password'):
-            return jsonify({'error': 'Missing required fields'}), 400
-        
-        # Check if user already exists by email
-        if User.query.filter_by(email=data['email']).first():
-            return jsonify({'error': 'Email already exists'}), 400
+            return ojson({'error': 'Missing required fields'}), 400
         
         # Generate verification token
         verification_token = secrets.token_urlsafe(32)
@@ -409,8 +455,15 @@ def register():
             verification_sent_at=datetime.utcnow()
         )
         
-        db.session.add(user)
-        db.session.commit()
+        # The unique email column rejects duplicates (concurrent signups included) in the INSERT itself
+        try:
+            db.session.add(user)
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            if db.session.scalar(db.select(db.exists().where(User.email == data['email']))):
+                return ojson({'error': 'Email already exists'}), 400
+            raise
         
         # Send verification email (DISABLED for POC - TODO: Re-enable for production)
         # try:
@@ -419,7 +472,7 @@ def register():
         #     print(f"Failed to send verification email: {str(e)}")
         #     # Don't fail registration if email fails
         
-        return jsonify({
+        return ojson({
             'message': 'Registration successful! Your account is ready to use.',
             'email_sent': False,  # Disabled for POC
             'user_id': user.user_id
@@ -427,7 +480,7 @@ def register():
         
     except Exception as e:
         db.session.rollback()
-        return jsonify({'error': f'Registration failed: {str(e)}'}), 500
+        return ojson({'error': f'Registration failed: {str(e)}'}), 500
 
 def send_verification_email(email, token, frontend_url=None):
     """Send verification email to user"""
@@ -636,15 +689,15 @@ def resend_verification():
         data = request.get_json()
         
         if not data or not data.get('email'):
-            return jsonify({'error': 'Email is required'}), 400
+            return ojson({'error': 'Email is required'}), 400
         
         user = User.query.filter_by(email=data['email']).first()
         
         if not user:
-            return jsonify({'error': 'User not found'}), 404
+            return ojson({'error': 'User not found'}), 404
         
         if user.email_verified:
-            return jsonify({'error': 'Email already verified'}), 400
+            return ojson({'error': 'Email already verified'}), 400
         
         # Generate new verification token
         verification_token = secrets.token_urlsafe(32)
@@ -660,15 +713,15 @@ def resend_verification():
             send_verification_email(user.email, verification_token, frontend_url)
         except Exception as e:
             print(f"Failed to send verification email: {str(e)}")
-            return jsonify({'error': 'Failed to send verification email'}), 500
+            return ojson({'error': 'Failed to send verification email'}), 500
         
-        return jsonify({
+        return ojson({
             'message': 'Verification email sent! Please check your inbox.',
             'email_sent': True
         }), 200
         
     except Exception as e:
-        return jsonify({'error': f'Failed to resend verification: {str(e)}'}), 500
+        return ojson({'error': f'Failed to resend verification: {str(e)}'}), 500
 
 @app.route('/api/auth/forgot-password', methods=['POST'])
 def forgot_password():
@@ -676,13 +729,13 @@ def forgot_password():
         data = request.get_json()
         
         if not data or not data.get('email'):
-            return jsonify({'error': 'Email is required'}), 400
+            return ojson({'error': 'Email is required'}), 400
         
         user = User.query.filter_by(email=data['email']).first()
         
         # Always return success message for security (don't reveal if email exists)
         if not user:
-            return jsonify({
+            return ojson({
                 'message': 'If an account with that email exists, a password reset link has been sent.',
                 'email_sent': True
             }), 200
@@ -700,13 +753,13 @@ def forgot_password():
             print(f"Failed to send password reset email: {str(e)}")
             # Don't reveal email sending failure for security
         
-        return jsonify({
+        return ojson({
             'message': 'If an account with that email exists, a password reset link has been sent.',
             'email_sent': True
         }), 200
         
     except Exception as e:
-        return jsonify({'error': f'Password reset request failed: {str(e)}'}), 500
+        return ojson({'error': f'Password reset request failed: {str(e)}'}), 500
 
 @app.route('/api/auth/reset-password', methods=['POST'])
 def reset_password():
@@ -714,20 +767,20 @@ def reset_password():
         data = request.get_json()
         
         if not data or not data.get('token') or not data.get('password'):
-            return jsonify({'error': 'Token and new password are required'}), 400
+            return ojson({'error': 'Token and new password are required'}), 400
         
         user = User.query.filter_by(reset_token=data['token']).first()
         
         if not user:
-            return jsonify({'error': 'Invalid or expired reset token'}), 400
+            return ojson({'error': 'Invalid or expired reset token'}), 400
         
         # Check if token is expired
         if not user.reset_token_expires or datetime.utcnow() > user.reset_token_expires:
-            return jsonify({'error': 'Reset token has expired'}), 400
+            return ojson({'error': 'Reset token has expired'}), 400
         
         # Validate password strength
         if len(data['password']) < 6:
-            return jsonify({'error': 'Password must be at least 6 characters long'}), 400
+            return ojson({'error': 'Password must be at least 6 characters long'}), 400
         
         # Update password and clear reset token
         user.password_hash = generate_password_hash(data['password'])
@@ -735,13 +788,13 @@ def reset_password():
         user.reset_token_expires = None
         db.session.commit()
         
-        return jsonify({
+        return ojson({
             'message': 'Password reset successful! You can now log in with your new password.',
             'success': True
         }), 200
         
     except Exception as e:
-        return jsonify({'error': f'Password reset failed: {str(e)}'}), 500
+        return ojson({'error': f'Password reset failed: {str(e)}'}), 500
 
 @app.route('/api/auth/validate-reset-token/<token>', methods=['GET'])
 def validate_reset_token(token):
@@ -749,19 +802,19 @@ def validate_reset_token(token):
         user = User.query.filter_by(reset_token=token).first()
         
         if not user:
-            return jsonify({'valid': False, 'error': 'Invalid reset token'}), 400
+            return ojson({'valid': False, 'error': 'Invalid reset token'}), 400
         
         # Check if token is expired
         if not user.reset_token_expires or datetime.utcnow() > user.reset_token_expires:
-            return jsonify({'valid': False, 'error': 'Reset token has expired'}), 400
+            return ojson({'valid': False, 'error': 'Reset token has expired'}), 400
         
-        return jsonify({
+        return ojson({
             'valid': True,
             'email': user.email  # Show email for confirmation
         }), 200
         
     except Exception as e:
-        return jsonify({'valid': False, 'error': f'Token validation failed: {str(e)}'}), 500
+        return ojson({'valid': False, 'error': f'Token validation failed: {str(e)}'}), 500
 
 @app.route('/api/auth/login', methods=['POST'])
 def login():
@@ -769,30 +822,30 @@ def login():
         data = request.get_json()
         
         if not data or not data.get('email') or not data.get('password'):
-            return jsonify({'error': 'Missing email or password'}), 400
+            return ojson({'error': 'Missing email or password'}), 400
         
         user = User.query.filter_by(email=data['email']).first()
         
         if user and check_password_hash(user.password_hash, data['password']):
             # Check if email is verified
             if not user.email_verified:
-                return jsonify({
+                return ojson({
                     'error': 'Please verify your email address before logging in',
                     'email_verified': False,
                     'user_id': user.user_id
                 }), 403
             
             access_token = create_access_token(identity=user.user_id)
-            return jsonify({
+            return ojson({
                 'message': 'Login successful',
                 'access_token': access_token,
                 'user': user.to_dict()
             })
         else:
-            return jsonify({'error': 'Invalid credentials'}), 401
+            return ojson({'error': 'Invalid credentials'}), 401
             
     except Exception as e:
-        return jsonify({'error': f'Login failed: {str(e)}'}), 500
+        return ojson({'error': f'Login failed: {str(e)}'}), 500
 
 @app.route('/api/auth/google', methods=['POST'])
 def google_auth():
@@ -800,7 +853,7 @@ def google_auth():
         data = request.get_json()
         
         if not data or not data.get('google_id') or not data.get('email'):
-            return jsonify({'error': 'Missing Google authentication data'}), 400
+            return ojson({'error': 'Missing Google authentication data'}), 400
         
         google_id = data['google_id']
         email = data['email']
@@ -817,7 +870,7 @@ def google_auth():
                 db.session.commit()
             
             access_token = create_access_token(identity=user.user_id)
-            return jsonify({
+            return ojson({
                 'message': 'Login successful',
                 'access_token': access_token,
                 'user': user.to_dict()
@@ -836,7 +889,7 @@ def google_auth():
             # Create access token
             access_token = create_access_token(identity=user.user_id)
             
-            return jsonify({
+            return ojson({
                 'message': 'User created successfully',
                 'access_token': access_token,
                 'user': user.to_dict()
@@ -844,7 +897,7 @@ def google_auth():
             
     except Exception as e:
         db.session.rollback()
-        return jsonify({'error': f'Google authentication failed: {str(e)}'}), 500
+        return ojson({'error': f'Google authentication failed: {str(e)}'}), 500
 
 @app.route('/api/user/profile', methods=['GET'])
 @jwt_required()
@@ -854,12 +907,12 @@ def get_profile():
         user = User.query.get(user_id)
         
         if not user:
-            return jsonify({'error': 'User not found'}), 404
+            return ojson({'error': 'User not found'}), 404
         
-        return jsonify({'user': user.to_dict()})
+        return ojson({'user': user.to_dict()})
         
     except Exception as e:
-        return jsonify({'error': f'Failed to get profile: {str(e)}'}), 500
+        return ojson({'error': f'Failed to get profile: {str(e)}'}), 500
 
 @app.route('/api/hr_advisor/query', methods=['POST'])
 @jwt_required()
@@ -869,13 +922,13 @@ def hr_advisor_query():
         user = User.query.get(user_id)
         
         if not user:
-            return jsonify({'error': 'User not found'}), 404
+            return ojson({'error': 'User not found'}), 404
         
         data = request.get_json()
         query = data.get('query', '')
         
         if not query:
-            return jsonify({'error': 'Query is required'}), 400
+            return ojson({'error': 'Query is required'}), 400
         
            # Enhanced country detection using the new CountryDetector
         country_detector = CountryDetector()
@@ -886,7 +939,7 @@ detected_country, confidence, metadata = country_detector.detect_country_from_qu
             clarification_response = country_detector.generate_clarification_response(
                 query, detected_country, confidence, metadata
             )
-            return jsonify({
+            return ojson({
                 'response': clarification_response,
                 'country_context': 'clarification_needed',
                 'coins_consumed': 0,
@@ -902,7 +955,7 @@ detected_country, confidence, metadata = country_detector.detect_country_from_qu
         
         # Check if user has enough coins
         if user.coins < 1:
-            return jsonify({'error': 'Insufficient coins'}), 402
+            return ojson({'error': 'Insufficient coins'}), 402
         
         # Multi-LLM Orchestration for HR advice
         try:
@@ -927,24 +980,17 @@ detected_country, confidence, metadata = country_detector.detect_country_from_qu
             system_context = f"You are an expert HR advisor specializing in {context}. Provide practical, actionable advice that complies with local regulations and best practices. Always cite relevant laws and regulations."
             
             # Use Multi-LLM Orchestration
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
+            orchestration_result = run_async(
+                orchestrator.orchestrate_llm_responses(query, country, system_context)
+            )
             
-            try:
-                orchestration_result = loop.run_until_complete(
-                    orchestrator.orchestrate_llm_responses(query, country, system_context)
-                )
-                
-                response_text = orchestration_result['content']
-                metadata = {
-                    'provider_used': orchestration_result['provider_used'],
-                    'confidence_score': orchestration_result['confidence_score'],
-                    'sources': orchestration_result['sources'],
-                    'llm_responses_count': orchestration_result['llm_responses_count']
-                }
-                
-            finally:
-                loop.close()
+            response_text = orchestration_result['content']
+            metadata = {
+                'provider_used': orchestration_result['provider_used'],
+                'confidence_score': orchestration_result['confidence_score'],
+                'sources': orchestration_result['sources'],
+                'llm_responses_count': orchestration_result['llm_responses_count']
+            }
             
         except Exception as e:
             # Improved fallback with country-specific HR information
@@ -1016,7 +1062,7 @@ detected_country, confidence, metadata = country_detector.detect_country_from_qu
         db.session.add(prompt_history)
         db.session.commit()
         
-        return jsonify({
+        return ojson({
             'response': response_text,
             'country_context': country,
             'coins_consumed': 1,
@@ -1027,7 +1073,7 @@ detected_country, confidence, metadata = country_detector.detect_country_from_qu
         
     except Exception as e:
         db.session.rollback()
-        return jsonify({'error': f'Query failed: {str(e)}'}), 500
+        return ojson({'error': f'Query failed: {str(e)}'}), 500
 
 @app.route('/api/hr_advisor/chat', methods=['POST'])
 @jwt_required()
@@ -1037,18 +1083,18 @@ def hr_advisor_chat():
         user = User.query.get(user_id)
         
         if not user:
-            return jsonify({'error': 'User not found'}), 404
+            return ojson({'error': 'User not found'}), 404
         
         data = request.get_json()
         prompt = data.get('prompt', '')
         country = data.get('country', user.country_context)
         
         if not prompt:
-            return jsonify({'error': 'Prompt is required'}), 400
+            return ojson({'error': 'Prompt is required'}), 400
         
         # Check if user has enough coins
         if user.coins < 1:
-            return jsonify({'error': 'Insufficient coins'}), 402
+            return ojson({'error': 'Insufficient coins'}), 402
         
         # Multi-LLM Orchestration for HR template generation
         try:
@@ -1073,24 +1119,17 @@ def hr_advisor_chat():
             system_context = f"You are an expert HR advisor specializing in {context}. Generate professional HR templates and documents that comply with local regulations and best practices. Always include relevant legal disclaimers and cite applicable laws."
             
             # Use Multi-LLM Orchestration
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
+            orchestration_result = run_async(
+                orchestrator.orchestrate_llm_responses(prompt, country, system_context)
+            )
             
-            try:
-                orchestration_result = loop.run_until_complete(
-                    orchestrator.orchestrate_llm_responses(prompt, country, system_context)
-                )
-                
-                response_text = orchestration_result['content']
-                metadata = {
-                    'provider_used': orchestration_result['provider_used'],
-                    'confidence_score': orchestration_result['confidence_score'],
-                    'sources': orchestration_result['sources'],
-                    'llm_responses_count': orchestration_result['llm_responses_count']
-                }
-                
-            finally:
-                loop.close()
+            response_text = orchestration_result['content']
+            metadata = {
+                'provider_used': orchestration_result['provider_used'],
+                'confidence_score': orchestration_result['confidence_score'],
+                'sources': orchestration_result['sources'],
+                'llm_responses_count': orchestration_result['llm_responses_count']
+            }
             
         except Exception as e:
             # Fallback to basic response if orchestration fails
@@ -1117,7 +1156,7 @@ def hr_advisor_chat():
         db.session.add(prompt_history)
         db.session.commit()
         
-        return jsonify({
+        return ojson({
             'response': response_text,
             'coins_remaining': user.coins,
             'prompt_id': prompt_history.prompt_id,
@@ -1126,7 +1165,7 @@ def hr_advisor_chat():
         
     except Exception as e:
         db.session.rollback()
-        return jsonify({'error': f'Chat failed: {str(e)}'}), 500
+        return ojson({'error': f'Chat failed: {str(e)}'}), 500
 
 @app.route('/api/subscriptions', methods=['GET'])
 @jwt_required()
@@ -1136,7 +1175,7 @@ def get_subscriptions():
         user = User.query.get(user_id)
         
         if not user:
-            return jsonify({'error': 'User not found'}), 404
+            return ojson({'error': 'User not found'}), 404
         
         # Get the user's current subscription plan
         subscription_plan = user.subscription_plan
@@ -1151,18 +1190,18 @@ def get_subscriptions():
                 subscription_plan = free_plan
             else:
                 # Fallback if even the Free plan isn't initialized (shouldn't happen if __main__ block runs)
-                return jsonify({'error': 'Subscription plans not initialized'}), 500
+                return ojson({'error': 'Subscription plans not initialized'}), 500
 
-        return jsonify({
+        return ojson({
             'plan_type': subscription_plan.name.lower().replace(' ', '_'),
             'coins_balance': user.coins,
             'total_coins_allocated': subscription_plan.coin_allocation,
             'features': subscription_plan.features.split(',') if subscription_plan.features else [],
-            'expires_at': user.subscription_end_date.isoformat() if user.subscription_end_date else None
+            'expires_at': user.subscription_end_date
         })
         
     except Exception as e:
-        return jsonify({'error': f'Failed to get subscription: {str(e)}'}), 500
+        return ojson({'error': f'Failed to get subscription: {str(e)}'}), 500
 
 @app.route('/api/history/prompts/recent', methods=['GET'])
 @jwt_required()
@@ -1171,12 +1210,12 @@ def get_recent_prompts():
         user_id = get_jwt_identity()
         history = PromptHistory.query.filter_by(user_id=user_id).order_by(PromptHistory.timestamp.desc()).limit(10).all()
         
-        return jsonify({
+        return ojson({
             'recent_prompts': [h.to_dict() for h in history]
         })
         
     except Exception as e:
-        return jsonify({'error': f'Failed to get recent prompts: {str(e)}'}), 500
+        return ojson({'error': f'Failed to get recent prompts: {str(e)}'}), 500
 
 @app.route('/api/history', methods=['GET'])
 @jwt_required()
@@ -1185,12 +1224,12 @@ def get_history():
         user_id = get_jwt_identity()
         history = PromptHistory.query.filter_by(user_id=user_id).order_by(PromptHistory.timestamp.desc()).limit(50).all()
         
-        return jsonify({
+        return ojson({
             'history': [h.to_dict() for h in history]
         })
         
     except Exception as e:
-        return jsonify({'error': f'Failed to get history: {str(e)}'}), 500
+        return ojson({'error': f'Failed to get history: {str(e)}'}), 500
 
 @app.route('/api/subscriptions/upgrade', methods=['POST'])
 @jwt_required()
@@ -1200,22 +1239,22 @@ def upgrade_subscription():
         user = User.query.get(user_id)
         
         if not user:
-            return jsonify({'error': 'User not found'}), 404
+            return ojson({'error': 'User not found'}), 404
         
         data = request.get_json()
         plan_name = data.get('plan_name')
         
         if not plan_name:
-            return jsonify({'error': 'Plan name is required'}), 400
+            return ojson({'error': 'Plan name is required'}), 400
             
         new_plan = SubscriptionPlan.query.filter_by(name=plan_name).first()
         
         if not new_plan:
-            return jsonify({'error': 'Invalid plan name'}), 400
+            return ojson({'error': 'Invalid plan name'}), 400
             
         # Prevent downgrading or upgrading to the same plan for simplicity
         if user.subscription_plan_id == new_plan.id:
-            return jsonify({'message': f'Already on {plan_name} plan'}), 200
+            return ojson({'message': f'Already on {plan_name} plan'}), 200
             
         # Update user's subscription
         user.subscription_plan_id = new_plan.id
@@ -1225,7 +1264,7 @@ def upgrade_subscription():
         
         db.session.commit()
         
-        return jsonify({
+        return ojson({
             'message': f'Successfully upgraded to {plan_name} plan',
             'new_plan': new_plan.to_dict(),
             'coins_remaining': user.coins
@@ -1233,7 +1272,7 @@ def upgrade_subscription():
         
     except Exception as e:
         db.session.rollback()
-        return jsonify({'error': f'Upgrade failed: {str(e)}'}), 500
+        return ojson({'error': f'Upgrade failed: {str(e)}'}), 500
 
 @app.route('/api/employees', methods=['GET'])
 @jwt_required()
@@ -1241,27 +1280,30 @@ def get_employees():
     try:
         user_id = get_jwt_identity()
         
-        # Get pagination parameters
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 50, type=int)
+        per_page = max(request.args.get('per_page', 50, type=int), 1)
+        after = request.args.get('after')
         
-        # Get all employees for this user
+        # Keyset pagination on employee_id: an index range scan instead of an OFFSET skip
         employees_query = Employee.query.filter_by(user_id=user_id)
-        employees = employees_query.paginate(
-            page=page, 
-            per_page=per_page, 
-            error_out=False
-        )
-        
-        return jsonify({
-            'employees': [emp.to_dict() for emp in employees.items],
-            'total': employees.total,
-            'pages': employees.pages,
-            'current_page': page
+        if after:
+            employees_query = employees_query.filter(Employee.employee_id > decode_cursor(after)[0])
+        rows = employees_query.order_by(Employee.employee_id).limit(per_page + 1).all()
+        employees, next_cursor = keyset_page(rows, per_page, lambda emp: (emp.employee_id,))
+        
+        # The dashboard reads the headcount from 'total'
+        total = db.session.scalar(db.select(db.func.count()).where(Employee.user_id == user_id))
+        
+        return ojson({
+            'employees': [emp.to_dict() for emp in employees],
+            'total': total,
+            'next_cursor': next_cursor,
+            'per_page': per_page
         })
         
+    except ValueError as e:
+        return ojson({'error': str(e)}), 400
     except Exception as e:
-        return jsonify({'error': f'Failed to get employees: {str(e)}'}), 500
+        return ojson({'error': f'Failed to get employees: {str(e)}'}), 500
 
 @app.route('/api/employees', methods=['POST'])
 @jwt_required()
@@ -1271,7 +1313,7 @@ def add_employee():
         data = request.get_json()
         
         if not data or not data.get('name') or not data.get('email'):
-            return jsonify({'error': 'Name and email are required'}), 400
+            return ojson({'error': 'Name and email are required'}), 400
         
         # Check if employee with this email already exists for this user
         existing_employee = Employee.query.filter_by(
@@ -1280,7 +1322,7 @@ def add_employee():
         ).first()
         
         if existing_employee:
-            return jsonify({'error': 'Employee with this email already exists'}), 400
+            return ojson({'error': 'Employee with this email already exists'}), 400
         
         # Create new employee
         employee = Employee(
@@ -1291,7 +1333,7 @@ def add_employee():
             position=data.get('position'),
             department=data.get('department'),
             country=data.get('country', 'US'),
-            hire_date=datetime.strptime(data['hire_date'], '%Y-%m-%d').date() if data.get('hire_date') else None,
+            hire_date=date.fromisoformat(data['hire_date']) if data.get('hire_date') else None,
             salary=float(data['salary']) if data.get('salary') else None,
             status=data.get('status', 'active'),
             address=data.get('address'),
@@ -1299,7 +1341,7 @@ def add_employee():
             emergency_contact_phone=data.get('emergency_contact_phone'),
             emergency_contact_relationship=data.get('emergency_contact_relationship'),
             # Demographic fields
-            date_of_birth=datetime.strptime(data['date_of_birth'], '%Y-%m-%d').date() if data.get('date_of_birth') else None,
+            date_of_birth=date.fromisoformat(data['date_of_birth']) if data.get('date_of_birth') else None,
             gender=data.get('gender'),
             ethnicity=data.get('ethnicity'),
             nationality=data.get('nationality'),
@@ -1309,16 +1351,16 @@ def add_employee():
         db.session.add(employee)
         db.session.commit()
         
-        return jsonify({
+        return ojson({
             'message': 'Employee added successfully',
             'employee': employee.to_dict()
         }), 201
         
     except ValueError as e:
-        return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+        return ojson({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
     except Exception as e:
         db.session.rollback()
-        return jsonify({'error': f'Failed to add employee: {str(e)}'}), 500
+        return ojson({'error': f'Failed to add employee: {str(e)}'}), 500
 
 @app.route('/api/employees/<employee_id>', methods=['GET'])
 @jwt_required()
@@ -1332,12 +1374,12 @@ def get_employee(employee_id):
         ).first()
         
         if not employee:
-            return jsonify({'error': 'Employee not found'}), 404
+            return ojson({'error': 'Employee not found'}), 404
         
-        return jsonify({'employee': employee.to_dict()})
+        return ojson({'employee': employee.to_dict()})
         
     except Exception as e:
-        return jsonify({'error': f'Failed to get employee: {str(e)}'}), 500
+        return ojson({'error': f'Failed to get employee: {str(e)}'}), 500
 
 @app.route('/api/employees/<employee_id>', methods=['PUT'])
 @jwt_required()
@@ -1352,7 +1394,7 @@ def update_employee(employee_id):
         ).first()
         
         if not employee:
-            return jsonify({'error': 'Employee not found'}), 404
+            return ojson({'error': 'Employee not found'}), 404
         
         # Check if email is being changed and if it conflicts
         if data.get('email') and data['email'] != employee.email:
@@ -1362,7 +1404,7 @@ def update_employee(employee_id):
             ).first()
             
             if existing_employee:
-                return jsonify({'error': 'Employee with this email already exists'}), 400
+                return ojson({'error': 'Employee with this email already exists'}), 400
         
         # Update employee fields
         if data.get('name'):
@@ -1378,7 +1420,7 @@ def update_employee(employee_id):
         if 'country' in data:
             employee.country = data['country']
         if data.get('hire_date'):
-            employee.hire_date = datetime.strptime(data['hire_date'], '%Y-%m-%d').date()
+            employee.hire_date = date.fromisoformat(data['hire_date'])
         if 'salary' in data:
             employee.salary = float(data['salary']) if data['salary'] else None
         if 'status' in data:
@@ -1394,7 +1436,7 @@ def update_employee(employee_id):
         
         # Update demographic fields
         if 'date_of_birth' in data and data['date_of_birth']:
-            employee.date_of_birth = datetime.strptime(data['date_of_birth'], '%Y-%m-%d').date()
+            employee.date_of_birth = date.fromisoformat(data['date_of_birth'])
         if 'gender' in data:
             employee.gender = data['gender']
         if 'ethnicity' in data:
@@ -1405,17 +1447,18 @@ def update_employee(employee_id):
             employee.marital_status = data['marital_status']
         
         db.session.commit()
+        development_agent.invalidate_employee(employee_id)
         
-        return jsonify({
+        return ojson({
             'message': 'Employee updated successfully',
             'employee': employee.to_dict()
         })
         
     except ValueError as e:
-        return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+        return ojson({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
     except Exception as e:
         db.session.rollback()
-        return jsonify({'error': f'Failed to update employee: {str(e)}'}), 500
+        return ojson({'error': f'Failed to update employee: {str(e)}'}), 500
 
 @app.route('/api/employees/<employee_id>', methods=['DELETE'])
 @jwt_required()
@@ -1429,21 +1472,22 @@ def delete_employee(employee_id):
         ).first()
         
         if not employee:
-            return jsonify({'error': 'Employee not found'}), 404
+            return ojson({'error': 'Employee not found'}), 404
         
         db.session.delete(employee)
         db.session.commit()
+        development_agent.invalidate_employee(employee_id)
         
-        return jsonify({'message': 'Employee deleted successfully'})
+        return ojson({'message': 'Employee deleted successfully'})
         
     except Exception as e:
         db.session.rollback()
-        return jsonify({'error': f'Failed to delete employee: {str(e)}'}), 500
+        return ojson({'error': f'Failed to delete employee: {str(e)}'}), 500
 
 # Protected main route for staging access
 @app.route("/")
 def index():
-    return jsonify({
+    return ojson({
         'message': 'HR Advisor API - Staging Environment',
         'status': 'protected',
         'credentials': 'Use hr_admin / hr_staging_2024 for access'
@@ -1474,6 +1518,13 @@ from personalized_development_agent import PersonalizedDevelopmentAgent
 admin_automation_agent = AdministrativeAutomationAgent()
 development_agent = PersonalizedDevelopmentAgent()
 
+def refresh_development_analytics(employee_id):
+    """Recompute an employee's development analytics and store them in the cache."""
+    analytics = run_async(development_agent.get_development_analytics(employee_id))
+    if 'error' not in analytics:
+        cache.set(f'devanalytics:{employee_id}', analytics, timeout=86400)
+    return analytics
+
 # Administrative Automation API Endpoints
 @app.route('/api/automation/create-task', methods=['POST'])
 @jwt_required()
@@ -1489,7 +1540,7 @@ def create_automation_task():
         priority = data.get('priority', 'medium')
         
         # Create automation task
-        task_id = asyncio.run(admin_automation_agent.create_automation_task(
+        task_id = run_async(admin_automation_agent.create_automation_task(
             task_type=task_type,
             user_id=current_user,
             parameters=parameters,
@@ -1498,22 +1549,16 @@ def create_automation_task():
         ))
         
         if task_id:
-            return jsonify({
+            return ojson({
                 'success': True,
                 'task_id': task_id,
                 'message': f'Automation task created successfully'
             })
         else:
-            return jsonify({
-                'success': False,
-                'message': 'Failed to create automation task'
-            }), 500
+            return fail('Failed to create automation task')
             
     except Exception as e:
-        return jsonify({
-            'success': False,
-            'message': f'Error creating automation task: {str(e)}'
-        }), 500
+        return fail(f'Error creating automation task: {str(e)}')
 
 @app.route('/api/automation/status', methods=['GET'])
 @jwt_required()
@@ -1522,18 +1567,12 @@ def get_automation_status():
     try:
         current_user = get_jwt_identity()
         
-        status = asyncio.run(admin_automation_agent.get_automation_status(current_user))
+        status = run_async(admin_automation_agent.get_automation_status(current_user))
         
-        return jsonify({
-            'success': True,
-            'data': status
-        })
+        return ok(status)
         
     except Exception as e:
-        return jsonify({
-            'success': False,
-            'message': f'Error getting automation status: {str(e)}'
-        }), 500
+        return fail(f'Error getting automation status: {str(e)}')
 
 @app.route('/api/automation/generate-contract', methods=['POST'])
 @jwt_required()
@@ -1553,7 +1592,7 @@ def generate_employment_contract():
         }
         
         # Create contract generation task
-        task_id = asyncio.run(admin_automation_agent.create_automation_task(
+        task_id = run_async(admin_automation_agent.create_automation_task(
             task_type='generate_contract',
             user_id=current_user,
             parameters=contract_params,
@@ -1561,17 +1600,14 @@ def generate_employment_contract():
             priority=admin_automation_agent.Priority.HIGH
         ))
         
-        return jsonify({
+        return ojson({
             'success': True,
             'task_id': task_id,
             'message': 'Contract generation started'
         })
         
     except Exception as e:
-        return jsonify({
-            'success': False,
-            'message': f'Error generating contract: {str(e)}'
-        }), 500
+        return fail(f'Error generating contract: {str(e)}')
 
 @app.route('/api/automation/generate-offer', methods=['POST'])
 @jwt_required()
@@ -1591,24 +1627,21 @@ def generate_offer_letter():
         }
         
         # Create offer letter generation task
-        task_id = asyncio.run(admin_automation_agent.create_automation_task(
+        task_id = run_async(admin_automation_agent.create_automation_task(
             task_type='generate_offer_letter',
             user_id=current_user,
             parameters=offer_params,
             priority=admin_automation_agent.Priority.HIGH
         ))
         
-        return jsonify({
+        return ojson({
             'success': True,
             'task_id': task_id,
             'message': 'Offer letter generation started'
         })
         
     except Exception as e:
-        return jsonify({
-            'success': False,
-            'message': f'Error generating offer letter: {str(e)}'
-        }), 500
+        return fail(f'Error generating offer letter: {str(e)}')
 
 # Personalized Development API Endpoints
 @app.route('/api/development/analyze-skills', methods=['POST'])
@@ -1620,21 +1653,15 @@ def analyze_skill_gaps():
         employee_id = data.get('employee_id')
         target_role = data.get('target_role')
         
-        analysis = asyncio.run(development_agent.analyze_skill_gaps(
+        analysis = run_async(development_agent.analyze_skill_gaps(
             employee_id=employee_id,
             target_role=target_role
         ))
         
-        return jsonify({
-            'success': True,
-            'data': analysis
-        })
+        return ok(analysis)
         
     except Exception as e:
-        return jsonify({
-            'success': False,
-            'message': f'Error analyzing skill gaps: {str(e)}'
-        }), 500
+        return fail(f'Error analyzing skill gaps: {str(e)}')
 
 @app.route('/api/development/create-plan', methods=['POST'])
 @jwt_required()
@@ -1648,7 +1675,7 @@ def create_development_plan():
         goals = data.get('goals', [])
         timeline_months = data.get('timeline_months', 12)
         
-        plan_id = asyncio.run(development_agent.generate_development_plan(
+        plan_id = run_async(development_agent.generate_development_plan(
             employee_id=employee_id,
             created_by=current_user,
             goals=goals,
@@ -1656,56 +1683,33 @@ def create_development_plan():
         ))
         
         if plan_id:
-            return jsonify({
+            refresh_development_analytics(employee_id)
+            return ojson({
                 'success': True,
                 'plan_id': plan_id,
                 'message': 'Development plan created successfully'
             })
         else:
-            return jsonify({
-                'success': False,
-                'message': 'Failed to create development plan'
-            }), 500
+            return fail('Failed to create development plan')
             
     except Exception as e:
-        return jsonify({
-            'success': False,
-            'message': f'Error creating development plan: {str(e)}'
-        }), 500
+        return fail(f'Error creating development plan: {str(e)}')
 
 @app.route('/api/development/recommendations/<employee_id>', methods=['GET'])
 @jwt_required()
 def get_learning_recommendations(employee_id):
     """Get learning recommendations for an employee."""
     try:
-        # First analyze skill gaps
-        gap_analysis = asyncio.run(development_agent.analyze_skill_gaps(employee_id))
-        
-        if 'error' in gap_analysis:
-            return jsonify({
-                'success': False,
-                'message': gap_analysis['error']
-            }), 404
+        # Skill gaps + recommendations for the top 5 gaps in a single agent round-trip
+        result = run_async(development_agent.get_learning_recommendations(employee_id, top_n=5))
         
-        # Generate recommendations
-        recommendations = asyncio.run(development_agent.generate_learning_recommendations(
-            employee_id=employee_id,
-            skill_gaps=gap_analysis.get('skill_gaps', [])[:5]  # Top 5 gaps
-        ))
+        if 'error' in result:
+            return fail(result['error'], 404)
         
-        return jsonify({
-            'success': True,
-            'data': {
-                'skill_gaps': gap_analysis.get('skill_gaps', []),
-                'recommendations': recommendations
-            }
-        })
+        return ok(result)
         
     except Exception as e:
-        return jsonify({
-            'success': False,
-            'message': f'Error getting learning recommendations: {str(e)}'
-        }), 500
+        return fail(f'Error getting learning recommendations: {str(e)}')
 
 @app.route('/api/development/progress', methods=['POST'])
 @jwt_required()
@@ -1719,7 +1723,7 @@ def update_learning_progress():
         progress_percentage = data.get('progress_percentage', 0)
         status = data.get('status', 'in_progress')
         
-        success = asyncio.run(development_agent.track_learning_progress(
+        success = run_async(development_agent.track_learning_progress(
             employee_id=employee_id,
             recommendation_id=recommendation_id,
             progress_percentage=progress_percentage,
@@ -1727,39 +1731,29 @@ def update_learning_progress():
         ))
         
         if success:
-            return jsonify({
+            refresh_development_analytics(employee_id)
+            return ojson({
                 'success': True,
                 'message': 'Learning progress updated successfully'
             })
         else:
-            return jsonify({
-                'success': False,
-                'message': 'Failed to update learning progress'
-            }), 500
+            return fail('Failed to update learning progress')
             
     except Exception as e:
-        return jsonify({
-            'success': False,
-            'message': f'Error updating learning progress: {str(e)}'
-        }), 500
+        return fail(f'Error updating learning progress: {str(e)}')
 
 @app.route('/api/development/analytics/<employee_id>', methods=['GET'])
 @jwt_required()
 def get_development_analytics(employee_id):
     """Get development analytics for an employee."""
     try:
-        analytics = asyncio.run(development_agent.get_development_analytics(employee_id))
+        # Precomputed on every progress/plan write; only compute here on a cold cache
+        analytics = cache.get(f'devanalytics:{employee_id}') or refresh_development_analytics(employee_id)
         
-        return jsonify({
-            'success': True,
-            'data': analytics
-        })
+        return ok(analytics)
         
     except Exception as e:
-        return jsonify({
-            'success': False,
-            'message': f'Error getting development analytics: {str(e)}'
-        }), 500
+        return fail(f'Error getting development analytics: {str(e)}')
 
 # Enhanced AI Governance Endpoints
 @app.route('/api/governance/approval-workflow', methods=['POST'])
@@ -1772,47 +1766,40 @@ def create_ai_approval_workflow():
         
         # This would integrate with the enhanced AI governance agent
         # For now, return a placeholder response
-        return jsonify({
+        return ojson({
             'success': True,
             'message': 'AI approval workflow created',
             'workflow_id': str(uuid.uuid4())
         })
         
     except Exception as e:
-        return jsonify({
-            'success': False,
-            'message': f'Error creating approval workflow: {str(e)}'
-        }), 500
+        return fail(f'Error creating approval workflow: {str(e)}')
+
+@cache.memoize(timeout=60)
+def load_usage_metrics(user_id):
+    """AI usage metrics for a user's governance dashboard (cached per user for 60s)"""
+    # This would integrate with the enhanced AI governance agent
+    # For now, return placeholder metrics
+    return {
+        'total_ai_requests': 1250,
+        'approval_rate': 94.5,
+        'average_response_time': 1.2,
+        'top_use_cases': [
+            {'name': 'HR Policy Queries', 'count': 450},
+            {'name': 'Employee Evaluations', 'count': 320},
+            {'name': 'Compliance Checks', 'count': 280},
+            {'name': 'Document Generation', 'count': 200}
+        ],
+        'risk_alerts': 2,
+        'compliance_score': 98.5
+    }
 
 @app.route('/api/governance/usage-metrics', methods=['GET'])
 @jwt_required()
 def get_ai_usage_metrics():
     """Get AI usage metrics and governance dashboard data."""
     try:
-        # This would integrate with the enhanced AI governance agent
-        # For now, return placeholder metrics
-        metrics = {
-            'total_ai_requests': 1250,
-            'approval_rate': 94.5,
-            'average_response_time': 1.2,
-            'top_use_cases': [
-                {'name': 'HR Policy Queries', 'count': 450},
-                {'name': 'Employee Evaluations', 'count': 320},
-                {'name': 'Compliance Checks', 'count': 280},
-                {'name': 'Document Generation', 'count': 200}
-            ],
-            'risk_alerts': 2,
-            'compliance_score': 98.5
-        }
-        
-        return jsonify({
-            'success': True,
-            'data': metrics
-        })
-        
+        return ok(load_usage_metrics(get_jwt_identity()))
     except Exception as e:
-        return jsonify({
-            'success': False,
-            'message': f'Error getting usage metrics: {str(e)}'
-        }), 500
+        return fail(f'Error getting usage metrics: {str(e)}')
 
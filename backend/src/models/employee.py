@@ -1,4 +1,5 @@
 from src.database import db
+from sqlalchemy import event, DDL
 from datetime import datetime, date
 import uuid
 
@@ -7,7 +8,7 @@ class Employee(db.Model):
     __table_args__ = {'extend_existing': True}
     
     employee_id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    user_id = db.Column(db.String(36), db.ForeignKey('users.user_id'), nullable=False)
+    user_id = db.Column(db.String(36), db.ForeignKey('users.user_id'), nullable=False, index=True)
     full_name = db.Column(db.String(255), nullable=False)
     date_of_birth = db.Column(db.Date, nullable=False)
     gender = db.Column(db.String(50), nullable=False)
@@ -132,7 +133,13 @@ class PayrollCompensation(db.Model):
 
 class AttendanceTimeTracking(db.Model):
     __tablename__ = 'attendance_time_tracking'
-    __table_args__ = {'extend_existing': True}
+    # Range-partitioned by record_date on Postgres (ignored elsewhere); only
+    # there is record_date added to the primary key, as partitioning requires
+    __table_args__ = {
+        'extend_existing': True,
+        'postgresql_partition_by': 'RANGE (record_date)',
+        'info': {'partition_key': 'record_date'}
+    }
     
     attendance_id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     employee_id = db.Column(db.String(36), db.ForeignKey('employees.employee_id'), nullable=False)
@@ -155,6 +162,14 @@ class AttendanceTimeTracking(db.Model):
             'overtime_hours': float(self.overtime_hours) if self.overtime_hours else None
         }
 
+db.Index('ix_attendance_emp_date', AttendanceTimeTracking.employee_id, AttendanceTimeTracking.record_date)
+
+# Catch-all partition so inserts work before monthly partitions are managed (pg_partman)
+event.listen(
+    AttendanceTimeTracking.__table__, 'after_create',
+    DDL('CREATE TABLE IF NOT EXISTS attendance_time_tracking_default PARTITION OF attendance_time_tracking DEFAULT').execute_if(dialect='postgresql')
+)
+
 class LeaveManagement(db.Model):
     __tablename__ = 'leave_management'
     __table_args__ = {'extend_existing': True}
@@ -182,6 +197,9 @@ class LeaveManagement(db.Model):
             'reason': self.reason
         }
 
+db.Index('ix_leave_emp_status', LeaveManagement.employee_id, LeaveManagement.status)
+db.Index('ix_leave_emp_start', LeaveManagement.employee_id, LeaveManagement.start_date.desc())
+
 class PerformanceDevelopment(db.Model):
     __tablename__ = 'performance_development'
     __table_args__ = {'extend_existing': True}
@@ -213,6 +231,8 @@ class PerformanceDevelopment(db.Model):
             'awards_recognitions': self.awards_recognitions
         }
 
+db.Index('ix_performance_emp_review', PerformanceDevelopment.employee_id, PerformanceDevelopment.review_date.desc())
+
 class ComplianceLegal(db.Model):
     __tablename__ = 'compliance_legal'
     __table_args__ = {'extend_existing': True}
@@ -1,10 +1,17 @@
 from src.database import db
+from sqlalchemy import event, DDL
 from datetime import datetime
 import uuid
 
 class PromptHistory(db.Model):
     __tablename__ = 'prompt_history'
-    __table_args__ = {'extend_existing': True}
+    # Range-partitioned by timestamp on Postgres (ignored elsewhere); only there
+    # is timestamp added to the primary key, as partitioning requires
+    __table_args__ = {
+        'extend_existing': True,
+        'postgresql_partition_by': 'RANGE (timestamp)',
+        'info': {'partition_key': 'timestamp'}
+    }
     
     prompt_id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     user_id = db.Column(db.String(36), db.ForeignKey('users.user_id'), nullable=False)
@@ -35,3 +42,13 @@ class PromptHistory(db.Model):
             'template_type': self.template_type
         }
 
+# Serves the history listing's keyset order (timestamp, prompt_id) DESC per user
+db.Index('ix_prompt_user_time', PromptHistory.user_id, PromptHistory.timestamp.desc(), PromptHistory.prompt_id.desc())
+# History filtered by ?type= and the per-type usage breakdown
+db.Index('ix_prompt_user_type_time', PromptHistory.user_id, PromptHistory.prompt_type, PromptHistory.timestamp.desc())
+
+# Catch-all partition so inserts work before monthly partitions are managed (pg_partman)
+event.listen(
+    PromptHistory.__table__, 'after_create',
+    DDL('CREATE TABLE IF NOT EXISTS prompt_history_default PARTITION OF prompt_history DEFAULT').execute_if(dialect='postgresql')
+)
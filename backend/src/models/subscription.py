@@ -29,6 +29,8 @@ class Subscription(db.Model):
             'last_coin_refresh': self.last_coin_refresh.isoformat() if self.last_coin_refresh else None
         }
 
+db.Index('ix_sub_user_status', Subscription.user_id, Subscription.status)
+
 class CountryHRData(db.Model):
     __tablename__ = 'country_hr_data'
     
@@ -54,3 +56,4 @@ class CountryHRData(db.Model):
             'source_url': self.source_url
         }
 
+db.Index('ix_country_cat', CountryHRData.country_code, CountryHRData.category)
@@ -0,0 +1,26 @@
+import base64
+import binascii
+import orjson
+
+
+def encode_cursor(*values):
+    """Opaque keyset cursor carrying the sort key of a page's last row."""
+    return base64.urlsafe_b64encode(orjson.dumps(values)).decode()
+
+
+def decode_cursor(token):
+    """Sort key values packed by encode_cursor (ValueError if the token is malformed)."""
+    try:
+        values = orjson.loads(base64.urlsafe_b64decode(token.encode()))
+    except (binascii.Error, orjson.JSONDecodeError) as e:
+        raise ValueError('Invalid cursor') from e
+    if not isinstance(values, list):
+        raise ValueError('Invalid cursor')
+    return values
+
+
+def keyset_page(rows, per_page, sort_key):
+    """Split a LIMIT per_page + 1 fetch into (page rows, next cursor or None)."""
+    page = rows[:per_page]
+    next_cursor = encode_cursor(*sort_key(page[-1])) if len(rows) > per_page else None
+    return page, next_cursor
@@ -0,0 +1,23 @@
+import os
+import bcrypt
+from werkzeug.security import check_password_hash
+
+# bcrypt work factor; each +1 doubles hashing time, tune to the deploy hardware
+BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', '12'))
+
+
+def hash_password(password):
+    """bcrypt hash of a password, stored as text."""
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode()
+
+
+def verify_password(password_hash, password):
+    """Constant-time check against a bcrypt hash, or a legacy Werkzeug (pbkdf2/scrypt) hash."""
+    if password_hash.startswith('$2'):
+        return bcrypt.checkpw(password.encode(), password_hash.encode())
+    return check_password_hash(password_hash, password)
+
+
+def needs_rehash(password_hash):
+    """True for hashes not yet on bcrypt at the current work factor."""
+    return not password_hash.startswith(f'$2b${BCRYPT_ROUNDS:02d}$')
@@ -12,21 +12,110 @@ G-P Insight: "Create personalized professional development plans"
 """
 
 import asyncio
-import json
+import atexit
+import os
 import uuid
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional, Tuple
 from dataclasses import dataclass, asdict
-from enum import Enum
+from enum import Enum, IntEnum
+from functools import lru_cache
+from operator import itemgetter
 import sqlite3
+import time
+from contextlib import asynccontextmanager
 from pathlib import Path
+import aiosqlite
 import numpy as np
+import orjson
 
-class SkillLevel(Enum):
-    BEGINNER = "beginner"
-    INTERMEDIATE = "intermediate"
-    ADVANCED = "advanced"
-    EXPERT = "expert"
+# Per-connection tuning applied when a connection is opened
+_PRAGMAS = '''
+    PRAGMA journal_mode=WAL;
+    PRAGMA synchronous=NORMAL;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA cache_size=-64000;
+'''
+
+# Statements used at request time. Keeping them as fixed strings lets the
+# connection's prepared-statement cache reuse the compiled form across calls.
+_SQL = {
+    'insert_plan': '''
+        INSERT INTO development_plans 
+        (plan_id, employee_id, created_by, goals, skill_gaps, recommended_actions, 
+         timeline, budget_estimate, success_metrics, status)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''',
+    'insert_recommendation': '''
+        INSERT INTO learning_recommendations 
+        (recommendation_id, employee_id, skill_target, training_type, provider, title, 
+         description, duration, cost, relevance_score, difficulty_level, 
+         prerequisites, learning_outcomes)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''',
+    'upsert_progress': '''
+        INSERT INTO learning_progress 
+        (progress_id, employee_id, recommendation_id, progress_percentage, status)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (employee_id, recommendation_id) DO UPDATE SET
+            progress_percentage = excluded.progress_percentage,
+            status = excluded.status,
+            updated_at = CURRENT_TIMESTAMP
+    ''',
+    'employee': '''
+        SELECT * FROM employees WHERE employee_id = ?
+    ''',
+    'skill_assessments': '''
+        SELECT skill_name, current_level FROM skill_assessments 
+        WHERE employee_id = ?
+        ORDER BY last_assessed
+    ''',
+    'development_analytics': '''
+        WITH lp AS (
+            SELECT status, progress_percentage FROM learning_progress 
+            WHERE employee_id = :employee_id
+        )
+        SELECT
+            (SELECT COUNT(*) FROM development_plans 
+             WHERE employee_id = :employee_id AND status = 'active'),
+            (SELECT json_group_object(status, count) FROM (
+                SELECT IFNULL(status, 0) AS status, COUNT(*) as count 
+                FROM lp GROUP BY 1
+            )),
+            (SELECT AVG(progress_percentage) FROM lp),
+            (SELECT COUNT(*) FROM skill_assessments 
+             WHERE employee_id = :employee_id)
+    '''
+}
+
+# Employee rows are cached briefly: building a plan looks the same employee
+# up from both gap analysis and recommendation generation
+_EMPLOYEE_CACHE_TTL = 60
+_EMPLOYEE_CACHE_SIZE = 1024
+
+def _dumps(obj: Any) -> str:
+    """Serialize a value for a TEXT column (datetimes and numpy scalars handled natively)."""
+    return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+
+@lru_cache(maxsize=256)
+def _role_key(role: str) -> str:
+    """Normalize a role title ('Software Engineer') to its CAREER_PATHS key."""
+    return role.lower().replace(' ', '_')
+
+class SkillLevel(IntEnum):
+    BEGINNER = 1
+    INTERMEDIATE = 2
+    ADVANCED = 3
+    EXPERT = 4
+
+class ProgressStatus(IntEnum):
+    NOT_STARTED = 0
+    IN_PROGRESS = 1
+    COMPLETED = 2
+
+def _level_code(level: Any) -> int:
+    """Storage code for a skill level given as a SkillLevel or its name."""
+    return int(level) if isinstance(level, SkillLevel) else SkillLevel[level.upper()].value
 
 class DevelopmentGoal(Enum):
     SKILL_IMPROVEMENT = "skill_improvement"
@@ -93,6 +182,101 @@ class LearningRecommendation:
     prerequisites: List[str]
     learning_outcomes: List[str]
 
+# Skill taxonomy
+SKILL_TAXONOMY = {
+    'technical': {
+        'programming': ['Python', 'JavaScript', 'Java', 'C++', 'SQL'],
+        'data_analysis': ['Excel', 'Tableau', 'Power BI', 'R', 'Python'],
+        'cloud_computing': ['AWS', 'Azure', 'Google Cloud', 'Docker', 'Kubernetes'],
+        'cybersecurity': ['Network Security', 'Ethical Hacking', 'Compliance', 'Risk Assessment'],
+        'project_management': ['Agile', 'Scrum', 'PMP', 'Risk Management', 'Budgeting']
+    },
+    'soft_skills': {
+        'leadership': ['Team Management', 'Strategic Thinking', 'Decision Making', 'Delegation'],
+        'communication': ['Public Speaking', 'Written Communication', 'Active Listening', 'Negotiation'],
+        'problem_solving': ['Critical Thinking', 'Analytical Skills', 'Creativity', 'Innovation'],
+        'emotional_intelligence': ['Self-Awareness', 'Empathy', 'Social Skills', 'Self-Regulation']
+    },
+    'business': {
+        'finance': ['Financial Analysis', 'Budgeting', 'Forecasting', 'Investment Analysis'],
+        'marketing': ['Digital Marketing', 'Content Strategy', 'SEO/SEM', 'Analytics'],
+        'sales': ['Relationship Building', 'Negotiation', 'CRM', 'Lead Generation'],
+        'operations': ['Process Improvement', 'Quality Management', 'Supply Chain', 'Lean Six Sigma']
+    }
+}
+
+# Career progression paths
+CAREER_PATHS = {
+    'software_engineer': {
+        'junior': ['Programming Fundamentals', 'Version Control', 'Testing', 'Debugging'],
+        'mid': ['System Design', 'Architecture', 'Code Review', 'Mentoring'],
+        'senior': ['Technical Leadership', 'Project Management', 'Strategic Planning'],
+        'lead': ['Team Management', 'Hiring', 'Technology Strategy', 'Business Alignment']
+    },
+    'data_analyst': {
+        'junior': ['Excel', 'SQL', 'Basic Statistics', 'Data Visualization'],
+        'mid': ['Advanced Analytics', 'Python/R', 'Machine Learning', 'Business Intelligence'],
+        'senior': ['Data Strategy', 'Advanced ML', 'Team Leadership', 'Stakeholder Management'],
+        'lead': ['Data Science Strategy', 'Team Management', 'Business Strategy', 'Innovation']
+    },
+    'hr_specialist': {
+        'junior': ['HR Fundamentals', 'Employment Law', 'Recruitment', 'Employee Relations'],
+        'mid': ['Performance Management', 'Training & Development', 'Compensation', 'Analytics'],
+        'senior': ['HR Strategy', 'Change Management', 'Leadership Development', 'Compliance'],
+        'lead': ['Strategic HR', 'Organizational Development', 'Executive Coaching', 'Business Partnership']
+    }
+}
+
+# Learning providers and resources
+LEARNING_PROVIDERS = {
+    'coursera': {
+        'type': 'online_platform',
+        'strengths': ['University courses', 'Certificates', 'Specializations'],
+        'cost_range': (29, 79),
+        'quality_score': 9
+    },
+    'linkedin_learning': {
+        'type': 'online_platform',
+        'strengths': ['Professional skills', 'Business topics', 'Software training'],
+        'cost_range': (29.99, 29.99),
+        'quality_score': 8
+    },
+    'udemy': {
+        'type': 'online_platform',
+        'strengths': ['Technical skills', 'Practical projects', 'Affordable'],
+        'cost_range': (10, 200),
+        'quality_score': 7
+    },
+    'pluralsight': {
+        'type': 'online_platform',
+        'strengths': ['Technology skills', 'Skill assessments', 'Learning paths'],
+        'cost_range': (29, 45),
+        'quality_score': 8
+    }
+}
+
+# Lookup tables over the reference data above, built once at import so
+# gap analysis does dict hits instead of rescanning the nested dicts
+_SKILL_TO_CATEGORY = {
+    skill: category
+    for category, groups in SKILL_TAXONOMY.items()
+    for skills in groups.values()
+    for skill in skills
+}
+# First career level at which each skill appears in a role's path (walked
+# backwards so the earliest level wins)
+_ROLE_SKILL_LEVEL = {
+    role: {skill: level for level, skills in reversed(levels.items()) for skill in skills}
+    for role, levels in CAREER_PATHS.items()
+}
+_ROLE_REQUIREMENTS = {
+    role: {
+        'technical' if 'engineer' in role or 'analyst' in role else 'business':
+            [skill for skills in levels.values() for skill in skills]
+    }
+    for role, levels in CAREER_PATHS.items()
+}
+
 class PersonalizedDevelopmentAgent:
     """
     Handles personalized professional development planning and recommendations.
@@ -116,106 +300,112 @@ class PersonalizedDevelopmentAgent:
             
         self.db_path = self.project_root / "backend" / "hr_advisor.db"
         
-        # Skill taxonomy and career paths
-        self.skill_taxonomy = {
-            'technical': {
-                'programming': ['Python', 'JavaScript', 'Java', 'C++', 'SQL'],
-                'data_analysis': ['Excel', 'Tableau', 'Power BI', 'R', 'Python'],
-                'cloud_computing': ['AWS', 'Azure', 'Google Cloud', 'Docker', 'Kubernetes'],
-                'cybersecurity': ['Network Security', 'Ethical Hacking', 'Compliance', 'Risk Assessment'],
-                'project_management': ['Agile', 'Scrum', 'PMP', 'Risk Management', 'Budgeting']
-            },
-            'soft_skills': {
-                'leadership': ['Team Management', 'Strategic Thinking', 'Decision Making', 'Delegation'],
-                'communication': ['Public Speaking', 'Written Communication', 'Active Listening', 'Negotiation'],
-                'problem_solving': ['Critical Thinking', 'Analytical Skills', 'Creativity', 'Innovation'],
-                'emotional_intelligence': ['Self-Awareness', 'Empathy', 'Social Skills', 'Self-Regulation']
-            },
-            'business': {
-                'finance': ['Financial Analysis', 'Budgeting', 'Forecasting', 'Investment Analysis'],
-                'marketing': ['Digital Marketing', 'Content Strategy', 'SEO/SEM', 'Analytics'],
-                'sales': ['Relationship Building', 'Negotiation', 'CRM', 'Lead Generation'],
-                'operations': ['Process Improvement', 'Quality Management', 'Supply Chain', 'Lean Six Sigma']
-            }
-        }
+        # Reference data (shared module constants, not rebuilt per instance)
+        self.skill_taxonomy = SKILL_TAXONOMY
+        self.career_paths = CAREER_PATHS
+        self.learning_providers = LEARNING_PROVIDERS
         
-        # Career progression paths
-        self.career_paths = {
-            'software_engineer': {
-                'junior': ['Programming Fundamentals', 'Version Control', 'Testing', 'Debugging'],
-                'mid': ['System Design', 'Architecture', 'Code Review', 'Mentoring'],
-                'senior': ['Technical Leadership', 'Project Management', 'Strategic Planning'],
-                'lead': ['Team Management', 'Hiring', 'Technology Strategy', 'Business Alignment']
-            },
-            'data_analyst': {
-                'junior': ['Excel', 'SQL', 'Basic Statistics', 'Data Visualization'],
-                'mid': ['Advanced Analytics', 'Python/R', 'Machine Learning', 'Business Intelligence'],
-                'senior': ['Data Strategy', 'Advanced ML', 'Team Leadership', 'Stakeholder Management'],
-                'lead': ['Data Science Strategy', 'Team Management', 'Business Strategy', 'Innovation']
-            },
-            'hr_specialist': {
-                'junior': ['HR Fundamentals', 'Employment Law', 'Recruitment', 'Employee Relations'],
-                'mid': ['Performance Management', 'Training & Development', 'Compensation', 'Analytics'],
-                'senior': ['HR Strategy', 'Change Management', 'Leadership Development', 'Compliance'],
-                'lead': ['Strategic HR', 'Organizational Development', 'Executive Coaching', 'Business Partnership']
-            }
-        }
+        # Single long-lived aiosqlite connection per event loop (autocommit mode;
+        # writes open explicit transactions via _transaction)
+        self._conn_task = None
+        self._conn_loop = None
+        self._write_lock = None
+        atexit.register(self.close)
         
-        # Learning providers and resources
-        self.learning_providers = {
-            'coursera': {
-                'type': 'online_platform',
-                'strengths': ['University courses', 'Certificates', 'Specializations'],
-                'cost_range': (29, 79),
-                'quality_score': 9
-            },
-            'linkedin_learning': {
-                'type': 'online_platform',
-                'strengths': ['Professional skills', 'Business topics', 'Software training'],
-                'cost_range': (29.99, 29.99),
-                'quality_score': 8
-            },
-            'udemy': {
-                'type': 'online_platform',
-                'strengths': ['Technical skills', 'Practical projects', 'Affordable'],
-                'cost_range': (10, 200),
-                'quality_score': 7
-            },
-            'pluralsight': {
-                'type': 'online_platform',
-                'strengths': ['Technology skills', 'Skill assessments', 'Learning paths'],
-                'cost_range': (29, 45),
-                'quality_score': 8
-            }
-        }
+        # employee_id -> (expires_at, employee row)
+        self._employee_cache = {}
         
         # Initialize database
         self._init_database()
     
+    async def _open_connection(self) -> aiosqlite.Connection:
+        conn = aiosqlite.connect(self.db_path, isolation_level=None)
+        # aiosqlite's worker thread is non-daemon; don't let it hold up interpreter exit
+        conn.daemon = True
+        conn = await conn
+        await conn.executescript(_PRAGMAS)
+        return conn
+    
+    @staticmethod
+    def _opened_connection(task) -> Optional[aiosqlite.Connection]:
+        """The connection a finished _open_connection task produced, if any."""
+        if task is None or not task.done() or task.cancelled() or task.exception() is not None:
+            return None
+        return task.result()
+    
+    async def _get_connection(self) -> aiosqlite.Connection:
+        """Return the shared connection, opening it on first use in the running loop."""
+        loop = asyncio.get_running_loop()
+        if self._conn_loop is not loop:
+            stale = self._opened_connection(self._conn_task)
+            self._conn_loop = loop
+            self._write_lock = asyncio.Lock()
+            self._conn_task = loop.create_task(self._open_connection())
+            if stale is not None:
+                # aiosqlite resolves results on the awaiting loop, so the old one isn't needed
+                try:
+                    await stale.close()
+                except Exception as e:
+                    print(f"Error closing stale development DB connection: {str(e)}")
+        return await self._conn_task
+    
+    def close(self):
+        """Close the shared connection on its own loop (registered with atexit)."""
+        conn, loop = self._opened_connection(self._conn_task), self._conn_loop
+        self._conn_task = self._conn_loop = None
+        if conn is None:
+            return
+        try:
+            if loop.is_running():
+                asyncio.run_coroutine_threadsafe(conn.close(), loop).result(timeout=5)
+            else:
+                asyncio.run(conn.close())
+        except Exception as e:
+            print(f"Error closing development DB connection: {str(e)}")
+    
+    @asynccontextmanager
+    async def _db(self):
+        """Yield a cursor on the shared connection."""
+        conn = await self._get_connection()
+        async with conn.cursor() as cursor:
+            # Larger batches per fetch when rows are iterated
+            cursor.arraysize = 1024
+            yield cursor
+    
+    @asynccontextmanager
+    async def _transaction(self):
+        """Yield a cursor inside BEGIN IMMEDIATE ... COMMIT (rolled back on error)."""
+        async with self._db() as cursor:
+            async with self._write_lock:
+                await cursor.execute('BEGIN IMMEDIATE')
+                try:
+                    yield cursor
+                except BaseException:
+                    await cursor.execute('ROLLBACK')
+                    raise
+                await cursor.execute('COMMIT')
+    
     def _init_database(self):
         """Initialize database tables for development planning."""
         try:
+            # One script for the whole schema instead of a statement per table
             conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Skill assessments table
-            cursor.execute('''
+            conn.executescript(_PRAGMAS + '''
+                -- Skill assessments table
                 CREATE TABLE IF NOT EXISTS skill_assessments (
                     assessment_id TEXT PRIMARY KEY,
                     employee_id TEXT NOT NULL,
                     skill_name TEXT NOT NULL,
-                    current_level TEXT NOT NULL,
-                    target_level TEXT NOT NULL,
+                    current_level INTEGER NOT NULL,
+                    target_level INTEGER NOT NULL,
                     importance INTEGER NOT NULL,
                     last_assessed TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     assessor TEXT NOT NULL,
                     evidence TEXT,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Development plans table
-            cursor.execute('''
+                );
+                
+                -- Development plans table
                 CREATE TABLE IF NOT EXISTS development_plans (
                     plan_id TEXT PRIMARY KEY,
                     employee_id TEXT NOT NULL,
@@ -229,11 +419,9 @@ class PersonalizedDevelopmentAgent:
                     status TEXT DEFAULT 'active',
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Learning recommendations table
-            cursor.execute('''
+                );
+                
+                -- Learning recommendations table
                 CREATE TABLE IF NOT EXISTS learning_recommendations (
                     recommendation_id TEXT PRIMARY KEY,
                     employee_id TEXT NOT NULL,
@@ -245,20 +433,18 @@ class PersonalizedDevelopmentAgent:
                     duration TEXT,
                     cost REAL,
                     relevance_score REAL,
-                    difficulty_level TEXT,
+                    difficulty_level INTEGER,
                     prerequisites TEXT,
                     learning_outcomes TEXT,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Learning progress table
-            cursor.execute('''
+                );
+                
+                -- Learning progress table
                 CREATE TABLE IF NOT EXISTS learning_progress (
                     progress_id TEXT PRIMARY KEY,
                     employee_id TEXT NOT NULL,
                     recommendation_id TEXT NOT NULL,
-                    status TEXT DEFAULT 'not_started',
+                    status INTEGER DEFAULT 0,
                     progress_percentage INTEGER DEFAULT 0,
                     started_at TIMESTAMP,
                     completed_at TIMESTAMP,
@@ -267,9 +453,28 @@ class PersonalizedDevelopmentAgent:
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     FOREIGN KEY (recommendation_id) REFERENCES learning_recommendations (recommendation_id)
-                )
+                );
+                
+                -- Indexes for the per-employee lookups and aggregates
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_lp_emp_rec ON learning_progress (employee_id, recommendation_id);
+                CREATE INDEX IF NOT EXISTS idx_lp_emp_status ON learning_progress (employee_id, status);
+                CREATE INDEX IF NOT EXISTS idx_dp_emp_status ON development_plans (employee_id, status);
+                CREATE INDEX IF NOT EXISTS idx_sa_emp ON skill_assessments (employee_id);
+                
+                -- One-time upgrade of rows written when levels and status were stored by name
+                UPDATE skill_assessments SET
+                    current_level = CASE lower(current_level) WHEN 'intermediate' THEN 2 WHEN 'advanced' THEN 3 WHEN 'expert' THEN 4 ELSE 1 END
+                WHERE typeof(current_level) = 'text' AND current_level NOT GLOB '[0-9]';
+                UPDATE skill_assessments SET
+                    target_level = CASE lower(target_level) WHEN 'intermediate' THEN 2 WHEN 'advanced' THEN 3 WHEN 'expert' THEN 4 ELSE 1 END
+                WHERE typeof(target_level) = 'text' AND target_level NOT GLOB '[0-9]';
+                UPDATE learning_recommendations SET
+                    difficulty_level = CASE lower(difficulty_level) WHEN 'intermediate' THEN 2 WHEN 'advanced' THEN 3 WHEN 'expert' THEN 4 ELSE 1 END
+                WHERE typeof(difficulty_level) = 'text' AND difficulty_level NOT GLOB '[0-9]';
+                UPDATE learning_progress SET
+                    status = CASE lower(status) WHEN 'in_progress' THEN 1 WHEN 'completed' THEN 2 ELSE 0 END
+                WHERE typeof(status) = 'text' AND status NOT GLOB '[0-9]';
             ''')
-            
             conn.commit()
             conn.close()
             
@@ -301,30 +506,50 @@ class PersonalizedDevelopmentAgent:
                 target_skills = self._get_role_requirements(target_role)
             else:
                 # Use current role for improvement
-                current_role = employee_data.get('position', '').lower().replace(' ', '_')
-                target_skills = self._get_role_requirements(current_role)
-            
-            # Calculate skill gaps
-            skill_gaps = []
-            for skill_category, skills in target_skills.items():
-                for skill in skills:
-                    current_level = self._get_current_skill_level(skill, current_skills)
-                    target_level = self._get_target_skill_level(skill, target_role or employee_data.get('position'))
-                    
-                    if self._skill_level_to_int(target_level) > self._skill_level_to_int(current_level):
-                        gap = {
-                            'skill_name': skill,
-                            'category': skill_category,
-                            'current_level': current_level,
-                            'target_level': target_level,
-                            'gap_size': self._skill_level_to_int(target_level) - self._skill_level_to_int(current_level),
-                            'importance': self._calculate_skill_importance(skill, target_role or employee_data.get('position')),
-                            'priority': 'high' if self._skill_level_to_int(target_level) - self._skill_level_to_int(current_level) >= 2 else 'medium'
-                        }
-                        skill_gaps.append(gap)
-            
-            # Sort by importance and gap size
-            skill_gaps.sort(key=lambda x: (x['importance'], x['gap_size']), reverse=True)
+                target_skills = self._get_role_requirements(employee_data.get('position') or '')
+            
+            role = target_role or employee_data.get('position')
+            
+            # Skills the employee already meets need no gap math; find them in
+            # one pass over the assessments and drop them up front
+            satisfied = {
+                skill for skill, level in current_skills.items()
+                if level >= self._get_target_skill_level(skill, role)
+            }
+            
+            # Calculate skill gaps over flat arrays instead of per-skill arithmetic
+            pairs = [
+                (category, skill)
+                for category, skills in target_skills.items()
+                for skill in skills
+                if skill not in satisfied
+            ]
+            current_levels = [self._get_current_skill_level(skill, current_skills) for _, skill in pairs]
+            target_levels = [self._get_target_skill_level(skill, role) for _, skill in pairs]
+            current = np.fromiter(current_levels, dtype=np.int8, count=len(pairs))
+            target = np.fromiter(target_levels, dtype=np.int8, count=len(pairs))
+            importance = np.fromiter(
+                (self._calculate_skill_importance(skill, role) for _, skill in pairs),
+                dtype=np.int8, count=len(pairs)
+            )
+            gaps = target - current
+            
+            # Sort by importance and gap size (both descending; lexsort is stable)
+            idx = np.flatnonzero(gaps > 0)
+            idx = idx[np.lexsort((-gaps[idx], -importance[idx]))]
+            
+            skill_gaps = [
+                {
+                    'skill_name': pairs[i][1],
+                    'category': pairs[i][0],
+                    'current_level': current_levels[i].name.lower(),
+                    'target_level': target_levels[i].name.lower(),
+                    'gap_size': int(gaps[i]),
+                    'importance': int(importance[i]),
+                    'priority': 'high' if gaps[i] >= 2 else 'medium'
+                }
+                for i in idx.tolist()
+            ]
             
             return {
                 'employee_id': employee_id,
@@ -332,7 +557,7 @@ class PersonalizedDevelopmentAgent:
                 'skill_gaps': skill_gaps,
                 'total_gaps': len(skill_gaps),
                 'high_priority_gaps': len([g for g in skill_gaps if g['priority'] == 'high']),
-                'analysis_date': datetime.now().isoformat()
+                'analysis_date': datetime.now()
             }
             
         except Exception as e:
@@ -395,29 +620,19 @@ class PersonalizedDevelopmentAgent:
             }
             
             # Save to database
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO development_plans 
-                (plan_id, employee_id, created_by, goals, skill_gaps, recommended_actions, 
-                 timeline, budget_estimate, success_metrics, status)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                plan_id,
-                employee_id,
-                created_by,
-                json.dumps(goals),
-                json.dumps(gap_analysis['skill_gaps']),
-                json.dumps(recommendations),
-                json.dumps(timeline),
-                budget_estimate,
-                json.dumps(success_metrics),
-                'active'
-            ))
-            
-            conn.commit()
-            conn.close()
+            async with self._transaction() as cursor:
+                await cursor.execute(_SQL['insert_plan'], (
+                    plan_id,
+                    employee_id,
+                    created_by,
+                    _dumps(goals),
+                    _dumps(gap_analysis['skill_gaps']),
+                    _dumps(recommendations),
+                    _dumps(timeline),
+                    budget_estimate,
+                    _dumps(success_metrics),
+                    'active'
+                ))
             
             return plan_id
             
@@ -439,48 +654,67 @@ class PersonalizedDevelopmentAgent:
         """
         try:
             recommendations = []
+            rows = []
             
             # Get employee learning preferences
             employee_data = await self._get_employee_data(employee_id)
             learning_style = self._infer_learning_style(employee_data)
             
+            # Find suitable learning resources for every gap first, so the
+            # recommendation IDs can be drawn from one block of randomness
+            matches = []
             for gap in skill_gaps:
-                skill_name = gap['skill_name']
-                current_level = gap['current_level']
-                target_level = gap['target_level']
-                
-                # Find suitable learning resources
                 suitable_resources = self._find_learning_resources(
-                    skill_name, 
-                    current_level, 
-                    target_level,
+                    gap['skill_name'], 
+                    gap['current_level'], 
+                    gap['target_level'],
                     learning_style
                 )
+                matches.extend((gap['skill_name'], resource) for resource in suitable_resources)
+            
+            raw_ids = os.urandom(16 * len(matches))
+            
+            for i, (skill_name, resource) in enumerate(matches):
+                recommendation = {
+                    'recommendation_id': str(uuid.UUID(bytes=raw_ids[i * 16:(i + 1) * 16], version=4)),
+                    'employee_id': employee_id,
+                    'skill_target': skill_name,
+                    'training_type': resource['type'],
+                    'provider': resource['provider'],
+                    'title': resource['title'],
+                    'description': resource['description'],
+                    'duration': resource['duration'],
+                    'cost': resource['cost'],
+                    'relevance_score': resource['relevance_score'],
+                    'difficulty_level': resource['difficulty_level'],
+                    'prerequisites': resource['prerequisites'],
+                    'learning_outcomes': resource['learning_outcomes']
+                }
                 
-                for resource in suitable_resources:
-                    recommendation = {
-                        'recommendation_id': str(uuid.uuid4()),
-                        'employee_id': employee_id,
-                        'skill_target': skill_name,
-                        'training_type': resource['type'],
-                        'provider': resource['provider'],
-                        'title': resource['title'],
-                        'description': resource['description'],
-                        'duration': resource['duration'],
-                        'cost': resource['cost'],
-                        'relevance_score': resource['relevance_score'],
-                        'difficulty_level': resource['difficulty_level'],
-                        'prerequisites': resource['prerequisites'],
-                        'learning_outcomes': resource['learning_outcomes']
-                    }
-                    
-                    recommendations.append(recommendation)
-                    
-                    # Save to database
-                    await self._save_learning_recommendation(recommendation)
+                recommendations.append(recommendation)
+                rows.append((
+                    recommendation['recommendation_id'],
+                    employee_id,
+                    skill_name,
+                    resource['type'],
+                    resource['provider'],
+                    resource['title'],
+                    resource['description'],
+                    resource['duration'],
+                    resource['cost'],
+                    resource['relevance_score'],
+                    _level_code(resource['difficulty_level']),
+                    _dumps(resource['prerequisites']),
+                    _dumps(resource['learning_outcomes'])
+                ))
+            
+            # Save to database in a single transaction
+            if rows:
+                async with self._transaction() as cursor:
+                    await cursor.executemany(_SQL['insert_recommendation'], rows)
             
             # Sort by relevance score
-            recommendations.sort(key=lambda x: x['relevance_score'], reverse=True)
+            recommendations.sort(key=itemgetter('relevance_score'), reverse=True)
             
             return recommendations
             
@@ -488,6 +722,31 @@ class PersonalizedDevelopmentAgent:
             print(f"Error generating learning recommendations: {str(e)}")
             return []
     
+    async def get_learning_recommendations(self, employee_id: str, top_n: int = 5) -> Dict[str, Any]:
+        """
+        Analyze skill gaps and recommend learning for the top gaps in one call.
+        
+        Args:
+            employee_id: Employee to generate recommendations for
+            top_n: Number of highest-priority gaps to build recommendations for
+            
+        Returns:
+            All skill gaps plus recommendations, or {'error': ...}
+        """
+        gap_analysis = await self.analyze_skill_gaps(employee_id)
+        if 'error' in gap_analysis:
+            return gap_analysis
+        
+        recommendations = await self.generate_learning_recommendations(
+            employee_id,
+            gap_analysis['skill_gaps'][:top_n]
+        )
+        
+        return {
+            'skill_gaps': gap_analysis['skill_gaps'],
+            'recommendations': recommendations
+        }
+    
     async def track_learning_progress(self, employee_id: str, 
                                     recommendation_id: str, 
                                     progress_percentage: int,
@@ -499,41 +758,19 @@ class PersonalizedDevelopmentAgent:
             employee_id: Employee ID
             recommendation_id: Learning recommendation ID
             progress_percentage: Progress percentage (0-100)
-            status: Progress status
+            status: Progress status (not_started, in_progress or completed)
             
         Returns:
             Success status
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Check if progress record exists
-            cursor.execute('''
-                SELECT progress_id FROM learning_progress 
-                WHERE employee_id = ? AND recommendation_id = ?
-            ''', (employee_id, recommendation_id))
-            
-            existing = cursor.fetchone()
-            
-            if existing:
-                # Update existing record
-                cursor.execute('''
-                    UPDATE learning_progress 
-                    SET progress_percentage = ?, status = ?, updated_at = CURRENT_TIMESTAMP
-                    WHERE employee_id = ? AND recommendation_id = ?
-                ''', (progress_percentage, status, employee_id, recommendation_id))
-            else:
-                # Create new record
-                progress_id = str(uuid.uuid4())
-                cursor.execute('''
-                    INSERT INTO learning_progress 
-                    (progress_id, employee_id, recommendation_id, progress_percentage, status)
-                    VALUES (?, ?, ?, ?, ?)
-                ''', (progress_id, employee_id, recommendation_id, progress_percentage, status))
-            
-            conn.commit()
-            conn.close()
+            # Single upsert keyed on the (employee_id, recommendation_id) unique index
+            async with self._transaction() as cursor:
+                await cursor.execute(
+                    _SQL['upsert_progress'],
+                    (str(uuid.uuid4()), employee_id, recommendation_id, progress_percentage,
+                     ProgressStatus[status.upper()].value)
+                )
             
             return True
             
@@ -552,41 +789,15 @@ class PersonalizedDevelopmentAgent:
             Development analytics data
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Get active development plans
-            cursor.execute('''
-                SELECT COUNT(*) FROM development_plans 
-                WHERE employee_id = ? AND status = 'active'
-            ''', (employee_id,))
-            active_plans = cursor.fetchone()[0]
-            
-            # Get learning progress
-            cursor.execute('''
-                SELECT status, COUNT(*) as count 
-                FROM learning_progress 
-                WHERE employee_id = ? 
-                GROUP BY status
-            ''', (employee_id,))
-            progress_counts = dict(cursor.fetchall())
-            
-            # Get average progress
-            cursor.execute('''
-                SELECT AVG(progress_percentage) 
-                FROM learning_progress 
-                WHERE employee_id = ?
-            ''', (employee_id,))
-            avg_progress = cursor.fetchone()[0] or 0
-            
-            # Get skill assessments count
-            cursor.execute('''
-                SELECT COUNT(*) FROM skill_assessments 
-                WHERE employee_id = ?
-            ''', (employee_id,))
-            skill_assessments = cursor.fetchone()[0]
-            
-            conn.close()
+            # All four aggregates in one statement (learning_progress is read via one CTE)
+            async with self._db() as cursor:
+                await cursor.execute(_SQL['development_analytics'], {'employee_id': employee_id})
+                active_plans, progress_json, avg_progress, skill_assessments = await cursor.fetchone()
+            progress_counts = {
+                ProgressStatus(int(code)).name.lower(): count
+                for code, count in orjson.loads(progress_json or '{}').items()
+            }
+            avg_progress = avg_progress or 0
             
             return {
                 'employee_id': employee_id,
@@ -607,17 +818,10 @@ class PersonalizedDevelopmentAgent:
     # Helper methods
     def _get_role_requirements(self, role: str) -> Dict[str, List[str]]:
         """Get skill requirements for a role."""
-        role_key = role.lower().replace(' ', '_')
+        role_key = _role_key(role)
         
-        if role_key in self.career_paths:
-            # Get skills for current level and above
-            all_skills = {}
-            for level, skills in self.career_paths[role_key].items():
-                category = 'technical' if 'engineer' in role_key or 'analyst' in role_key else 'business'
-                if category not in all_skills:
-                    all_skills[category] = []
-                all_skills[category].extend(skills)
-            return all_skills
+        if role_key in _ROLE_REQUIREMENTS:
+            return _ROLE_REQUIREMENTS[role_key]
         
         # Default skills for unknown roles
         return {
@@ -625,15 +829,66 @@ class PersonalizedDevelopmentAgent:
             'technical': ['Computer Literacy', 'Industry Knowledge']
         }
     
-    def _skill_level_to_int(self, level: str) -> int:
-        """Convert skill level to integer for comparison."""
-        level_map = {
-            'beginner': 1,
-            'intermediate': 2,
-            'advanced': 3,
-            'expert': 4
-        }
-        return level_map.get(level.lower(), 1)
+    async def _get_employee_data(self, employee_id: str) -> Optional[Dict[str, Any]]:
+        """Get employee data from database (cached for _EMPLOYEE_CACHE_TTL seconds)."""
+        cached = self._employee_cache.get(employee_id)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+        
+        try:
+            async with self._db() as cursor:
+                await cursor.execute(_SQL['employee'], (employee_id,))
+                row = await cursor.fetchone()
+                if not row:
+                    return None
+                employee_data = dict(zip([d[0] for d in cursor.description], row))
+        except Exception as e:
+            print(f"Error getting employee data: {str(e)}")
+            return None
+        
+        if len(self._employee_cache) >= _EMPLOYEE_CACHE_SIZE:
+            # Evict the oldest entry (dicts keep insertion order)
+            self._employee_cache.pop(next(iter(self._employee_cache)))
+        self._employee_cache[employee_id] = (time.monotonic() + _EMPLOYEE_CACHE_TTL, employee_data)
+        return employee_data
+    
+    def invalidate_employee(self, employee_id: str):
+        """Drop a cached employee row after the employee is updated or deleted."""
+        self._employee_cache.pop(employee_id, None)
+    
+    async def _get_skill_assessments(self, employee_id: str) -> Dict[str, SkillLevel]:
+        """Get the latest assessed level for each of an employee's skills."""
+        async with self._db() as cursor:
+            await cursor.execute(_SQL['skill_assessments'], (employee_id,))
+            return {
+                skill_name: SkillLevel(int(level))
+                for skill_name, level in await cursor.fetchall()
+            }
+    
+    def _get_current_skill_level(self, skill: str, current_skills: Dict[str, SkillLevel]) -> SkillLevel:
+        """Get an employee's current level for a skill (beginner if never assessed)."""
+        return current_skills.get(skill, SkillLevel.BEGINNER)
+    
+    def _get_target_skill_level(self, skill: str, role: Optional[str]) -> SkillLevel:
+        """Get the level a role expects for a skill, based on where it enters the career path."""
+        role_key = _role_key(role or '')
+        career_level = _ROLE_SKILL_LEVEL.get(role_key, {}).get(skill)
+        return {
+            'junior': SkillLevel.INTERMEDIATE,
+            'mid': SkillLevel.ADVANCED,
+            'senior': SkillLevel.ADVANCED,
+            'lead': SkillLevel.EXPERT
+        }.get(career_level, SkillLevel.INTERMEDIATE)
+    
+    def _calculate_skill_importance(self, skill: str, role: Optional[str]) -> int:
+        """Score 1-5: skills a role needs earlier in its career path matter more."""
+        role_key = _role_key(role or '')
+        career_level = _ROLE_SKILL_LEVEL.get(role_key, {}).get(skill)
+        importance = {'junior': 5, 'mid': 4, 'senior': 3, 'lead': 2}.get(career_level, 3)
+        # Skills that are also in the core taxonomy get a small boost
+        if skill in _SKILL_TO_CATEGORY:
+            importance = min(importance + 1, 5)
+        return importance
     
     def _calculate_development_score(self, active_plans: int, avg_progress: float, 
                                    progress_counts: Dict[str, int]) -> int:
@@ -4,21 +4,142 @@ Provides predictive insights on employee retention, performance, hiring needs, a
 """
 
 import asyncio
+import hashlib
+import heapq
+import itertools
 import json
-import uuid
+import logging
+import os
+import secrets
+import tempfile
+import threading
+import joblib
 import numpy as np
 import pandas as pd
+import orjson
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional, Tuple
+from pathlib import Path
+from typing import Dict, List, Any, Mapping, Optional, Tuple
+from collections import OrderedDict
 from dataclasses import dataclass, asdict
 from enum import Enum
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingRegressor
+from operator import itemgetter
+from sklearn.ensemble import RandomForestClassifier, HistGradientBoostingRegressor
 from sklearn.preprocessing import StandardScaler, LabelEncoder
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, mean_squared_error
+from sklearn.base import clone
 import warnings
 warnings.filterwarnings('ignore')
 
+logger = logging.getLogger(__name__)
+
+# Model inputs for retention risk, in training column order
+RETENTION_FEATURES = [
+    'tenure_years', 'salary_percentile', 'high_performer', 
+    'low_engagement', 'poor_manager_relationship', 'poor_work_life_balance',
+    'recent_promotion'
+]
+TENURE_FEATURE_INDEX = RETENTION_FEATURES.index('tenure_years')
+
+# Retention features that trigger targeted recommendations, one bit each
+FACTOR_BITS = {
+    'low_engagement': 1,
+    'poor_manager_relationship': 2,
+    'poor_work_life_balance': 4,
+    'tenure_years': 8,
+}
+
+# Recommendations per factor bit (tenure is handled separately since it depends on the value)
+RECOMMENDATIONS_BY_BIT = {
+    1: [
+        "Schedule one-on-one meeting to discuss engagement concerns",
+        "Consider role adjustment or new challenges",
+        "Explore professional development opportunities"
+    ],
+    2: [
+        "Facilitate manager-employee relationship coaching",
+        "Consider team or manager reassignment if appropriate",
+        "Provide conflict resolution support"
+    ],
+    4: [
+        "Review workload and redistribute if necessary",
+        "Discuss flexible work arrangements",
+        "Promote wellness programs and time-off usage"
+    ],
+}
+
+# Upper edges of the age groups <25, 25-35, 35-45, 45-55, 55+ (coded 0-4)
+AGE_GROUP_EDGES = np.array([25, 35, 45, 55], dtype=np.int16)
+
+# Trained models are persisted here so a restart doesn't retrain on the first request
+MODEL_STORE_PATH = Path(__file__).resolve().parent.parent / "predictive_models.joblib"
+
+# Trees the retention forest starts with (and is reset to once it hits the cap)
+RETENTION_BASE_ESTIMATORS = 100
+
+# Trees added to the retention forest on each warm-started retrain
+RETRAIN_EXTRA_ESTIMATORS = 20
+
+# Forest size past which a retrain refits from scratch, bounding model file size and prediction latency
+MAX_ESTIMATORS = 300
+
+# Tenure bucket edges in years: short (<1), medium (1-5), long (5+)
+TENURE_BUCKET_EDGES = np.array([1, 5], dtype=np.float64)
+
+# How long predictions for an unchanged employee payload are reused
+PREDICTION_CACHE_TTL = timedelta(minutes=15)
+
+# Department salary aggregates kept for repeat analyses of the same snapshot
+SALARY_STATS_CACHE_SIZE = 8
+
+# Most workforce insights kept in memory; the oldest are evicted beyond this
+MAX_INSIGHTS = 1000
+
+# Employee fields the analyses treat as numbers
+NUMERIC_FIELDS = [
+    'salary', 'age', 'performance_rating', 'engagement_score',
+    'manager_rating', 'work_life_balance', 'salary_satisfaction', 'tenure_years'
+]
+
+# Columns the aggregations scan repeatedly, held as float32 (HR values need no float64 precision)
+FLOAT32_FIELDS = frozenset({'salary', 'tenure_years'})
+
+def _employee_frame(employee_data: List[Dict[str, Any]]) -> pd.DataFrame:
+    """Build a DataFrame from employee dicts with numeric fields typed up front"""
+    # JSON payloads can carry numbers as strings/nulls; coerce once so later
+    # groupby/rank/comparisons run on numeric dtypes rather than object columns
+    df = pd.DataFrame.from_records(employee_data)
+    for col in NUMERIC_FIELDS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce', downcast='float' if col in FLOAT32_FIELDS else None)
+    # Department is the groupby key everywhere; integer category codes group without string hashing
+    if 'department' in df.columns:
+        df['department'] = df['department'].astype('category')
+    return df
+
+def _department_names(df: pd.DataFrame) -> List[str]:
+    """Distinct departments in the frame (category metadata when department is categorical)"""
+    if 'department' not in df.columns:
+        return []
+    departments = df['department']
+    if isinstance(departments.dtype, pd.CategoricalDtype):
+        return departments.cat.categories.tolist()
+    return departments.unique().tolist()
+
+def _payload_key(payload: Any) -> str:
+    """Stable content hash of a JSON-like payload"""
+    data = orjson.dumps(payload, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS, default=str)
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+def _ensure_tenure(df: pd.DataFrame, now_ts: pd.Timestamp) -> None:
+    """Derive tenure_days/tenure_years from hire_date, parsing it at most once per frame"""
+    if 'tenure_days' in df.columns or 'hire_date' not in df.columns:
+        return
+    hire_date = pd.to_datetime(df['hire_date'], errors='coerce', format='ISO8601', cache=True)
+    df['tenure_days'] = (now_ts - hire_date).dt.days
+    df['tenure_years'] = (df['tenure_days'] / 365.25).astype(np.float32)
+
 class PredictionType(Enum):
     RETENTION_RISK = "retention_risk"
     PERFORMANCE_FORECAST = "performance_forecast"
@@ -35,7 +156,7 @@ class RiskLevel(Enum):
     HIGH = "high"
     CRITICAL = "critical"
 
-@dataclass
+@dataclass(slots=True)
 class PredictionResult:
     prediction_id: str
     employee_id: Optional[str]
@@ -49,8 +170,24 @@ class PredictionResult:
     prediction_date: datetime
     valid_until: datetime
     metadata: Dict[str, Any]
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "prediction_id": self.prediction_id,
+            "employee_id": self.employee_id,
+            "department": self.department,
+            "prediction_type": self.prediction_type.value,
+            "risk_level": self.risk_level.value,
+            "confidence_score": self.confidence_score,
+            "predicted_value": self.predicted_value,
+            "contributing_factors": self.contributing_factors,
+            "recommendations": self.recommendations,
+            "prediction_date": self.prediction_date.isoformat(),
+            "valid_until": self.valid_until.isoformat(),
+            "metadata": self.metadata
+        }
 
-@dataclass
+@dataclass(slots=True)
 class ModelMetrics:
     model_id: str
     model_type: str
@@ -61,8 +198,21 @@ class ModelMetrics:
     last_trained: datetime
     training_samples: int
     feature_importance: Dict[str, float]
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "model_id": self.model_id,
+            "model_type": self.model_type,
+            "accuracy": self.accuracy,
+            "precision": self.precision,
+            "recall": self.recall,
+            "f1_score": self.f1_score,
+            "last_trained": self.last_trained.isoformat(),
+            "training_samples": self.training_samples,
+            "feature_importance": self.feature_importance
+        }
 
-@dataclass
+@dataclass(slots=True)
 class WorkforceInsight:
     insight_id: str
     title: str
@@ -74,6 +224,33 @@ class WorkforceInsight:
     trend_data: Dict[str, Any]
     recommendations: List[str]
     generated_date: datetime
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "insight_id": self.insight_id,
+            "title": self.title,
+            "description": self.description,
+            "insight_type": self.insight_type,
+            "impact_level": self.impact_level.value,
+            "affected_employees": self.affected_employees,
+            "departments": self.departments,
+            "trend_data": self.trend_data,
+            "recommendations": self.recommendations,
+            "generated_date": self.generated_date.isoformat()
+        }
+
+@dataclass(slots=True)
+class RetentionRuleInputs:
+    """Fields the rule-based retention assessment reads, with its defaults"""
+    engagement_score: float = 5
+    performance_rating: float = 5
+    tenure_years: float = 1
+    salary_satisfaction: float = 5
+    work_life_balance: float = 5
+    
+    @classmethod
+    def from_employee(cls, employee: Mapping[str, Any]) -> 'RetentionRuleInputs':
+        return cls(**{name: employee[name] for name in cls.__slots__ if name in employee})
 
 class PredictiveAnalyticsAgent:
     def __init__(self):
@@ -81,24 +258,50 @@ class PredictiveAnalyticsAgent:
         self.models: Dict[str, Any] = {}
         self.model_metrics: Dict[str, ModelMetrics] = {}
         self.insights: Dict[str, WorkforceInsight] = {}
+        # Secondary indexes (filter value -> ids) kept in step with predictions/insights
+        self._predictions_by_type: Dict[PredictionType, set] = {}
+        self._predictions_by_employee: Dict[str, set] = {}
+        self._predictions_by_department: Dict[str, set] = {}
+        self._prediction_expiry: List[Tuple[datetime, str]] = []  # min-heap on valid_until
+        self._insights_by_type: Dict[str, set] = {}
+        # Serialized form of each stored prediction/insight, built once at insert time
+        self._prediction_rows: Dict[str, Dict[str, Any]] = {}
+        self._insight_rows: Dict[str, Dict[str, Any]] = {}
+        self._model_performance: Optional[Dict[str, Any]] = None
         self.scalers: Dict[str, StandardScaler] = {}
         self.encoders: Dict[str, Dict[str, LabelEncoder]] = {}
-        self._initialize_models()
+        # payload hash -> (expires_at, prediction_ids)
+        self._prediction_cache: Dict[str, Tuple[datetime, List[str]]] = {}
+        # IDs are a random per-process prefix plus a counter (unique without a urandom call each)
+        self._id_prefix = secrets.token_hex(8)
+        self._id_counter = itertools.count()
+        # (row count, department/salary content hash) -> per-department salary stats
+        self._salary_stats_cache: 'OrderedDict[Tuple[int, str], pd.DataFrame]' = OrderedDict()
+        self._salary_stats_lock = threading.Lock()
+        if not self._load_models():
+            self._initialize_models()
+    
+    def _next_id(self) -> str:
+        """Generate a prediction/insight ID"""
+        return f"{self._id_prefix}{next(self._id_counter):016x}"
     
     def _initialize_models(self):
         """Initialize predictive models"""
         
-        # Retention Risk Model
+        # Retention Risk Model (warm_start: retrains add trees instead of refitting all)
         self.models['retention_risk'] = RandomForestClassifier(
-            n_estimators=100,
+            n_estimators=RETENTION_BASE_ESTIMATORS,
             max_depth=10,
+            n_jobs=-1,
+            warm_start=True,
             random_state=42
         )
         
         # Performance Forecast Model
-        self.models['performance_forecast'] = GradientBoostingRegressor(
-            n_estimators=100,
+        self.models['performance_forecast'] = HistGradientBoostingRegressor(
+            max_iter=100,
             max_depth=6,
+            early_stopping=True,
             random_state=42
         )
         
@@ -106,102 +309,169 @@ class PredictiveAnalyticsAgent:
         self.models['engagement_prediction'] = RandomForestClassifier(
             n_estimators=100,
             max_depth=8,
+            n_jobs=-1,
             random_state=42
         )
         
-        # Initialize scalers and encoders
+        # Initialize encoders (no scalers: tree ensembles are scale-invariant, so
+        # self.scalers is only for future linear/distance-based models)
         for model_name in self.models.keys():
-            self.scalers[model_name] = StandardScaler()
             self.encoders[model_name] = {}
     
+    def _load_models(self) -> bool:
+        """Load previously trained models from disk"""
+        try:
+            self.models, self.scalers, self.encoders, self.model_metrics = joblib.load(MODEL_STORE_PATH)
+            return True
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            logger.warning("Error loading predictive models from %s: %s", MODEL_STORE_PATH, e)
+            return False
+    
+    def _save_models(self):
+        """Persist trained models to disk"""
+        # Write to a temp file of our own and swap it in, so a crash never leaves a
+        # truncated store and concurrent workers never write the same file
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=MODEL_STORE_PATH.parent, prefix=MODEL_STORE_PATH.name, suffix='.tmp')
+            os.close(fd)
+            joblib.dump((self.models, self.scalers, self.encoders, self.model_metrics), tmp_path, compress=3)
+            os.replace(tmp_path, MODEL_STORE_PATH)
+        except Exception as e:
+            logger.warning("Error saving predictive models to %s: %s", MODEL_STORE_PATH, e)
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    
     async def predict_retention_risk(self, employee_data: List[Dict[str, Any]]) -> List[str]:
         """Predict retention risk for employees"""
+        
+        # Repeat calls with the same employee data reuse the earlier predictions
+        cache_key = _payload_key(employee_data)
+        now = datetime.now()
+        cached = self._prediction_cache.get(cache_key)
+        if cached and cached[0] > now and all(pid in self.predictions for pid in cached[1]):
+            return list(cached[1])
+        
+        prediction_ids = await self._predict_retention_risk(employee_data)
+        
+        self._prediction_cache = {k: v for k, v in self._prediction_cache.items() if v[0] > now}
+        self._prediction_cache[cache_key] = (now + PREDICTION_CACHE_TTL, prediction_ids)
+        return list(prediction_ids)
+    
+    async def _predict_retention_risk(self, employee_data: List[Dict[str, Any]]) -> List[str]:
         prediction_ids = []
         
         # Prepare data for prediction
-        df = pd.DataFrame(employee_data)
+        df = _employee_frame(employee_data)
         
         if len(df) < 10:  # Need minimum data for meaningful predictions
             return await self._generate_rule_based_retention_predictions(employee_data)
         
+        # One timestamp for the whole batch (features, prediction dates, expiry)
+        now = datetime.now()
+        
         # Feature engineering
-        features = self._engineer_retention_features(df)
+        features = self._engineer_retention_features(df, pd.Timestamp(now))
         
         # Train model if not already trained or needs retraining
         if 'retention_risk' not in self.model_metrics or self._needs_retraining('retention_risk'):
+            # Cached predictions came from the old model
+            self._prediction_cache.clear()
             await self._train_retention_model(features)
         
-        # Make predictions
+        # Score all employees in one predict_proba call
+        X = self._retention_matrix(features)
+        risk_probs = self.models['retention_risk'].predict_proba(X)
+        
+        # Build a prediction per employee from its row of the batch
+        failed = []
+        first_error = None
         for idx, employee in enumerate(employee_data):
             try:
-                prediction_id = await self._predict_employee_retention(employee, features.iloc[idx])
+                prediction_id = await self._predict_employee_retention(
+                    employee, X[idx], risk_probs[idx], now
+                )
                 prediction_ids.append(prediction_id)
             except Exception as e:
-                print(f"Error predicting retention for employee {employee.get('employee_id', 'unknown')}: {e}")
+                failed.append(employee.get('employee_id', 'unknown'))
+                first_error = first_error or e
                 continue
         
+        # One log record per batch rather than a stdout write per failed employee
+        if failed:
+            logger.warning("Retention prediction failed for %d employee(s): %s",
+                           len(failed), failed[:20], exc_info=first_error)
+        
         return prediction_ids
     
-    def _engineer_retention_features(self, df: pd.DataFrame) -> pd.DataFrame:
+    def _engineer_retention_features(self, df: pd.DataFrame, now_ts: pd.Timestamp) -> pd.DataFrame:
         """Engineer features for retention prediction"""
-        features = df.copy()
+        # Only the engineered columns are kept; inputs are read from df directly
+        features = pd.DataFrame(index=df.index)
         
         # Calculate tenure
-        if 'hire_date' in features.columns:
-            features['hire_date'] = pd.to_datetime(features['hire_date'], errors='coerce')
-            features['tenure_days'] = (datetime.now() - features['hire_date']).dt.days
-            features['tenure_years'] = features['tenure_days'] / 365.25
+        if 'hire_date' in df.columns:
+            _ensure_tenure(df, now_ts)
+            features['tenure_years'] = df['tenure_years']
         else:
             features['tenure_years'] = 1.0  # Default
         
         # Salary percentile within department
-        if 'salary' in features.columns and 'department' in features.columns:
-            features['salary_percentile'] = features.groupby('department')['salary'].rank(pct=True)
+        if 'salary' in df.columns and 'department' in df.columns:
+            features['salary_percentile'] = df.groupby('department', observed=True)['salary'].rank(pct=True)
         else:
             features['salary_percentile'] = 0.5  # Default
         
         # Age groups
-        if 'age' in features.columns:
-            features['age_group'] = pd.cut(features['age'], 
-                                         bins=[0, 25, 35, 45, 55, 100], 
-                                         labels=['<25', '25-35', '35-45', '45-55', '55+'])
+        if 'age' in df.columns:
+            features['age_group'] = np.searchsorted(AGE_GROUP_EDGES, df['age'].to_numpy()).astype(np.int8)
         else:
-            features['age_group'] = '25-35'  # Default
+            features['age_group'] = 1  # Default (25-35)
         
         # Performance indicators
-        if 'performance_rating' in features.columns:
-            features['high_performer'] = (features['performance_rating'] >= 4).astype(int)
+        if 'performance_rating' in df.columns:
+            features['high_performer'] = (df['performance_rating'] >= 4).astype(int)
         else:
             features['high_performer'] = 1  # Default
         
         # Engagement indicators
-        if 'engagement_score' in features.columns:
-            features['low_engagement'] = (features['engagement_score'] < 3).astype(int)
+        if 'engagement_score' in df.columns:
+            features['low_engagement'] = (df['engagement_score'] < 3).astype(int)
         else:
             features['low_engagement'] = 0  # Default
         
         # Manager relationship
-        if 'manager_rating' in features.columns:
-            features['poor_manager_relationship'] = (features['manager_rating'] < 3).astype(int)
+        if 'manager_rating' in df.columns:
+            features['poor_manager_relationship'] = (df['manager_rating'] < 3).astype(int)
         else:
             features['poor_manager_relationship'] = 0  # Default
         
         # Work-life balance
-        if 'work_life_balance' in features.columns:
-            features['poor_work_life_balance'] = (features['work_life_balance'] < 3).astype(int)
+        if 'work_life_balance' in df.columns:
+            features['poor_work_life_balance'] = (df['work_life_balance'] < 3).astype(int)
         else:
             features['poor_work_life_balance'] = 0  # Default
         
         # Recent promotion
-        if 'last_promotion_date' in features.columns:
-            features['last_promotion_date'] = pd.to_datetime(features['last_promotion_date'], errors='coerce')
-            features['months_since_promotion'] = (datetime.now() - features['last_promotion_date']).dt.days / 30.44
+        if 'last_promotion_date' in df.columns:
+            last_promotion = pd.to_datetime(df['last_promotion_date'], errors='coerce', format='ISO8601', cache=True)
+            features['months_since_promotion'] = (now_ts - last_promotion).dt.days / 30.44
             features['recent_promotion'] = (features['months_since_promotion'] <= 12).astype(int)
         else:
             features['recent_promotion'] = 0  # Default
         
         return features
     
+    def _retention_matrix(self, features: pd.DataFrame) -> np.ndarray:
+        """Slice the engineered features into the model's column order as a float matrix"""
+        # _engineer_retention_features always emits every RETENTION_FEATURES column,
+        # so positions resolve directly and one fancy-index replaces reindex + fillna
+        col_idx = features.columns.get_indexer(RETENTION_FEATURES)
+        X = features.to_numpy(dtype=np.float64)[:, col_idx]
+        return np.nan_to_num(X, copy=False, nan=0.0)
+    
     async def _train_retention_model(self, features: pd.DataFrame):
         """Train the retention risk model"""
         
@@ -210,11 +480,7 @@ class PredictiveAnalyticsAgent:
         target = self._generate_synthetic_retention_target(features)
         
         # Select features for training
-        feature_columns = [
-            'tenure_years', 'salary_percentile', 'high_performer', 
-            'low_engagement', 'poor_manager_relationship', 'poor_work_life_balance',
-            'recent_promotion'
-        ]
+        feature_columns = RETENTION_FEATURES
         
         # Ensure all feature columns exist
         for col in feature_columns:
@@ -225,20 +491,24 @@ class PredictiveAnalyticsAgent:
         y = target
         
         # Encode categorical variables if any
-        categorical_columns = X.select_dtypes(include=['object']).columns
+        categorical_columns = X.select_dtypes(include=['object', 'category']).columns
         for col in categorical_columns:
-            if col not in self.encoders['retention_risk']:
-                self.encoders['retention_risk'][col] = LabelEncoder()
-            X[col] = self.encoders['retention_risk'][col].fit_transform(X[col].astype(str))
-        
-        # Scale features
-        X_scaled = self.scalers['retention_risk'].fit_transform(X)
-        
-        # Train model
-        self.models['retention_risk'].fit(X_scaled, y)
+            X[col] = self._encode_categorical('retention_risk', col, X[col].astype(str).to_numpy())
+        
+        # Train model (tree ensembles are scale-invariant, so features go in unscaled)
+        X_train = X.to_numpy(dtype=np.float64)
+        model = self.models['retention_risk']
+        if hasattr(model, 'estimators_'):
+            if model.n_estimators + RETRAIN_EXTRA_ESTIMATORS > MAX_ESTIMATORS:
+                # At the cap: drop the old trees and refit a base-sized forest on current data
+                model = self.models['retention_risk'] = clone(model).set_params(n_estimators=RETENTION_BASE_ESTIMATORS)
+            else:
+                # Already fitted: warm_start keeps the existing trees and fits only the new ones
+                model.n_estimators += RETRAIN_EXTRA_ESTIMATORS
+        model.fit(X_train, y)
         
         # Calculate metrics
-        y_pred = self.models['retention_risk'].predict(X_scaled)
+        y_pred = self.models['retention_risk'].predict(X_train)
         accuracy = accuracy_score(y, y_pred)
         
         # Store model metrics
@@ -255,58 +525,65 @@ class PredictiveAnalyticsAgent:
             training_samples=len(X),
             feature_importance=feature_importance
         )
+        self._model_performance = None
+        
+        await asyncio.to_thread(self._save_models)
+    
+    def _encode_categorical(self, model_name: str, col: str, values: np.ndarray) -> np.ndarray:
+        """Label-encode a column, reusing the cached classes when every value is already known"""
+        encoder = self.encoders[model_name].get(col)
+        if encoder is not None:
+            # classes_ is sorted, so known values resolve with a binary search and no re-sort
+            classes = encoder.classes_
+            codes = np.searchsorted(classes, values)
+            if len(classes) and (codes < len(classes)).all() and (classes[codes] == values).all():
+                return codes
+        else:
+            encoder = self.encoders[model_name][col] = LabelEncoder()
+        
+        # New categories: refit (this is the only path that sorts the uniques)
+        return encoder.fit_transform(values)
     
     def _generate_synthetic_retention_target(self, features: pd.DataFrame) -> np.ndarray:
         """Generate synthetic retention target for training"""
-        # This creates a realistic retention risk based on common factors
-        risk_score = 0
+        # This creates a realistic retention risk based on common factors.
+        # Every factor present contributes a 0.1 baseline plus an extra amount
+        # where its condition holds; the extras are added in place on one array.
+        columns = features.columns
+        
+        # Add some randomness
+        risk_score = np.random.normal(0, 0.1, len(features))
         
         # Tenure factor (U-shaped curve - new and very long tenure employees at higher risk)
-        if 'tenure_years' in features.columns:
-            tenure_risk = np.where(
-                (features['tenure_years'] < 1) | (features['tenure_years'] > 10),
-                0.3, 0.1
-            )
-            risk_score += tenure_risk
+        if 'tenure_years' in columns:
+            tenure = features['tenure_years'].to_numpy()
+            risk_score[(tenure < 1) | (tenure > 10)] += 0.2
         
         # Performance factor
-        if 'high_performer' in features.columns:
-            performance_risk = np.where(features['high_performer'] == 0, 0.4, 0.1)
-            risk_score += performance_risk
+        if 'high_performer' in columns:
+            risk_score[features['high_performer'].to_numpy() == 0] += 0.3
         
         # Engagement factor
-        if 'low_engagement' in features.columns:
-            engagement_risk = np.where(features['low_engagement'] == 1, 0.5, 0.1)
-            risk_score += engagement_risk
+        if 'low_engagement' in columns:
+            risk_score[features['low_engagement'].to_numpy() == 1] += 0.4
         
         # Manager relationship factor
-        if 'poor_manager_relationship' in features.columns:
-            manager_risk = np.where(features['poor_manager_relationship'] == 1, 0.3, 0.1)
-            risk_score += manager_risk
+        if 'poor_manager_relationship' in columns:
+            risk_score[features['poor_manager_relationship'].to_numpy() == 1] += 0.2
         
-        # Add some randomness
-        risk_score += np.random.normal(0, 0.1, len(features))
+        risk_score += 0.1 * sum(
+            col in columns
+            for col in ('tenure_years', 'high_performer', 'low_engagement', 'poor_manager_relationship')
+        )
         
         # Convert to binary target (1 = high retention risk)
-        return (risk_score > 0.5).astype(int)
+        return (risk_score > 0.5).view(np.int8)
     
     async def _predict_employee_retention(self, employee: Dict[str, Any], 
-                                        features: pd.Series) -> str:
-        """Predict retention risk for a single employee"""
-        
-        # Prepare features
-        feature_columns = [
-            'tenure_years', 'salary_percentile', 'high_performer', 
-            'low_engagement', 'poor_manager_relationship', 'poor_work_life_balance',
-            'recent_promotion'
-        ]
-        
-        X = np.array([[features.get(col, 0) for col in feature_columns]])
-        X_scaled = self.scalers['retention_risk'].transform(X)
-        
-        # Make prediction
-        risk_prob = self.models['retention_risk'].predict_proba(X_scaled)[0]
-        risk_prediction = self.models['retention_risk'].predict(X_scaled)[0]
+                                        feature_values: np.ndarray,
+                                        risk_prob: np.ndarray,
+                                        now: datetime) -> str:
+        """Build the retention prediction for one employee from its batch-scored row"""
         
         # Determine risk level
         high_risk_prob = risk_prob[1] if len(risk_prob) > 1 else risk_prob[0]
@@ -324,13 +601,14 @@ class PredictiveAnalyticsAgent:
         feature_importance = self.model_metrics['retention_risk'].feature_importance
         contributing_factors = []
         
-        for i, col in enumerate(feature_columns):
-            factor_value = X[0][i]
+        for i, col in enumerate(RETENTION_FEATURES):
+            factor_value = feature_values[i]
             importance = feature_importance.get(col, 0)
             
             if importance > 0.1:  # Only include significant factors
                 contributing_factors.append({
                     "factor": col.replace('_', ' ').title(),
+                    "feature": col,
                     "value": factor_value,
                     "importance": importance,
                     "impact": "negative" if factor_value > 0.5 else "positive"
@@ -338,11 +616,11 @@ class PredictiveAnalyticsAgent:
         
         # Generate recommendations
         recommendations = self._generate_retention_recommendations(
-            employee, features, contributing_factors
+            employee, feature_values[TENURE_FEATURE_INDEX], contributing_factors
         )
         
         # Create prediction result
-        prediction_id = str(uuid.uuid4())
+        prediction_id = self._next_id()
         prediction = PredictionResult(
             prediction_id=prediction_id,
             employee_id=employee.get('employee_id'),
@@ -353,8 +631,8 @@ class PredictiveAnalyticsAgent:
             predicted_value={"retention_risk_probability": high_risk_prob},
             contributing_factors=contributing_factors,
             recommendations=recommendations,
-            prediction_date=datetime.now(),
-            valid_until=datetime.now() + timedelta(days=90),
+            prediction_date=now,
+            valid_until=now + timedelta(days=90),
             metadata={
                 "model_version": "v1",
                 "employee_name": employee.get('name', 'Unknown'),
@@ -362,41 +640,21 @@ class PredictiveAnalyticsAgent:
             }
         )
         
-        self.predictions[prediction_id] = prediction
+        self._store_prediction(prediction)
         return prediction_id
     
     def _generate_retention_recommendations(self, employee: Dict[str, Any], 
-                                          features: pd.Series,
+                                          tenure: float,
                                           contributing_factors: List[Dict[str, Any]]) -> List[str]:
         """Generate retention recommendations based on risk factors"""
-        recommendations = []
-        
         # Analyze contributing factors
-        factor_names = [f["factor"].lower() for f in contributing_factors]
-        
-        if "low engagement" in factor_names:
-            recommendations.extend([
-                "Schedule one-on-one meeting to discuss engagement concerns",
-                "Consider role adjustment or new challenges",
-                "Explore professional development opportunities"
-            ])
+        mask = 0
+        for factor in contributing_factors:
+            mask |= FACTOR_BITS.get(factor.get("feature"), 0)
         
-        if "poor manager relationship" in factor_names:
-            recommendations.extend([
-                "Facilitate manager-employee relationship coaching",
-                "Consider team or manager reassignment if appropriate",
-                "Provide conflict resolution support"
-            ])
+        recommendations = [rec for bit, recs in RECOMMENDATIONS_BY_BIT.items() if mask & bit for rec in recs]
         
-        if "poor work life balance" in factor_names:
-            recommendations.extend([
-                "Review workload and redistribute if necessary",
-                "Discuss flexible work arrangements",
-                "Promote wellness programs and time-off usage"
-            ])
-        
-        if "tenure years" in factor_names:
-            tenure = features.get('tenure_years', 1)
+        if mask & FACTOR_BITS['tenure_years']:
             if tenure < 1:
                 recommendations.extend([
                     "Enhance onboarding and mentorship programs",
@@ -423,30 +681,34 @@ class PredictiveAnalyticsAgent:
                                                        employee_data: List[Dict[str, Any]]) -> List[str]:
         """Generate rule-based retention predictions when insufficient data for ML"""
         prediction_ids = []
+        now = datetime.now()
         
         for employee in employee_data:
+            # Read the rule inputs once into slotted fields
+            row = RetentionRuleInputs.from_employee(employee)
+            
             # Simple rule-based assessment
             risk_factors = 0
             
             # Check engagement
-            if employee.get('engagement_score', 5) < 3:
+            if row.engagement_score < 3:
                 risk_factors += 2
             
             # Check performance
-            if employee.get('performance_rating', 5) < 3:
+            if row.performance_rating < 3:
                 risk_factors += 2
             
             # Check tenure (new employees and very long tenure)
-            tenure_years = employee.get('tenure_years', 1)
+            tenure_years = row.tenure_years
             if tenure_years < 0.5 or tenure_years > 15:
                 risk_factors += 1
             
             # Check salary satisfaction
-            if employee.get('salary_satisfaction', 5) < 3:
+            if row.salary_satisfaction < 3:
                 risk_factors += 1
             
             # Check work-life balance
-            if employee.get('work_life_balance', 5) < 3:
+            if row.work_life_balance < 3:
                 risk_factors += 1
             
             # Determine risk level
@@ -460,7 +722,7 @@ class PredictiveAnalyticsAgent:
                 risk_level = RiskLevel.LOW
             
             # Create prediction
-            prediction_id = str(uuid.uuid4())
+            prediction_id = self._next_id()
             prediction = PredictionResult(
                 prediction_id=prediction_id,
                 employee_id=employee.get('employee_id'),
@@ -472,13 +734,13 @@ class PredictiveAnalyticsAgent:
                 contributing_factors=[
                     {"factor": "Rule-based assessment", "value": risk_factors, "importance": 1.0}
                 ],
-                recommendations=self._generate_retention_recommendations(employee, pd.Series(employee), []),
-                prediction_date=datetime.now(),
-                valid_until=datetime.now() + timedelta(days=30),
+                recommendations=self._generate_retention_recommendations(employee, row.tenure_years, []),
+                prediction_date=now,
+                valid_until=now + timedelta(days=30),
                 metadata={"method": "rule_based", "insufficient_data": True}
             )
             
-            self.predictions[prediction_id] = prediction
+            self._store_prediction(prediction)
             prediction_ids.append(prediction_id)
         
         return prediction_ids
@@ -487,12 +749,9 @@ class PredictiveAnalyticsAgent:
                                   historical_data: List[Dict[str, Any]]) -> str:
         """Predict hiring demand for departments"""
         
-        # Analyze historical trends
-        df = pd.DataFrame(historical_data)
-        
-        # Calculate turnover rate
-        total_employees = len(df)
-        terminated_employees = len(df[df.get('status') == 'terminated'])
+        # Calculate turnover rate (a straight count over the records; no DataFrame needed)
+        total_employees = len(historical_data)
+        terminated_employees = [record.get('status') for record in historical_data].count('terminated')
         turnover_rate = terminated_employees / total_employees if total_employees > 0 else 0
         
         # Calculate growth rate
@@ -530,7 +789,8 @@ class PredictiveAnalyticsAgent:
             ])
         
         # Create prediction
-        prediction_id = str(uuid.uuid4())
+        now = datetime.now()
+        prediction_id = self._next_id()
         prediction = PredictionResult(
             prediction_id=prediction_id,
             employee_id=None,
@@ -550,8 +810,8 @@ class PredictiveAnalyticsAgent:
                 {"factor": "Growth Rate", "value": growth_rate, "importance": 0.4}
             ],
             recommendations=recommendations,
-            prediction_date=datetime.now(),
-            valid_until=datetime.now() + timedelta(days=180),
+            prediction_date=now,
+            valid_until=now + timedelta(days=180),
             metadata={
                 "current_headcount": current_headcount,
                 "target_headcount": target_headcount,
@@ -559,59 +819,61 @@ class PredictiveAnalyticsAgent:
             }
         )
         
-        self.predictions[prediction_id] = prediction
+        self._store_prediction(prediction)
         return prediction_id
     
     async def generate_workforce_insights(self, employee_data: List[Dict[str, Any]]) -> List[str]:
         """Generate workforce insights and trends"""
-        insight_ids = []
-        
-        df = pd.DataFrame(employee_data)
+        df = _employee_frame(employee_data)
         
         if len(df) == 0:
-            return insight_ids
+            return []
+        
+        # One reference instant for every insight in this pass
+        now_ts = pd.Timestamp.now()
+        
+        # The analyzers only read df once tenure is derived, so they can run side by
+        # side on worker threads (pandas/numpy release the GIL in their kernels)
+        _ensure_tenure(df, now_ts)
+        analyses = []
         
         # Insight 1: Retention Risk by Department
         if 'department' in df.columns:
-            dept_retention_insight = await self._analyze_department_retention_risk(df)
-            if dept_retention_insight:
-                insight_ids.append(dept_retention_insight)
+            analyses.append(asyncio.to_thread(self._analyze_department_retention_risk, df))
         
         # Insight 2: Performance Distribution
         if 'performance_rating' in df.columns:
-            performance_insight = await self._analyze_performance_distribution(df)
-            if performance_insight:
-                insight_ids.append(performance_insight)
+            analyses.append(asyncio.to_thread(self._analyze_performance_distribution, df))
         
         # Insight 3: Tenure Analysis
         if 'hire_date' in df.columns:
-            tenure_insight = await self._analyze_tenure_patterns(df)
-            if tenure_insight:
-                insight_ids.append(tenure_insight)
+            analyses.append(asyncio.to_thread(self._analyze_tenure_patterns, df, now_ts))
         
         # Insight 4: Compensation Equity
         if 'salary' in df.columns and 'department' in df.columns:
-            compensation_insight = await self._analyze_compensation_equity(df)
-            if compensation_insight:
-                insight_ids.append(compensation_insight)
+            analyses.append(asyncio.to_thread(self._analyze_compensation_equity, df))
+        
+        # Analyzers only build insights; storing them here keeps every write on the loop thread
+        insights = [insight for insight in await asyncio.gather(*analyses) if insight]
+        for insight in insights:
+            self._store_insight(insight)
+        self._evict_old_insights()
         
-        return insight_ids
+        return [insight.insight_id for insight in insights]
     
-    async def _analyze_department_retention_risk(self, df: pd.DataFrame) -> Optional[str]:
+    def _analyze_department_retention_risk(self, df: pd.DataFrame) -> Optional[WorkforceInsight]:
         """Analyze retention risk by department"""
         
-        # Calculate retention risk by department (simplified)
-        dept_risk = {}
-        for dept in df['department'].unique():
-            dept_employees = df[df['department'] == dept]
-            
-            # Simple risk calculation based on engagement and performance
-            low_engagement = len(dept_employees[dept_employees.get('engagement_score', 5) < 3])
-            low_performance = len(dept_employees[dept_employees.get('performance_rating', 5) < 3])
-            total = len(dept_employees)
-            
-            risk_score = (low_engagement + low_performance) / (total * 2) if total > 0 else 0
-            dept_risk[dept] = risk_score
+        # Calculate retention risk by department (simplified): share of low
+        # engagement and low performance flags, counted in one grouped pass
+        flags = df[['department']].assign(
+            low_engagement=(df['engagement_score'] < 3).astype(np.int8) if 'engagement_score' in df.columns else 0,
+            low_performance=(df['performance_rating'] < 3).astype(np.int8) if 'performance_rating' in df.columns else 0
+        )
+        grouped = flags.groupby('department', sort=False, observed=True)
+        counts = grouped[['low_engagement', 'low_performance']].sum()
+        dept_sizes = grouped.size()
+        dept_risk = ((counts['low_engagement'] + counts['low_performance']) / (dept_sizes * 2)).to_dict()
         
         # Find highest risk department
         if not dept_risk:
@@ -632,14 +894,14 @@ class PredictiveAnalyticsAgent:
             impact_level = RiskLevel.MEDIUM
         
         # Generate insight
-        insight_id = str(uuid.uuid4())
+        insight_id = self._next_id()
         insight = WorkforceInsight(
             insight_id=insight_id,
             title=f"High Retention Risk in {highest_risk_dept}",
             description=f"The {highest_risk_dept} department shows elevated retention risk with {highest_risk_score:.1%} of employees at risk",
             insight_type="retention_risk",
             impact_level=impact_level,
-            affected_employees=len(df[df['department'] == highest_risk_dept]),
+            affected_employees=int(dept_sizes[highest_risk_dept]),
             departments=[highest_risk_dept],
             trend_data={"department_risk_scores": dept_risk},
             recommendations=[
@@ -651,27 +913,29 @@ class PredictiveAnalyticsAgent:
             generated_date=datetime.now()
         )
         
-        self.insights[insight_id] = insight
-        return insight_id
+        return insight
     
-    async def _analyze_performance_distribution(self, df: pd.DataFrame) -> Optional[str]:
+    def _analyze_performance_distribution(self, df: pd.DataFrame) -> Optional[WorkforceInsight]:
         """Analyze performance rating distribution"""
         
-        performance_dist = df['performance_rating'].value_counts().sort_index()
+        # One sort-based pass gives the distinct ratings (fractional ones kept as-is)
+        # and their counts; both thresholds are then sums over that short array
+        ratings, counts = np.unique(df['performance_rating'].dropna().to_numpy(), return_counts=True)
+        performance_dist = dict(zip(ratings.tolist(), counts.tolist()))
         total_employees = len(df)
         
         # Check for concerning patterns
-        low_performers = len(df[df['performance_rating'] < 3])
+        low_performers = int(counts[ratings < 3].sum())
         low_performer_pct = low_performers / total_employees
         
-        high_performers = len(df[df['performance_rating'] >= 4])
+        high_performers = int(counts[ratings >= 4].sum())
         high_performer_pct = high_performers / total_employees
         
         # Generate insight if there's an issue
         if low_performer_pct > 0.2:  # More than 20% low performers
             impact_level = RiskLevel.HIGH if low_performer_pct > 0.3 else RiskLevel.MEDIUM
             
-            insight_id = str(uuid.uuid4())
+            insight_id = self._next_id()
             insight = WorkforceInsight(
                 insight_id=insight_id,
                 title="High Percentage of Low Performers",
@@ -679,9 +943,9 @@ class PredictiveAnalyticsAgent:
                 insight_type="performance_distribution",
                 impact_level=impact_level,
                 affected_employees=low_performers,
-                departments=list(df['department'].unique()) if 'department' in df.columns else [],
+                departments=_department_names(df),
                 trend_data={
-                    "performance_distribution": performance_dist.to_dict(),
+                    "performance_distribution": performance_dist,
                     "low_performer_percentage": low_performer_pct,
                     "high_performer_percentage": high_performer_pct
                 },
@@ -694,21 +958,20 @@ class PredictiveAnalyticsAgent:
                 generated_date=datetime.now()
             )
             
-            self.insights[insight_id] = insight
-            return insight_id
+            return insight
         
         return None
     
-    async def _analyze_tenure_patterns(self, df: pd.DataFrame) -> Optional[str]:
+    def _analyze_tenure_patterns(self, df: pd.DataFrame, now_ts: pd.Timestamp) -> Optional[WorkforceInsight]:
         """Analyze employee tenure patterns"""
         
-        df['hire_date'] = pd.to_datetime(df['hire_date'], errors='coerce')
-        df['tenure_years'] = (datetime.now() - df['hire_date']).dt.days / 365.25
+        _ensure_tenure(df, now_ts)
         
-        # Analyze tenure distribution
-        short_tenure = len(df[df['tenure_years'] < 1])  # Less than 1 year
-        medium_tenure = len(df[(df['tenure_years'] >= 1) & (df['tenure_years'] < 5)])
-        long_tenure = len(df[df['tenure_years'] >= 5])
+        # Analyze tenure distribution: <1 year, 1-5 years, 5+ years in one bucketing pass
+        tenure = df['tenure_years'].to_numpy(dtype=np.float64)
+        tenure = tenure[~np.isnan(tenure)]
+        buckets = np.bincount(np.searchsorted(TENURE_BUCKET_EDGES, tenure, side='right'), minlength=3)
+        short_tenure, medium_tenure, long_tenure = (int(count) for count in buckets)
         
         total = len(df)
         short_tenure_pct = short_tenure / total
@@ -717,7 +980,7 @@ class PredictiveAnalyticsAgent:
         if short_tenure_pct > 0.3:  # More than 30% with less than 1 year tenure
             impact_level = RiskLevel.HIGH if short_tenure_pct > 0.5 else RiskLevel.MEDIUM
             
-            insight_id = str(uuid.uuid4())
+            insight_id = self._next_id()
             insight = WorkforceInsight(
                 insight_id=insight_id,
                 title="High Early Career Turnover Risk",
@@ -725,7 +988,7 @@ class PredictiveAnalyticsAgent:
                 insight_type="tenure_analysis",
                 impact_level=impact_level,
                 affected_employees=short_tenure,
-                departments=list(df['department'].unique()) if 'department' in df.columns else [],
+                departments=_department_names(df),
                 trend_data={
                     "short_tenure_count": short_tenure,
                     "medium_tenure_count": medium_tenure,
@@ -741,38 +1004,41 @@ class PredictiveAnalyticsAgent:
                 generated_date=datetime.now()
             )
             
-            self.insights[insight_id] = insight
-            return insight_id
+            return insight
         
         return None
     
-    async def _analyze_compensation_equity(self, df: pd.DataFrame) -> Optional[str]:
+    def _analyze_compensation_equity(self, df: pd.DataFrame) -> Optional[WorkforceInsight]:
         """Analyze compensation equity across departments"""
         
-        # Calculate salary statistics by department
-        dept_salary_stats = df.groupby('department')['salary'].agg(['mean', 'median', 'std']).round(2)
-        
-        # Check for significant variations
-        overall_median = df['salary'].median()
-        equity_issues = []
+        # With fewer than two departments every median equals the overall one, so skip the groupby
+        if 'department' not in df.columns or 'salary' not in df.columns:
+            return None
+        if len(_department_names(df)) < 2:
+            return None
         
-        for dept in dept_salary_stats.index:
-            dept_median = dept_salary_stats.loc[dept, 'median']
-            dept_std = dept_salary_stats.loc[dept, 'std']
-            
-            # Check for significant deviation from overall median
-            deviation = abs(dept_median - overall_median) / overall_median
-            
-            if deviation > 0.2:  # More than 20% deviation
-                equity_issues.append({
-                    "department": dept,
-                    "median_salary": dept_median,
-                    "deviation": deviation,
-                    "std_dev": dept_std
-                })
+        # Calculate salary statistics by department
+        dept_salary_stats = self._department_salary_stats(df)
+        
+        # Check for significant deviation from the overall median (all departments at once)
+        overall_median = float(np.nanmedian(df['salary'].to_numpy(dtype=np.float64)))
+        deviation = (dept_salary_stats['median'] - overall_median).abs() / overall_median
+        flagged = dept_salary_stats[deviation > 0.2]  # More than 20% deviation
+        
+        equity_issues = [
+            {
+                "department": dept,
+                "median_salary": round(dept_median, 2),
+                "deviation": dept_deviation,
+                "std_dev": round(dept_std, 2)
+            }
+            for dept, dept_median, dept_deviation, dept_std in zip(
+                flagged.index, flagged['median'].tolist(), deviation[flagged.index].tolist(), flagged['std'].tolist()
+            )
+        ]
         
         if equity_issues:
-            insight_id = str(uuid.uuid4())
+            insight_id = self._next_id()
             insight = WorkforceInsight(
                 insight_id=insight_id,
                 title="Compensation Equity Concerns",
@@ -782,7 +1048,8 @@ class PredictiveAnalyticsAgent:
                 affected_employees=len(df),
                 departments=[issue["department"] for issue in equity_issues],
                 trend_data={
-                    "department_salary_stats": dept_salary_stats.to_dict(),
+                    # Rounded only here, when an insight is actually published
+                    "department_salary_stats": dept_salary_stats.round(2).reset_index().to_dict('records'),
                     "equity_issues": equity_issues,
                     "overall_median": overall_median
                 },
@@ -795,11 +1062,31 @@ class PredictiveAnalyticsAgent:
                 generated_date=datetime.now()
             )
             
-            self.insights[insight_id] = insight
-            return insight_id
+            return insight
         
         return None
     
+    def _department_salary_stats(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Per-department salary mean/median/std, reused while the inputs are unchanged"""
+        # Hashing the two columns is a single linear pass, much cheaper than the
+        # groupby + median/std it lets us skip on a repeat snapshot
+        hashed = pd.util.hash_pandas_object(df[['department', 'salary']], index=False)
+        key = (len(df), hashlib.blake2b(hashed.to_numpy().tobytes(), digest_size=16).hexdigest())
+        
+        with self._salary_stats_lock:
+            stats = self._salary_stats_cache.get(key)
+            if stats is not None:
+                self._salary_stats_cache.move_to_end(key)
+                return stats
+        
+        stats = df.groupby('department', observed=True)['salary'].agg(['mean', 'median', 'std'])
+        
+        with self._salary_stats_lock:
+            self._salary_stats_cache[key] = stats
+            if len(self._salary_stats_cache) > SALARY_STATS_CACHE_SIZE:
+                self._salary_stats_cache.popitem(last=False)
+        return stats
+    
     def _needs_retraining(self, model_name: str) -> bool:
         """Check if model needs retraining"""
         if model_name not in self.model_metrics:
@@ -811,83 +1098,100 @@ class PredictiveAnalyticsAgent:
         # Retrain if model is older than 30 days or accuracy is low
         return days_since_training > 30 or metrics.accuracy < 0.7
     
+    def _store_prediction(self, prediction: PredictionResult):
+        """Add a prediction and register it in the filter indexes"""
+        pid = prediction.prediction_id
+        self.predictions[pid] = prediction
+        self._prediction_rows[pid] = prediction.to_dict()
+        self._predictions_by_type.setdefault(prediction.prediction_type, set()).add(pid)
+        if prediction.employee_id:
+            self._predictions_by_employee.setdefault(prediction.employee_id, set()).add(pid)
+        if prediction.department:
+            self._predictions_by_department.setdefault(prediction.department, set()).add(pid)
+        heapq.heappush(self._prediction_expiry, (prediction.valid_until, pid))
+    
+    def _drop_expired_predictions(self, now: datetime):
+        """Remove predictions past valid_until, soonest-expiring first off the heap"""
+        expiry = self._prediction_expiry
+        while expiry and expiry[0][0] < now:
+            _, pid = heapq.heappop(expiry)
+            prediction = self.predictions.pop(pid, None)
+            if prediction is None:
+                continue
+            del self._prediction_rows[pid]
+            for index, key in ((self._predictions_by_type, prediction.prediction_type),
+                               (self._predictions_by_employee, prediction.employee_id),
+                               (self._predictions_by_department, prediction.department)):
+                ids = index.get(key)
+                if ids is not None:
+                    ids.discard(pid)
+                    if not ids:
+                        del index[key]
+    
+    def _store_insight(self, insight: WorkforceInsight):
+        """Add an insight and register it in the type index"""
+        self.insights[insight.insight_id] = insight
+        self._insight_rows[insight.insight_id] = insight.to_dict()
+        self._insights_by_type.setdefault(insight.insight_type, set()).add(insight.insight_id)
+    
+    def _evict_old_insights(self):
+        """Drop the oldest insights once more than MAX_INSIGHTS are stored"""
+        # self.insights is insertion-ordered, so the oldest come first
+        while len(self.insights) > MAX_INSIGHTS:
+            insight_id = next(iter(self.insights))
+            insight = self.insights.pop(insight_id)
+            del self._insight_rows[insight_id]
+            ids = self._insights_by_type.get(insight.insight_type)
+            if ids is not None:
+                ids.discard(insight_id)
+                if not ids:
+                    del self._insights_by_type[insight.insight_type]
+    
     def get_predictions(self, prediction_type: Optional[PredictionType] = None,
                        employee_id: Optional[str] = None,
-                       department: Optional[str] = None) -> List[Dict[str, Any]]:
-        """Get predictions with optional filtering"""
-        predictions = []
-        
-        for prediction in self.predictions.values():
-            # Apply filters
-            if prediction_type and prediction.prediction_type != prediction_type:
-                continue
-            if employee_id and prediction.employee_id != employee_id:
-                continue
-            if department and prediction.department != department:
-                continue
-            
-            # Check if prediction is still valid
-            if prediction.valid_until < datetime.now():
-                continue
-            
-            predictions.append({
-                "prediction_id": prediction.prediction_id,
-                "employee_id": prediction.employee_id,
-                "department": prediction.department,
-                "prediction_type": prediction.prediction_type.value,
-                "risk_level": prediction.risk_level.value,
-                "confidence_score": prediction.confidence_score,
-                "predicted_value": prediction.predicted_value,
-                "contributing_factors": prediction.contributing_factors,
-                "recommendations": prediction.recommendations,
-                "prediction_date": prediction.prediction_date.isoformat(),
-                "valid_until": prediction.valid_until.isoformat(),
-                "metadata": prediction.metadata
-            })
-        
-        return sorted(predictions, key=lambda x: x["prediction_date"], reverse=True)
+                       department: Optional[str] = None,
+                       limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Get predictions with optional filtering, newest first"""
+        now = datetime.now()
+        
+        # Expired predictions are dropped here so the store doesn't grow without bound
+        self._drop_expired_predictions(now)
+        
+        # Apply filters by intersecting the index sets, smallest first
+        matches = [
+            index.get(key, set())
+            for index, key in ((self._predictions_by_type, prediction_type),
+                               (self._predictions_by_employee, employee_id),
+                               (self._predictions_by_department, department))
+            if key
+        ]
+        if matches:
+            matches.sort(key=len)
+            rows = (self._prediction_rows[pid] for pid in matches[0].intersection(*matches[1:]))
+            if limit is not None:
+                return heapq.nlargest(limit, rows, key=itemgetter("prediction_date"))
+            return sorted(rows, key=itemgetter("prediction_date"), reverse=True)
+        
+        # Rows are stored as each prediction is made, so insertion order is date order
+        return list(itertools.islice(reversed(self._prediction_rows.values()), limit))
     
     def get_insights(self, insight_type: Optional[str] = None) -> List[Dict[str, Any]]:
         """Get workforce insights"""
-        insights = []
-        
-        for insight in self.insights.values():
-            if insight_type and insight.insight_type != insight_type:
-                continue
-            
-            insights.append({
-                "insight_id": insight.insight_id,
-                "title": insight.title,
-                "description": insight.description,
-                "insight_type": insight.insight_type,
-                "impact_level": insight.impact_level.value,
-                "affected_employees": insight.affected_employees,
-                "departments": insight.departments,
-                "trend_data": insight.trend_data,
-                "recommendations": insight.recommendations,
-                "generated_date": insight.generated_date.isoformat()
-            })
+        if insight_type:
+            insights = [self._insight_rows[iid] for iid in self._insights_by_type.get(insight_type, ())]
+        else:
+            insights = list(self._insight_rows.values())
         
         return sorted(insights, key=lambda x: x["generated_date"], reverse=True)
     
     def get_model_performance(self) -> Dict[str, Any]:
         """Get model performance metrics"""
-        performance = {}
-        
-        for model_name, metrics in self.model_metrics.items():
-            performance[model_name] = {
-                "model_id": metrics.model_id,
-                "model_type": metrics.model_type,
-                "accuracy": metrics.accuracy,
-                "precision": metrics.precision,
-                "recall": metrics.recall,
-                "f1_score": metrics.f1_score,
-                "last_trained": metrics.last_trained.isoformat(),
-                "training_samples": metrics.training_samples,
-                "feature_importance": metrics.feature_importance
+        # Metrics only change on (re)training, which clears this
+        if self._model_performance is None:
+            self._model_performance = {
+                model_name: metrics.to_dict() for model_name, metrics in self.model_metrics.items()
             }
-        
-        return performance
+        return self._model_performance
 
 # Global instance
 predictive_agent = PredictiveAnalyticsAgent()
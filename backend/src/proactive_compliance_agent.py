@@ -4,16 +4,67 @@ Monitors compliance requirements, sends alerts, tracks policy changes, and ensur
 """
 
 import asyncio
+import itertools
 import json
-import uuid
+import secrets
+import time
+from collections import Counter
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional, Tuple
 from dataclasses import dataclass, asdict
 from enum import Enum
-import requests
+from functools import lru_cache
+import numpy as np
+import pandas as pd
 from bs4 import BeautifulSoup
 import re
 
+# Seconds a built dashboard is served before it is rebuilt (mutations also clear it)
+DASHBOARD_CACHE_TTL = 5.0
+
+# Display form of each issue type the checks can report, used in alert titles
+ISSUE_TYPE_TITLES = {
+    issue_type: issue_type.replace('_', ' ').title()
+    for issue_type in (
+        "overtime_classification", "excessive_hours", "minimum_wage",
+        "missing_consent", "data_retention",
+        "missing_safety_training", "expired_safety_training",
+        "missing_termination_reason", "insufficient_notice",
+    )
+}
+
+# Statutory notice in weeks: one per year of tenure, at least 1, capped per country
+NOTICE_WEEKS_CAP = {
+    "UK": 12,  # 1-12 weeks based on tenure
+    "SG": 4,   # 1-4 weeks based on tenure
+    "AU": 5,   # 1-5 weeks based on tenure
+}
+
+@lru_cache(maxsize=4096)
+def _required_notice_days(country: str, tenure_years: float) -> int:
+    """Required notice in days for a country and tenure"""
+    if country == "US":
+        return 0  # At-will employment, no notice required
+    cap = NOTICE_WEEKS_CAP.get(country)
+    if cap is None:
+        return 14  # Default 2 weeks
+    return min(cap, max(1, tenure_years)) * 7
+
+def _employee_frame(employee_data: List[Dict[str, Any]]) -> pd.DataFrame:
+    """One row per employee, positionally aligned with employee_data"""
+    return pd.DataFrame.from_records(employee_data, index=pd.RangeIndex(len(employee_data)))
+
+def _column(df: pd.DataFrame, name: str, default: Any) -> pd.Series:
+    """A field as a column, with missing values (or a missing column) read as default"""
+    if name not in df.columns:
+        return pd.Series(default, index=df.index)
+    return df[name].fillna(default)
+
+def _days_since(values: pd.Series, now: pd.Timestamp) -> pd.Series:
+    """Whole days from each date to now; blank or unparseable dates give NaN"""
+    dates = pd.to_datetime(values, errors='coerce', format='ISO8601', cache=True)
+    return (now - dates).dt.days
+
 class ComplianceArea(Enum):
     EMPLOYMENT_LAW = "employment_law"
     DATA_PRIVACY = "data_privacy"
@@ -38,7 +89,7 @@ class ComplianceStatus(Enum):
     NON_COMPLIANT = "non_compliant"
     UNKNOWN = "unknown"
 
-@dataclass
+@dataclass(slots=True)
 class ComplianceRule:
     rule_id: str
     name: str
@@ -55,7 +106,7 @@ class ComplianceRule:
     last_updated: datetime
     active: bool
 
-@dataclass
+@dataclass(slots=True)
 class ComplianceAlert:
     alert_id: str
     rule_id: str
@@ -71,8 +122,11 @@ class ComplianceAlert:
     resolved: bool
     resolved_date: Optional[datetime]
     metadata: Dict[str, Any]
+    # ISO strings of the immutable dates, encoded once for get_alerts
+    created_iso: str = ""
+    deadline_iso: Optional[str] = None
 
-@dataclass
+@dataclass(slots=True)
 class ComplianceAssessment:
     assessment_id: str
     employee_id: Optional[str]
@@ -86,7 +140,7 @@ class ComplianceAssessment:
     assessed_date: datetime
     assessor: str
 
-@dataclass
+@dataclass(slots=True)
 class PolicyUpdate:
     update_id: str
     area: ComplianceArea
@@ -107,8 +161,28 @@ class ProactiveComplianceAgent:
         self.assessments: Dict[str, ComplianceAssessment] = {}
         self.policy_updates: Dict[str, PolicyUpdate] = {}
         self.monitoring_schedule: Dict[str, datetime] = {}
+        # IDs are a random per-process prefix plus a counter (unique without a urandom call each)
+        self._id_prefix = secrets.token_hex(8)
+        self._id_counter = itertools.count()
+        # Alert ids in creation order (dicts as ordered sets) backing the get_alerts filters
+        self._alerts_by_severity: Dict[AlertSeverity, Dict[str, None]] = {severity: {} for severity in AlertSeverity}
+        self._unresolved_alerts: Dict[str, None] = {}
+        # Running dashboard aggregates, updated as alerts and assessments change
+        self._alert_counts: Counter = Counter()
+        self._score_sum = 0.0
+        self._score_count = 0
+        # (built_at monotonic seconds, dashboard)
+        self._dashboard_cache: Optional[Tuple[float, Dict[str, Any]]] = None
+        # Active rules indexed for lookup (rebuilt by _reindex_rules whenever rules change)
+        self._active_rules_by_country_area: Dict[Tuple[str, ComplianceArea], List[ComplianceRule]] = {}
+        self._active_rules_by_country: Dict[str, List[ComplianceRule]] = {}
+        self._active_rules_by_area: Dict[ComplianceArea, List[ComplianceRule]] = {}
         self._initialize_compliance_rules()
     
+    def _next_id(self) -> str:
+        """Generate an alert/update/assessment ID"""
+        return f"{self._id_prefix}{next(self._id_counter):016x}"
+    
     def _initialize_compliance_rules(self):
         """Initialize compliance rules for different jurisdictions"""
         
@@ -229,120 +303,163 @@ class ProactiveComplianceAgent:
         self.compliance_rules[sg_employment_rule.rule_id] = sg_employment_rule
         self.compliance_rules[gdpr_rule.rule_id] = gdpr_rule
         self.compliance_rules[uk_employment_rule.rule_id] = uk_employment_rule
+        self._reindex_rules()
+    
+    def _reindex_rules(self):
+        """Rebuild the active-rule indexes from self.compliance_rules"""
+        by_country_area: Dict[Tuple[str, ComplianceArea], List[ComplianceRule]] = {}
+        by_country: Dict[str, List[ComplianceRule]] = {}
+        by_area: Dict[ComplianceArea, List[ComplianceRule]] = {}
+        for rule in self.compliance_rules.values():
+            if not rule.active:
+                continue
+            by_country_area.setdefault((rule.country, rule.area), []).append(rule)
+            by_country.setdefault(rule.country, []).append(rule)
+            by_area.setdefault(rule.area, []).append(rule)
+        self._active_rules_by_country_area = by_country_area
+        self._active_rules_by_country = by_country
+        self._active_rules_by_area = by_area
     
     async def monitor_compliance(self, employee_data: List[Dict[str, Any]]) -> List[str]:
         """Monitor compliance across all employees and generate alerts"""
         alert_ids = []
         
-        for employee in employee_data:
-            # Check each compliance area
-            for rule in self.compliance_rules.values():
-                if not rule.active:
-                    continue
-                
-                # Check if rule applies to employee's country
-                if rule.country != employee.get('country', 'US'):
-                    continue
-                
-                # Perform compliance check based on rule area
-                compliance_issues = await self._check_rule_compliance(rule, employee)
-                
-                # Generate alerts for issues found
-                for issue in compliance_issues:
-                    alert_id = await self._create_compliance_alert(
-                        rule, employee, issue
-                    )
-                    alert_ids.append(alert_id)
+        # The checks are CPU-only, so run them off the event loop
+        found = await asyncio.to_thread(self._find_compliance_issues, employee_data)
+        
+        # Generate alerts employee by employee (stable sort keeps rule and issue order)
+        found.sort(key=lambda item: item[0])
+        for pos, rule, issue in found:
+            alert_id = await self._create_compliance_alert(
+                rule, employee_data[pos], issue
+            )
+            alert_ids.append(alert_id)
         
         return alert_ids
     
-    async def _check_rule_compliance(self, rule: ComplianceRule, 
-                                   employee: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Check compliance for a specific rule and employee"""
+    def _find_compliance_issues(self, employee_data: List[Dict[str, Any]]) -> List[Tuple[int, ComplianceRule, Dict[str, Any]]]:
+        """Check every active rule against its employees, returning (position, rule, issue)"""
+        # Each rule is checked against all of its employees at once as column masks
+        df = _employee_frame(employee_data)
+        countries = _column(df, 'country', 'US').to_numpy()
+        found = []
+        
+        for country, rules in self._active_rules_by_country.items():
+            found.extend(self._check_country_rules(country, rules, employee_data, df, countries))
+        
+        return found
+    
+    def _check_country_rules(self, country: str, rules: List[ComplianceRule],
+                           employee_data: List[Dict[str, Any]],
+                           df: pd.DataFrame,
+                           countries: np.ndarray) -> List[Tuple[int, ComplianceRule, Dict[str, Any]]]:
+        """Check one country's rules against its employees; issues carry positions into employee_data"""
+        # Rules only apply to employees in the rule's country
+        positions = np.flatnonzero(countries == country)
+        if len(positions) == 0:
+            return []
+        
+        employees = [employee_data[pos] for pos in positions]
+        country_df = df.iloc[positions].reset_index(drop=True)
+        found = []
+        for rule in rules:
+            # Perform compliance check based on rule area
+            rule_issues = self._check_rule_compliance_batch(rule, employees, country_df)
+            found.extend((int(positions[idx]), rule, issue) for idx, issue in rule_issues)
+        return found
+    
+    def _check_rule_compliance_batch(self, rule: ComplianceRule,
+                                   employees: List[Dict[str, Any]],
+                                   df: pd.DataFrame) -> List[Tuple[int, Dict[str, Any]]]:
+        """Check compliance for a specific rule across employees (df rows align with employees)"""
         issues = []
         
         if rule.area == ComplianceArea.WAGE_HOUR:
-            issues.extend(await self._check_wage_hour_compliance(rule, employee))
+            issues.extend(self._check_wage_hour_compliance(rule, employees, df))
         elif rule.area == ComplianceArea.DATA_PRIVACY:
-            issues.extend(await self._check_data_privacy_compliance(rule, employee))
+            issues.extend(self._check_data_privacy_compliance(rule, employees, df))
         elif rule.area == ComplianceArea.EQUAL_OPPORTUNITY:
-            issues.extend(await self._check_equal_opportunity_compliance(rule, employee))
+            issues.extend(self._check_equal_opportunity_compliance(rule, employees, df))
         elif rule.area == ComplianceArea.WORKPLACE_SAFETY:
-            issues.extend(await self._check_safety_compliance(rule, employee))
+            issues.extend(self._check_safety_compliance(rule, employees, df))
         elif rule.area == ComplianceArea.TERMINATION:
-            issues.extend(await self._check_termination_compliance(rule, employee))
+            issues.extend(self._check_termination_compliance(rule, employees, df))
         
         return issues
     
-    async def _check_wage_hour_compliance(self, rule: ComplianceRule, 
-                                        employee: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def _check_wage_hour_compliance(self, rule: ComplianceRule, 
+                                  employees: List[Dict[str, Any]],
+                                  df: pd.DataFrame) -> List[Tuple[int, Dict[str, Any]]]:
         """Check wage and hour compliance"""
         issues = []
         
         # Check working hours
-        weekly_hours = employee.get('weekly_hours', 40)
-        if rule.country == "US" and weekly_hours > 40:
-            overtime_hours = weekly_hours - 40
-            if not employee.get('overtime_eligible', True):
-                issues.append({
+        weekly_hours = _column(df, 'weekly_hours', 40)
+        if rule.country == "US":
+            overtime_eligible = _column(df, 'overtime_eligible', True).astype(bool)
+            for idx in np.flatnonzero(((weekly_hours > 40) & ~overtime_eligible).to_numpy()):
+                issues.append((idx, {
                     "type": "overtime_classification",
                     "severity": AlertSeverity.CRITICAL,
-                    "description": f"Employee working {weekly_hours} hours/week but not eligible for overtime",
+                    "description": f"Employee working {employees[idx].get('weekly_hours', 40)} hours/week but not eligible for overtime",
                     "recommendation": "Review employee classification and ensure overtime eligibility"
-                })
+                }))
         
-        elif rule.country == "SG" and weekly_hours > 44:
-            issues.append({
-                "type": "excessive_hours",
-                "severity": AlertSeverity.WARNING,
-                "description": f"Employee working {weekly_hours} hours/week exceeds Singapore limit of 44",
-                "recommendation": "Reduce working hours or ensure proper overtime compensation"
-            })
+        elif rule.country == "SG":
+            for idx in np.flatnonzero((weekly_hours > 44).to_numpy()):
+                issues.append((idx, {
+                    "type": "excessive_hours",
+                    "severity": AlertSeverity.WARNING,
+                    "description": f"Employee working {employees[idx].get('weekly_hours', 40)} hours/week exceeds Singapore limit of 44",
+                    "recommendation": "Reduce working hours or ensure proper overtime compensation"
+                }))
         
         # Check minimum wage compliance
-        hourly_rate = employee.get('hourly_rate', 0)
-        if rule.country == "US" and hourly_rate < 7.25:  # Federal minimum wage
-            issues.append({
-                "type": "minimum_wage",
-                "severity": AlertSeverity.CRITICAL,
-                "description": f"Employee hourly rate ${hourly_rate} below federal minimum wage",
-                "recommendation": "Increase hourly rate to meet minimum wage requirements"
-            })
+        if rule.country == "US":
+            hourly_rate = _column(df, 'hourly_rate', 0)
+            for idx in np.flatnonzero((hourly_rate < 7.25).to_numpy()):  # Federal minimum wage
+                issues.append((idx, {
+                    "type": "minimum_wage",
+                    "severity": AlertSeverity.CRITICAL,
+                    "description": f"Employee hourly rate ${employees[idx].get('hourly_rate', 0)} below federal minimum wage",
+                    "recommendation": "Increase hourly rate to meet minimum wage requirements"
+                }))
         
         return issues
     
-    async def _check_data_privacy_compliance(self, rule: ComplianceRule, 
-                                           employee: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def _check_data_privacy_compliance(self, rule: ComplianceRule, 
+                                     employees: List[Dict[str, Any]],
+                                     df: pd.DataFrame) -> List[Tuple[int, Dict[str, Any]]]:
         """Check data privacy compliance"""
         issues = []
         
         # Check consent for data processing
-        if not employee.get('data_processing_consent', False):
-            issues.append({
+        consent = _column(df, 'data_processing_consent', False).astype(bool)
+        for idx in np.flatnonzero(~consent.to_numpy()):
+            issues.append((idx, {
                 "type": "missing_consent",
                 "severity": AlertSeverity.CRITICAL,
                 "description": "No explicit consent recorded for employee data processing",
                 "recommendation": "Obtain and document explicit consent for data processing"
-            })
-        
-        # Check data retention
-        hire_date = employee.get('hire_date')
-        if hire_date:
-            hire_datetime = datetime.fromisoformat(hire_date) if isinstance(hire_date, str) else hire_date
-            years_employed = (datetime.now() - hire_datetime).days / 365
-            
-            if years_employed > 7 and not employee.get('data_retention_reviewed', False):
-                issues.append({
+            }))
+        
+        # Check data retention (hire dates parsed for the whole column at once)
+        if 'hire_date' in df.columns:
+            years_employed = _days_since(df['hire_date'], pd.Timestamp.now()) / 365
+            reviewed = _column(df, 'data_retention_reviewed', False).astype(bool)
+            for idx in np.flatnonzero(((years_employed > 7) & ~reviewed).to_numpy()):
+                issues.append((idx, {
                     "type": "data_retention",
                     "severity": AlertSeverity.WARNING,
                     "description": "Employee data retention period may exceed legal requirements",
                     "recommendation": "Review data retention policy and purge unnecessary data"
-                })
+                }))
         
         return issues
     
-    async def _check_equal_opportunity_compliance(self, rule: ComplianceRule, 
-                                                employee: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def _check_equal_opportunity_compliance(self, rule: ComplianceRule, 
+                                          employees: List[Dict[str, Any]],
+                                          df: pd.DataFrame) -> List[Tuple[int, Dict[str, Any]]]:
         """Check equal opportunity compliance"""
         issues = []
         
@@ -351,89 +468,86 @@ class ProactiveComplianceAgent:
         
         return issues
     
-    async def _check_safety_compliance(self, rule: ComplianceRule, 
-                                     employee: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def _check_safety_compliance(self, rule: ComplianceRule, 
+                               employees: List[Dict[str, Any]],
+                               df: pd.DataFrame) -> List[Tuple[int, Dict[str, Any]]]:
         """Check workplace safety compliance"""
         issues = []
         
-        # Check safety training
-        last_safety_training = employee.get('last_safety_training')
-        if not last_safety_training:
-            issues.append({
+        # Check safety training (missing and expired are exclusive, so each employee gets at most one)
+        last_safety_training = _column(df, 'last_safety_training', '')
+        missing = (last_safety_training == '').to_numpy()
+        expired = (_days_since(last_safety_training.where(~missing), pd.Timestamp.now()) > 365).to_numpy()
+        
+        for idx in np.flatnonzero(missing):
+            issues.append((idx, {
                 "type": "missing_safety_training",
                 "severity": AlertSeverity.WARNING,
                 "description": "No safety training recorded for employee",
                 "recommendation": "Schedule mandatory safety training"
-            })
-        elif isinstance(last_safety_training, str):
-            training_date = datetime.fromisoformat(last_safety_training)
-            if (datetime.now() - training_date).days > 365:
-                issues.append({
-                    "type": "expired_safety_training",
-                    "severity": AlertSeverity.WARNING,
-                    "description": "Safety training expired over 1 year ago",
-                    "recommendation": "Schedule refresher safety training"
-                })
+            }))
+        for idx in np.flatnonzero(expired):
+            issues.append((idx, {
+                "type": "expired_safety_training",
+                "severity": AlertSeverity.WARNING,
+                "description": "Safety training expired over 1 year ago",
+                "recommendation": "Schedule refresher safety training"
+            }))
         
         return issues
     
-    async def _check_termination_compliance(self, rule: ComplianceRule, 
-                                          employee: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def _check_termination_compliance(self, rule: ComplianceRule, 
+                                    employees: List[Dict[str, Any]],
+                                    df: pd.DataFrame) -> List[Tuple[int, Dict[str, Any]]]:
         """Check termination compliance"""
         issues = []
         
-        # Check if employee is marked for termination
-        if employee.get('status') == 'terminated':
-            termination_date = employee.get('termination_date')
+        # Check employees marked for termination (only those rows are visited)
+        terminated = _column(df, 'status', '').eq('terminated').to_numpy()
+        for idx in np.flatnonzero(terminated):
+            employee = employees[idx]
             termination_reason = employee.get('termination_reason')
             
             if not termination_reason:
-                issues.append({
+                issues.append((idx, {
                     "type": "missing_termination_reason",
                     "severity": AlertSeverity.CRITICAL,
                     "description": "Terminated employee missing documented reason",
                     "recommendation": "Document termination reason for legal compliance"
-                })
+                }))
             
             # Check notice period
             notice_given = employee.get('notice_period_given', 0)
             required_notice = self._get_required_notice_period(rule.country, employee)
             
             if notice_given < required_notice:
-                issues.append({
+                issues.append((idx, {
                     "type": "insufficient_notice",
                     "severity": AlertSeverity.CRITICAL,
                     "description": f"Notice period {notice_given} days less than required {required_notice} days",
                     "recommendation": "Provide payment in lieu of notice or extend notice period"
-                })
+                }))
         
         return issues
     
     def _get_required_notice_period(self, country: str, employee: Dict[str, Any]) -> int:
         """Get required notice period based on country and tenure"""
-        tenure_years = employee.get('tenure_years', 0)
-        
-        notice_periods = {
-            "US": 0,  # At-will employment, no notice required
-            "UK": min(12, max(1, tenure_years)) * 7,  # 1-12 weeks based on tenure
-            "SG": min(4, max(1, tenure_years)) * 7,   # 1-4 weeks based on tenure
-            "AU": min(5, max(1, tenure_years)) * 7,   # 1-5 weeks based on tenure
-        }
-        
-        return notice_periods.get(country, 14)  # Default 2 weeks
+        return _required_notice_days(country, employee.get('tenure_years', 0))
     
     async def _create_compliance_alert(self, rule: ComplianceRule, 
                                      employee: Dict[str, Any], 
                                      issue: Dict[str, Any]) -> str:
         """Create a compliance alert"""
-        alert_id = str(uuid.uuid4())
+        alert_id = self._next_id()
+        
+        now = datetime.now()
         
         # Calculate deadline based on severity
         deadline = None
         if issue["severity"] == AlertSeverity.CRITICAL:
-            deadline = datetime.now() + timedelta(days=7)
+            deadline = now + timedelta(days=7)
         elif issue["severity"] == AlertSeverity.WARNING:
-            deadline = datetime.now() + timedelta(days=30)
+            deadline = now + timedelta(days=30)
         
         alert = ComplianceAlert(
             alert_id=alert_id,
@@ -441,11 +555,11 @@ class ProactiveComplianceAgent:
             employee_id=employee.get('employee_id'),
             department=employee.get('department'),
             severity=issue["severity"],
-            title=f"{rule.name} - {issue['type'].replace('_', ' ').title()}",
+            title=f"{rule.name} - {ISSUE_TYPE_TITLES[issue['type']]}",
             description=issue["description"],
             recommended_actions=[issue["recommendation"]],
             deadline=deadline,
-            created_date=datetime.now(),
+            created_date=now,
             acknowledged=False,
             resolved=False,
             resolved_date=None,
@@ -454,25 +568,35 @@ class ProactiveComplianceAgent:
                 "country": rule.country,
                 "employee_name": employee.get('name', 'Unknown'),
                 "issue_type": issue["type"]
-            }
+            },
+            created_iso=now.isoformat(),
+            deadline_iso=deadline.isoformat() if deadline else None
         )
         
         self.alerts[alert_id] = alert
+        self._alerts_by_severity[alert.severity][alert_id] = None
+        self._unresolved_alerts[alert_id] = None
+        self._alert_counts[alert.severity] += 1
+        self._dashboard_cache = None
         return alert_id
     
     async def scan_policy_updates(self, countries: List[str]) -> List[str]:
         """Scan for policy updates from government sources"""
         update_ids = []
         
-        for country in countries:
-            try:
-                updates = await self._scan_country_updates(country)
-                for update in updates:
-                    update_id = await self._create_policy_update(update)
-                    update_ids.append(update_id)
-            except Exception as e:
-                print(f"Error scanning updates for {country}: {e}")
+        # Scan all countries concurrently; total time is the slowest source, not the sum
+        results = await asyncio.gather(
+            *(self._scan_country_updates(country) for country in countries),
+            return_exceptions=True
+        )
+        
+        for country, updates in zip(countries, results):
+            if isinstance(updates, Exception):
+                print(f"Error scanning updates for {country}: {updates}")
                 continue
+            for update in updates:
+                update_id = await self._create_policy_update(update)
+                update_ids.append(update_id)
         
         return update_ids
     
@@ -501,14 +625,18 @@ class ProactiveComplianceAgent:
         
         country_sources = sources.get(country, [])
         
-        for source_url in country_sources:
-            try:
-                # This is a simplified example - real implementation would need
-                # proper web scraping with respect for robots.txt and rate limits
-                updates.extend(await self._scrape_policy_updates(source_url, country))
-            except Exception as e:
-                print(f"Error scraping {source_url}: {e}")
+        # This is a simplified example - real implementation would need
+        # proper web scraping with respect for robots.txt and rate limits
+        results = await asyncio.gather(
+            *(self._scrape_policy_updates(source_url, country) for source_url in country_sources),
+            return_exceptions=True
+        )
+        
+        for source_url, source_updates in zip(country_sources, results):
+            if isinstance(source_updates, Exception):
+                print(f"Error scraping {source_url}: {source_updates}")
                 continue
+            updates.extend(source_updates)
         
         return updates
     
@@ -540,13 +668,10 @@ class ProactiveComplianceAgent:
     
     async def _create_policy_update(self, update_data: Dict[str, Any]) -> str:
         """Create a policy update record"""
-        update_id = str(uuid.uuid4())
+        update_id = self._next_id()
         
         # Determine affected rules
-        affected_rules = []
-        for rule in self.compliance_rules.values():
-            if rule.area == update_data["area"] and rule.active:
-                affected_rules.append(rule.rule_id)
+        affected_rules = [rule.rule_id for rule in self._active_rules_by_area.get(update_data["area"], [])]
         
         # Generate required actions
         required_actions = [
@@ -574,12 +699,13 @@ class ProactiveComplianceAgent:
         )
         
         self.policy_updates[update_id] = policy_update
+        self._dashboard_cache = None
         return update_id
     
     async def assess_department_compliance(self, department: str, 
                                          employee_data: List[Dict[str, Any]]) -> str:
         """Assess compliance for a specific department"""
-        assessment_id = str(uuid.uuid4())
+        assessment_id = self._next_id()
         
         dept_employees = [emp for emp in employee_data if emp.get('department') == department]
         
@@ -588,38 +714,30 @@ class ProactiveComplianceAgent:
         
         # Assess each compliance area
         area_scores = {}
-        all_issues = []
-        all_recommendations = []
+        issue_types = set()
+        recommendations = set()
+        
+        df = _employee_frame(dept_employees)
+        countries = _column(df, 'country', 'US').to_numpy()
         
         for area in ComplianceArea:
-            area_issues = []
+            has_issue = np.zeros(len(dept_employees), dtype=bool)
             
             # Check relevant rules for this area
-            area_rules = [rule for rule in self.compliance_rules.values() 
-                         if rule.area == area and rule.active]
+            area_rules = self._active_rules_by_area.get(area, [])
             
             for rule in area_rules:
-                for employee in dept_employees:
-                    if rule.country == employee.get('country', 'US'):
-                        issues = await self._check_rule_compliance(rule, employee)
-                        area_issues.extend(issues)
+                for pos, _, issue in self._check_country_rules(rule.country, [rule], dept_employees, df, countries):
+                    has_issue[pos] = True
+                    # Collect issues and recommendations
+                    issue_types.add(issue['type'])
+                    recommendations.add(issue['recommendation'])
             
             # Calculate area score (100 - percentage of employees with issues)
             if area_rules:  # Only assess areas with applicable rules
-                employees_with_issues = len(set(
-                    emp['employee_id'] for emp in dept_employees 
-                    for issue in area_issues 
-                    if any(rule.country == emp.get('country', 'US') for rule in area_rules)
-                ))
+                employees_with_issues = int(np.count_nonzero(has_issue))
                 area_score = max(0, 100 - (employees_with_issues / len(dept_employees) * 100))
                 area_scores[area.value] = area_score
-                
-                # Collect issues and recommendations
-                area_issue_types = list(set(issue['type'] for issue in area_issues))
-                all_issues.extend(area_issue_types)
-                
-                area_recommendations = list(set(issue['recommendation'] for issue in area_issues))
-                all_recommendations.extend(area_recommendations)
         
         # Calculate overall score
         overall_score = sum(area_scores.values()) / len(area_scores) if area_scores else 100
@@ -639,33 +757,30 @@ class ProactiveComplianceAgent:
             area=ComplianceArea.EMPLOYMENT_LAW,  # Overall assessment
             status=status,
             score=overall_score,
-            issues_found=list(set(all_issues)),
-            recommendations=list(set(all_recommendations)),
+            issues_found=list(issue_types),
+            recommendations=list(recommendations),
             next_review_date=datetime.now() + timedelta(days=90),
             assessed_date=datetime.now(),
             assessor="Proactive Compliance Agent"
         )
         
         self.assessments[assessment_id] = assessment
+        self._score_sum += assessment.score
+        self._score_count += 1
+        self._dashboard_cache = None
         return assessment_id
     
     def get_compliance_dashboard(self) -> Dict[str, Any]:
         """Get compliance dashboard data"""
+        cached = self._dashboard_cache
+        if cached and time.monotonic() - cached[0] < DASHBOARD_CACHE_TTL:
+            return cached[1]
         
         # Alert summary
-        alert_counts = {}
-        for severity in AlertSeverity:
-            alert_counts[severity.value] = len([
-                alert for alert in self.alerts.values() 
-                if alert.severity == severity and not alert.resolved
-            ])
-        
-        # Recent policy updates
-        recent_updates = sorted(
-            self.policy_updates.values(),
-            key=lambda x: x.detected_date,
-            reverse=True
-        )[:5]
+        alert_counts = {severity.value: self._alert_counts[severity] for severity in AlertSeverity}
+        
+        # Recent policy updates (stored in detection order, so the newest are last)
+        recent_updates = list(itertools.islice(reversed(self.policy_updates.values()), 5))
         
         # Compliance areas at risk
         at_risk_areas = []
@@ -677,11 +792,11 @@ class ProactiveComplianceAgent:
                     "score": assessment.score
                 })
         
-        return {
+        dashboard = {
             "summary": {
-                "total_alerts": len([a for a in self.alerts.values() if not a.resolved]),
+                "total_alerts": len(self._unresolved_alerts),
                 "critical_alerts": alert_counts.get("critical", 0),
-                "pending_updates": len([u for u in self.policy_updates.values()]),
+                "pending_updates": len(self.policy_updates),
                 "compliance_score": self._calculate_overall_compliance_score()
             },
             "alerts_by_severity": alert_counts,
@@ -696,21 +811,34 @@ class ProactiveComplianceAgent:
             ],
             "at_risk_areas": at_risk_areas
         }
+        
+        self._dashboard_cache = (time.monotonic(), dashboard)
+        return dashboard
     
     def _calculate_overall_compliance_score(self) -> float:
         """Calculate overall compliance score"""
-        if not self.assessments:
+        if not self._score_count:
             return 100.0
         
-        scores = [assessment.score for assessment in self.assessments.values()]
-        return sum(scores) / len(scores)
+        return self._score_sum / self._score_count
     
     def get_alerts(self, severity: Optional[AlertSeverity] = None, 
                   resolved: Optional[bool] = None) -> List[Dict[str, Any]]:
         """Get compliance alerts"""
         alerts = []
         
-        for alert in self.alerts.values():
+        # Walk the smallest matching index; ids are in creation order, so reversed is newest first
+        if severity:
+            candidates = self._alerts_by_severity[severity]
+            if resolved is False and len(self._unresolved_alerts) < len(candidates):
+                candidates = self._unresolved_alerts
+        elif resolved is False:
+            candidates = self._unresolved_alerts
+        else:
+            candidates = self.alerts
+        
+        for alert_id in reversed(candidates):
+            alert = self.alerts[alert_id]
             if severity and alert.severity != severity:
                 continue
             if resolved is not None and alert.resolved != resolved:
@@ -723,14 +851,14 @@ class ProactiveComplianceAgent:
                 "severity": alert.severity.value,
                 "employee_id": alert.employee_id,
                 "department": alert.department,
-                "deadline": alert.deadline.isoformat() if alert.deadline else None,
-                "created_date": alert.created_date.isoformat(),
+                "deadline": alert.deadline_iso,
+                "created_date": alert.created_iso,
                 "acknowledged": alert.acknowledged,
                 "resolved": alert.resolved,
                 "recommended_actions": alert.recommended_actions
             })
         
-        return sorted(alerts, key=lambda x: x["created_date"], reverse=True)
+        return alerts
     
     async def acknowledge_alert(self, alert_id: str, user_id: str) -> bool:
         """Acknowledge a compliance alert"""
@@ -747,6 +875,10 @@ class ProactiveComplianceAgent:
             return False
         
         alert = self.alerts[alert_id]
+        if alert_id in self._unresolved_alerts:
+            del self._unresolved_alerts[alert_id]
+            self._alert_counts[alert.severity] -= 1
+        self._dashboard_cache = None
         alert.resolved = True
         alert.resolved_date = datetime.now()
         alert.metadata["resolution_notes"] = resolution_notes
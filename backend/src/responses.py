@@ -0,0 +1,47 @@
+from flask import current_app, request
+import orjson
+
+_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+# Constant parts of the {'success': ..., 'data'|'message': ...} envelopes,
+# encoded once so the hot path only serializes the payload
+_OK_PREFIX = b'{"success":true,"data":'
+_FAIL_PREFIX = b'{"success":false,"message":'
+_SUFFIX = b'}'
+
+
+def request_json():
+    """Request body decoded with orjson; None when empty or not valid JSON (like get_json(silent=True))."""
+    body = request.get_data()
+    if not body:
+        return None
+    try:
+        return orjson.loads(body)
+    except orjson.JSONDecodeError:
+        return None
+
+
+def ojson(obj, status=200):
+    """Serialize a response body with orjson (handles datetime/date natively)."""
+    return current_app.response_class(orjson.dumps(obj, option=_OPTIONS), status=status, mimetype='application/json')
+
+
+def conditional_ojson(obj):
+    """ojson response with an ETag; 304 when the client's If-None-Match still matches (private, revalidated each use)."""
+    response = ojson(obj)
+    response.add_etag()
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+def ok(data, status=200):
+    """Success envelope: {"success": true, "data": data}."""
+    body = _OK_PREFIX + orjson.dumps(data, option=_OPTIONS) + _SUFFIX
+    return current_app.response_class(body, status=status, mimetype='application/json')
+
+
+def fail(message, status=500):
+    """Error envelope: {"success": false, "message": message}."""
+    body = _FAIL_PREFIX + orjson.dumps(message) + _SUFFIX
+    return current_app.response_class(body, status=status, mimetype='application/json')
@@ -1,30 +1,31 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
-from werkzeug.security import generate_password_hash, check_password_hash
 from src.models.user import db, User
 from src.models.subscription import Subscription
+from src.coin_ledger import prime_coin_balance
+from src.responses import ojson, request_json
+from src.passwords import hash_password, verify_password, needs_rehash
+from sqlalchemy import select, exists
+from sqlalchemy.exc import IntegrityError
 from datetime import datetime, date, timedelta
+import secrets
 
 auth_bp = Blueprint('auth', __name__)
 
+# Checked against for unknown emails so a failed login costs one hash either way
+_DUMMY_PASSWORD_HASH = hash_password(secrets.token_urlsafe(32))
+
 @auth_bp.route('/register', methods=['POST'])
 def register():
     try:
-        data = request.get_json()
+        data = request_json()
         
         # Validate required fields
         if not data or not data.get('username') or not data.get('email') or not data.get('password'):
-            return jsonify({'error': 'Username, email, and password are required'}), 400
-        
-        # Check if user already exists
-        if User.query.filter_by(email=data['email']).first():
-            return jsonify({'error': 'Email already registered'}), 400
-        
-        if User.query.filter_by(username=data['username']).first():
-            return jsonify({'error': 'Username already taken'}), 400
+            return ojson({'error': 'Username, email, and password are required'}), 400
         
         # Create new user
-        password_hash = generate_password_hash(data['password'])
+        password_hash = hash_password(data['password'])
         new_user = User(
             username=data['username'],
             email=data['email'],
@@ -32,10 +33,18 @@ def register():
             role=data.get('role', 'hr_manager')
         )
         
-        db.session.add(new_user)
-        db.session.commit()
+        # The unique email/username indexes reject duplicates (concurrent signups
+        # included) without a SELECT per field up front
+        try:
+            db.session.add(new_user)
+            db.session.flush()
+        except IntegrityError:
+            db.session.rollback()
+            if db.session.scalar(select(exists().where(User.email == data['email']))):
+                return ojson({'error': 'Email already registered'}), 400
+            return ojson({'error': 'Username already taken'}), 400
         
-        # Create default free trial subscription
+        # Create default free trial subscription (committed with the user)
         subscription = Subscription(
             user_id=new_user.user_id,
             plan_type='free_trial',
@@ -49,37 +58,49 @@ def register():
         db.session.add(subscription)
         db.session.commit()
         
-        return jsonify({
+        return ojson({
             'message': 'User registered successfully',
             'user_id': new_user.user_id
         }), 201
         
     except Exception as e:
         db.session.rollback()
-        return jsonify({'error': str(e)}), 500
+        return ojson({'error': str(e)}), 500
 
 @auth_bp.route('/login', methods=['POST'])
 def login():
     try:
-        data = request.get_json()
+        data = request_json()
         
         if not data or not data.get('email') or not data.get('password'):
-            return jsonify({'error': 'Email and password are required'}), 400
+            return ojson({'error': 'Email and password are required'}), 400
         
         user = User.query.filter_by(email=data['email']).first()
         
-        if user and check_password_hash(user.password_hash, data['password']):
+        # Always run the (constant-time) hash check so response time doesn't reveal which emails exist
+        password_ok = verify_password(user.password_hash if user else _DUMMY_PASSWORD_HASH, data['password'])
+        
+        if user and password_ok:
+            # Move legacy Werkzeug hashes (and old work factors) to bcrypt while the password is at hand
+            if needs_rehash(user.password_hash):
+                user.password_hash = hash_password(data['password'])
+                db.session.commit()
+            
+            subscription = Subscription.query.filter_by(user_id=user.user_id, status='active').first()
+            if subscription and subscription.plan_type == 'free_trial':
+                prime_coin_balance(user.user_id, subscription.coins_balance)
+            
             access_token = create_access_token(identity=user.user_id)
-            return jsonify({
+            return ojson({
                 'access_token': access_token,
                 'token_type': 'bearer',
                 'user': user.to_dict()
             }), 200
         else:
-            return jsonify({'error': 'Invalid email or password'}), 401
+            return ojson({'error': 'Invalid email or password'}), 401
             
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return ojson({'error': str(e)}), 500
 
 @auth_bp.route('/refresh', methods=['POST'])
 @jwt_required()
@@ -87,7 +108,7 @@ def refresh():
     try:
         current_user_id = get_jwt_identity()
         new_token = create_access_token(identity=current_user_id)
-        return jsonify({'access_token': new_token}), 200
+        return ojson({'access_token': new_token}), 200
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return ojson({'error': str(e)}), 500
 
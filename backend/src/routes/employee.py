@@ -1,4 +1,4 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from src.models.user import db
 from src.models.employee import (
@@ -6,34 +6,47 @@ from src.models.employee import (
     AttendanceTimeTracking, LeaveManagement, PerformanceDevelopment,
     ComplianceLegal, SystemITAccess, ExitOffboarding, OptionalFeatures
 )
-from datetime import datetime
+from src.responses import ojson, request_json
+from src.pagination import decode_cursor, keyset_page
+from sqlalchemy import select, func, exists
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload, selectinload
+from datetime import date
+import orjson
 
 employee_bp = Blueprint('employee', __name__)
 
+# Records per history table returned with the employee detail
+RECENT_RECORDS_LIMIT = 5
+
+# Columns serialized by the employee list endpoint (same keys as Employee.to_dict)
+_EMP_COLS = [
+    Employee.employee_id, Employee.user_id, Employee.full_name, Employee.date_of_birth,
+    Employee.gender, Employee.nationality, Employee.phone_number, Employee.email_address,
+    Employee.residential_address, Employee.photo_url
+]
+
 @employee_bp.route('/employees', methods=['POST'])
 @jwt_required()
 def add_employee():
     try:
-        data = request.get_json()
+        data = request_json()
         
         # Validate required fields
         required_fields = ['full_name', 'date_of_birth', 'gender', 'nationality', 'email_address']
         for field in required_fields:
             if not data.get(field):
-                return jsonify({'error': f'{field} is required'}), 400
-        
-        # Check if email already exists
-        if Employee.query.filter_by(email_address=data['email_address']).first():
-            return jsonify({'error': 'Email address already exists'}), 400
+                return ojson({'error': f'{field} is required'}), 400
         
         # Parse date
         try:
-            date_of_birth = datetime.strptime(data['date_of_birth'], '%Y-%m-%d').date()
+            date_of_birth = date.fromisoformat(data['date_of_birth'])
         except ValueError:
-            return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+            return ojson({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
         
         # Create new employee
         new_employee = Employee(
+            user_id=get_jwt_identity(),
             full_name=data['full_name'],
             date_of_birth=date_of_birth,
             gender=data['gender'],
@@ -44,10 +57,21 @@ def add_employee():
             photo_url=data.get('photo_url')
         )
         
-        db.session.add(new_employee)
-        db.session.commit()
-        
-        return jsonify({
+        # The unique email index rejects duplicates (concurrent adds included) in the INSERT itself
+        try:
+            db.session.add(new_employee)
+            db.session.commit()
+        except IntegrityError as e:
+            db.session.rollback()
+            if db.session.scalar(select(exists().where(Employee.email_address == data['email_address']))):
+                return ojson({'error': 'Email address already exists'}), 400
+            if data.get('phone_number') and db.session.scalar(
+                select(exists().where(Employee.phone_number == data['phone_number']))
+            ):
+                return ojson({'error': 'Phone number already exists'}), 400
+            return ojson({'error': str(e.orig)}), 500
+        
+        return ojson({
             'message': 'Employee added successfully',
             'employee_id': new_employee.employee_id,
             'employee': new_employee.to_dict()
@@ -55,34 +79,74 @@ def add_employee():
         
     except Exception as e:
         db.session.rollback()
-        return jsonify({'error': str(e)}), 500
+        return ojson({'error': str(e)}), 500
 
 @employee_bp.route('/employees', methods=['GET'])
 @jwt_required()
 def get_employees():
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
-        
-        employees = Employee.query.paginate(
-            page=page, per_page=per_page, error_out=False
-        )
-        
-        return jsonify({
-            'employees': [emp.to_dict() for emp in employees.items],
-            'total': employees.total,
-            'pages': employees.pages,
-            'current_page': page
+        per_page = max(request.args.get('per_page', 10, type=int), 1)
+        after = request.args.get('after')
+        
+        # Read-only listing: fetch plain rows instead of hydrating ORM objects.
+        # Keyset pagination on the primary key: an index range scan, no COUNT or OFFSET skip
+        stmt = select(*_EMP_COLS).order_by(Employee.employee_id).limit(per_page + 1)
+        if after:
+            stmt = stmt.where(Employee.employee_id > decode_cursor(after)[0])
+        rows = db.session.execute(stmt).all()
+        page, next_cursor = keyset_page(rows, per_page, lambda row: (row.employee_id,))
+        
+        return ojson({
+            'employees': [dict(row._mapping) for row in page],
+            'next_cursor': next_cursor,
+            'per_page': per_page
         }), 200
         
+    except ValueError as e:
+        return ojson({'error': str(e)}), 400
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return ojson({'error': str(e)}), 500
+
+@employee_bp.route('/employees/all', methods=['GET'])
+@jwt_required()
+def stream_all_employees():
+    """Stream every employee as a JSON array without materializing the full list"""
+    stmt = select(*_EMP_COLS).execution_options(yield_per=500)
+    
+    def generate():
+        yield b'['
+        first = True
+        for row in db.session.execute(stmt):
+            if not first:
+                yield b','
+            first = False
+            yield orjson.dumps(dict(row._mapping))
+        yield b']'
+    
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+def _recent_records(model, employee_id, date_column):
+    """Newest rows of a per-employee history table, limited in SQL rather than sliced in Python"""
+    return model.query.filter_by(employee_id=employee_id)\
+        .order_by(date_column.desc())\
+        .limit(RECENT_RECORDS_LIMIT)\
+        .all()
 
 @employee_bp.route('/employees/<employee_id>', methods=['GET'])
 @jwt_required()
 def get_employee(employee_id):
     try:
-        employee = Employee.query.get_or_404(employee_id)
+        # Load the detail graph up front: 1:1 relations ride along in the
+        # parent SELECT, small collections come back in one extra query each
+        employee = Employee.query.options(
+            joinedload(Employee.employment_details),
+            joinedload(Employee.payroll_compensation),
+            joinedload(Employee.system_access),
+            joinedload(Employee.exit_details),
+            joinedload(Employee.optional_features),
+            selectinload(Employee.emergency_contacts),
+            selectinload(Employee.compliance_records)
+        ).filter_by(employee_id=employee_id).first_or_404()
         
         # Get all related data
         employee_data = employee.to_dict()
@@ -95,36 +159,36 @@ def get_employee(employee_id):
         employee_data['exit_details'] = employee.exit_details.to_dict() if employee.exit_details else None
         employee_data['optional_features'] = employee.optional_features.to_dict() if employee.optional_features else None
         
-        # Add recent attendance, leave, performance records (last 5)
+        # Add recent attendance, leave, performance records (newest 5; only those rows are fetched)
         employee_data['recent_attendance'] = [record.to_dict() for record in 
-                                            employee.attendance_records[-5:]]
+                                            _recent_records(AttendanceTimeTracking, employee_id, AttendanceTimeTracking.record_date)]
         employee_data['recent_leave'] = [record.to_dict() for record in 
-                                       employee.leave_records[-5:]]
+                                       _recent_records(LeaveManagement, employee_id, LeaveManagement.start_date)]
         employee_data['recent_performance'] = [record.to_dict() for record in 
-                                             employee.performance_records[-5:]]
+                                             _recent_records(PerformanceDevelopment, employee_id, PerformanceDevelopment.review_date)]
         employee_data['compliance_records'] = [record.to_dict() for record in 
                                              employee.compliance_records]
         
-        return jsonify(employee_data), 200
+        return ojson(employee_data), 200
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return ojson({'error': str(e)}), 500
 
 @employee_bp.route('/employees/<employee_id>', methods=['PUT'])
 @jwt_required()
 def update_employee(employee_id):
     try:
         employee = Employee.query.get_or_404(employee_id)
-        data = request.get_json()
+        data = request_json()
         
         # Update basic employee fields
         if 'full_name' in data:
             employee.full_name = data['full_name']
         if 'date_of_birth' in data:
             try:
-                employee.date_of_birth = datetime.strptime(data['date_of_birth'], '%Y-%m-%d').date()
+                employee.date_of_birth = date.fromisoformat(data['date_of_birth'])
             except ValueError:
-                return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+                return ojson({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
         if 'gender' in data:
             employee.gender = data['gender']
         if 'nationality' in data:
@@ -135,7 +199,7 @@ def update_employee(employee_id):
             # Check if new email already exists for another employee
             existing = Employee.query.filter_by(email_address=data['email_address']).first()
             if existing and existing.employee_id != employee_id:
-                return jsonify({'error': 'Email address already exists'}), 400
+                return ojson({'error': 'Email address already exists'}), 400
             employee.email_address = data['email_address']
         if 'residential_address' in data:
             employee.residential_address = data['residential_address']
@@ -144,14 +208,14 @@ def update_employee(employee_id):
         
         db.session.commit()
         
-        return jsonify({
+        return ojson({
             'message': 'Employee updated successfully',
             'employee': employee.to_dict()
         }), 200
         
     except Exception as e:
         db.session.rollback()
-        return jsonify({'error': str(e)}), 500
+        return ojson({'error': str(e)}), 500
 
 @employee_bp.route('/employees/<employee_id>', methods=['DELETE'])
 @jwt_required()
@@ -162,11 +226,11 @@ def delete_employee(employee_id):
         db.session.delete(employee)
         db.session.commit()
         
-        return jsonify({'message': 'Employee deleted successfully'}), 200
+        return ojson({'message': 'Employee deleted successfully'}), 200
         
     except Exception as e:
         db.session.rollback()
-        return jsonify({'error': str(e)}), 500
+        return ojson({'error': str(e)}), 500
 
 # Employment Details Routes
 @employee_bp.route('/employees/<employee_id>/employment', methods=['POST', 'PUT'])
@@ -174,25 +238,25 @@ def delete_employee(employee_id):
 def manage_employment_details(employee_id):
     try:
         employee = Employee.query.get_or_404(employee_id)
-        data = request.get_json()
+        data = request_json()
         
         required_fields = ['job_title', 'department', 'employment_type', 'employment_status', 'date_of_joining', 'work_location']
         for field in required_fields:
             if not data.get(field):
-                return jsonify({'error': f'{field} is required'}), 400
+                return ojson({'error': f'{field} is required'}), 400
         
         # Parse date
         try:
-            date_of_joining = datetime.strptime(data['date_of_joining'], '%Y-%m-%d').date()
+            date_of_joining = date.fromisoformat(data['date_of_joining'])
         except ValueError:
-            return jsonify({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+            return ojson({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
         
         date_of_exit = None
         if data.get('date_of_exit'):
             try:
-                date_of_exit = datetime.strptime(data['date_of_exit'], '%Y-%m-%d').date()
+                date_of_exit = date.fromisoformat(data['date_of_exit'])
             except ValueError:
-                return jsonify({'error': 'Invalid exit date format. Use YYYY-MM-DD'}), 400
+                return ojson({'error': 'Invalid exit date format. Use YYYY-MM-DD'}), 400
         
         if employee.employment_details:
             # Update existing
@@ -226,14 +290,49 @@ def manage_employment_details(employee_id):
         
         db.session.commit()
         
-        return jsonify({
+        return ojson({
             'message': 'Employment details saved successfully',
             'employment_details': employment.to_dict()
         }), 200
         
     except Exception as e:
         db.session.rollback()
-        return jsonify({'error': str(e)}), 500
+        return ojson({'error': str(e)}), 500
+
+@employee_bp.route('/employees/<employee_id>/attendance/summary', methods=['GET'])
+@jwt_required()
+def get_attendance_summary(employee_id):
+    """Total and overtime hours for an employee, summed in the database"""
+    try:
+        conditions = [AttendanceTimeTracking.employee_id == employee_id]
+        try:
+            if request.args.get('start'):
+                start = date.fromisoformat(request.args['start'])
+                conditions.append(AttendanceTimeTracking.record_date >= start)
+            if request.args.get('end'):
+                end = date.fromisoformat(request.args['end'])
+                conditions.append(AttendanceTimeTracking.record_date <= end)
+        except ValueError:
+            return ojson({'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
+        
+        work_hours, overtime_hours, days = db.session.execute(
+            select(
+                func.sum(AttendanceTimeTracking.work_hours),
+                func.sum(AttendanceTimeTracking.overtime_hours),
+                func.count()
+            ).where(*conditions)
+        ).one()
+        
+        # Decimal sums are returned as exact strings
+        return ojson({
+            'employee_id': employee_id,
+            'days_recorded': days,
+            'total_work_hours': str(work_hours) if work_hours is not None else None,
+            'total_overtime_hours': str(overtime_hours) if overtime_hours is not None else None
+        }), 200
+        
+    except Exception as e:
+        return ojson({'error': str(e)}), 500
 
 # Emergency Contact Routes
 @employee_bp.route('/employees/<employee_id>/emergency_contacts', methods=['POST'])
@@ -241,12 +340,12 @@ def manage_employment_details(employee_id):
 def add_emergency_contact(employee_id):
     try:
         employee = Employee.query.get_or_404(employee_id)
-        data = request.get_json()
+        data = request_json()
         
         required_fields = ['name', 'relationship', 'phone_number']
         for field in required_fields:
             if not data.get(field):
-                return jsonify({'error': f'{field} is required'}), 400
+                return ojson({'error': f'{field} is required'}), 400
         
         contact = EmergencyContact(
             employee_id=employee_id,
@@ -258,14 +357,14 @@ def add_emergency_contact(employee_id):
         db.session.add(contact)
         db.session.commit()
         
-        return jsonify({
+        return ojson({
             'message': 'Emergency contact added successfully',
             'contact': contact.to_dict()
         }), 201
         
     except Exception as e:
         db.session.rollback()
-        return jsonify({'error': str(e)}), 500
+        return ojson({'error': str(e)}), 500
 
 @employee_bp.route('/employees/<employee_id>/emergency_contacts/<contact_id>', methods=['DELETE'])
 @jwt_required()
@@ -279,9 +378,9 @@ def delete_emergency_contact(employee_id, contact_id):
         db.session.delete(contact)
         db.session.commit()
         
-        return jsonify({'message': 'Emergency contact deleted successfully'}), 200
+        return ojson({'message': 'Emergency contact deleted successfully'}), 200
         
     except Exception as e:
         db.session.rollback()
-        return jsonify({'error': str(e)}), 500
+        return ojson({'error': str(e)}), 500
 
@@ -1,7 +1,10 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from src.models.user import db
 from src.models.prompt_history import PromptHistory
+from src.responses import ojson
+from src.pagination import decode_cursor, keyset_page
+from sqlalchemy import tuple_, select, func
 from datetime import datetime, timedelta
 
 history_bp = Blueprint('history', __name__)
@@ -11,8 +14,8 @@ history_bp = Blueprint('history', __name__)
 def get_prompt_history():
     try:
         user_id = get_jwt_identity()
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
+        per_page = max(request.args.get('per_page', 20, type=int), 1)
+        after = request.args.get('after')
         prompt_type = request.args.get('type')  # query, template, workflow
         
         query = PromptHistory.query.filter_by(user_id=user_id)
@@ -20,24 +23,28 @@ def get_prompt_history():
         if prompt_type:
             query = query.filter_by(prompt_type=prompt_type)
         
-        query = query.order_by(PromptHistory.timestamp.desc())
+        # Keyset pagination on (timestamp, prompt_id): seeks ix_prompt_user_time, no COUNT or OFFSET skip
+        if after:
+            timestamp, prompt_id = decode_cursor(after)
+            query = query.filter(
+                tuple_(PromptHistory.timestamp, PromptHistory.prompt_id) < (datetime.fromisoformat(timestamp), prompt_id)
+            )
         
-        paginated = query.paginate(
-            page=page, 
-            per_page=per_page, 
-            error_out=False
-        )
+        rows = query.order_by(PromptHistory.timestamp.desc(), PromptHistory.prompt_id.desc())\
+            .limit(per_page + 1)\
+            .all()
+        prompts, next_cursor = keyset_page(rows, per_page, lambda p: (p.timestamp, p.prompt_id))
         
-        return jsonify({
-            'prompts': [prompt.to_dict() for prompt in paginated.items],
-            'total': paginated.total,
-            'pages': paginated.pages,
-            'current_page': page,
+        return ojson({
+            'prompts': [prompt.to_dict() for prompt in prompts],
+            'next_cursor': next_cursor,
             'per_page': per_page
         })
         
+    except ValueError as e:
+        return ojson({'error': str(e)}), 400
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return ojson({'error': str(e)}), 500
 
 @history_bp.route('/prompts/recent', methods=['GET'])
 @jwt_required()
@@ -51,10 +58,10 @@ def get_recent_prompts():
             .limit(limit)\
             .all()
         
-        return jsonify([prompt.to_dict() for prompt in prompts])
+        return ojson([prompt.to_dict() for prompt in prompts])
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return ojson({'error': str(e)}), 500
 
 @history_bp.route('/prompts/<prompt_id>', methods=['GET'])
 @jwt_required()
@@ -68,12 +75,12 @@ def get_prompt_detail(prompt_id):
         ).first()
         
         if not prompt:
-            return jsonify({'error': 'Prompt not found'}), 404
+            return ojson({'error': 'Prompt not found'}), 404
         
-        return jsonify(prompt.to_dict())
+        return ojson(prompt.to_dict())
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return ojson({'error': str(e)}), 500
 
 @history_bp.route('/prompts/<prompt_id>', methods=['DELETE'])
 @jwt_required()
@@ -87,15 +94,15 @@ def delete_prompt(prompt_id):
         ).first()
         
         if not prompt:
-            return jsonify({'error': 'Prompt not found'}), 404
+            return ojson({'error': 'Prompt not found'}), 404
         
         db.session.delete(prompt)
         db.session.commit()
         
-        return jsonify({'message': 'Prompt deleted successfully'})
+        return ojson({'message': 'Prompt deleted successfully'})
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return ojson({'error': str(e)}), 500
 
 @history_bp.route('/stats', methods=['GET'])
 @jwt_required()
@@ -106,23 +113,16 @@ def get_usage_stats():
         # Get stats for the last 30 days
         thirty_days_ago = datetime.utcnow() - timedelta(days=30)
         
-        total_prompts = PromptHistory.query.filter_by(user_id=user_id).count()
-        
-        recent_prompts = PromptHistory.query.filter(
-            PromptHistory.user_id == user_id,
-            PromptHistory.timestamp >= thirty_days_ago
-        ).count()
-        
-        total_coins_used = db.session.query(
-            db.func.sum(PromptHistory.coins_consumed)
-        ).filter_by(user_id=user_id).scalar() or 0
-        
-        recent_coins_used = db.session.query(
-            db.func.sum(PromptHistory.coins_consumed)
-        ).filter(
-            PromptHistory.user_id == user_id,
-            PromptHistory.timestamp >= thirty_days_ago
-        ).scalar() or 0
+        # All-time and 30-day totals in one pass over the user's rows
+        is_recent = PromptHistory.timestamp >= thirty_days_ago
+        total_prompts, recent_prompts, total_coins_used, recent_coins_used = db.session.execute(
+            select(
+                func.count(),
+                func.count().filter(is_recent),
+                func.coalesce(func.sum(PromptHistory.coins_consumed), 0),
+                func.coalesce(func.sum(PromptHistory.coins_consumed).filter(is_recent), 0)
+            ).where(PromptHistory.user_id == user_id)
+        ).one()
         
         # Get breakdown by prompt type
         type_breakdown = db.session.query(
@@ -130,7 +130,7 @@ def get_usage_stats():
             db.func.count(PromptHistory.prompt_id)
         ).filter_by(user_id=user_id).group_by(PromptHistory.prompt_type).all()
         
-        return jsonify({
+        return ojson({
             'total_prompts': total_prompts,
             'recent_prompts': recent_prompts,
             'total_coins_used': total_coins_used,
@@ -139,5 +139,5 @@ def get_usage_stats():
         })
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return ojson({'error': str(e)}), 500
 
@@ -1,59 +1,129 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, stream_with_context, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from src.models.user import db, User
 from src.models.subscription import Subscription, CountryHRData
 from src.models.prompt_history import PromptHistory
+from src.cache import cache, redis_client
+from src.responses import ojson, request_json
+from src.coin_ledger import prime_coin_balance, try_spend_coins, flush_coin_deltas, ensure_coin_flusher
+from src.routes.user import invalidate_profile_bundle
+from sqlalchemy import insert, update, case, or_
 from datetime import datetime, date
 from openai import OpenAI
+import hashlib
+import orjson
 import os
+import re
 
 hr_advisor_bp = Blueprint('hr_advisor', __name__)
 
+# Free-trial balance restored on the first request of each day
+DAILY_FREE_TRIAL_COINS = 100
+
+# Identical prompts against the same country context reuse the answer for a day
+AI_RESPONSE_CACHE_TTL = 86400
+
+# Workflow step lines: "1."-"9." numbered or "-"/"•" bulleted, after leading whitespace
+WORKFLOW_STEP_RE = re.compile(r'^[^\S\n]*(?:[1-9]\.|[-•]).*$', re.M)
+
 # Initialize OpenAI client
 client = OpenAI(
     api_key=os.getenv('OPENAI_API_KEY'),
     base_url=os.getenv('OPENAI_API_BASE')
 )
 
+@cache.memoize(timeout=60)
+def get_active_subscription(user_id):
+    """Active subscription as a dict, or None (cached for 60s, see invalidate_active_subscription)"""
+    subscription = Subscription.query.filter_by(user_id=user_id, status='active').first()
+    return subscription.to_dict() if subscription else None
+
+def invalidate_active_subscription(user_id):
+    """Drop a user's cached subscription after its row is written"""
+    cache.delete_memoized(get_active_subscription, user_id)
+    invalidate_profile_bundle(user_id)
+
 def check_subscription_and_coins(user_id, coins_needed=1):
     """Check if user has valid subscription and enough coins (for free trial)"""
-    subscription = Subscription.query.filter_by(user_id=user_id, status='active').first()
+    subscription = get_active_subscription(user_id)
     
     if not subscription:
         return False, "No active subscription found"
     
-    if subscription.plan_type == 'free_trial':
-        # Check if coins need to be refreshed (daily refresh)
-        if subscription.last_coin_refresh != date.today():
-            subscription.coins_balance = 100  # Daily refresh
-            subscription.last_coin_refresh = date.today()
-            db.session.commit()
-        
-        if subscription.coins_balance < coins_needed:
-            return False, f"Insufficient coins. You need {coins_needed} coins but have {subscription.coins_balance}"
-        
-        # Deduct coins
-        subscription.coins_balance -= coins_needed
+    if subscription['plan_type'] == 'free_trial':
+        today = date.today()
+        refreshed_today = subscription['last_coin_refresh'] == today.isoformat()
+        
+        # Fast path: deduct in Redis, flush_coin_deltas() persists it later
+        if redis_client is not None:
+            balance = subscription['coins_balance']
+            # Check if coins need to be refreshed (daily refresh)
+            if not refreshed_today:
+                balance = DAILY_FREE_TRIAL_COINS
+                Subscription.query.filter_by(subscription_id=subscription['subscription_id']).update(
+                    {Subscription.coins_balance: balance, Subscription.last_coin_refresh: today},
+                    synchronize_session=False
+                )
+                db.session.commit()
+                invalidate_active_subscription(user_id)
+                prime_coin_balance(user_id, balance, reset=True)
+            
+            ok, balance = try_spend_coins(user_id, coins_needed, balance, today)
+            if not ok:
+                return False, f"Insufficient coins. You need {coins_needed} coins but have {balance}"
+            return True, subscription
+        
+        # Refresh and deduct in one conditional UPDATE: atomic, so concurrent
+        # requests can't both pass the balance check and overspend
+        refresh_due = or_(Subscription.last_coin_refresh.is_(None), Subscription.last_coin_refresh != today)
+        available = case((refresh_due, DAILY_FREE_TRIAL_COINS), else_=Subscription.coins_balance)
+        balance = db.session.execute(
+            update(Subscription)
+            .where(Subscription.subscription_id == subscription['subscription_id'], available >= coins_needed)
+            .values(coins_balance=available - coins_needed, last_coin_refresh=today)
+            .returning(Subscription.coins_balance)
+            .execution_options(synchronize_session=False)
+        ).scalar_one_or_none()
+        
+        if balance is None:
+            db.session.rollback()
+            available_now = subscription['coins_balance'] if refreshed_today else DAILY_FREE_TRIAL_COINS
+            return False, f"Insufficient coins. You need {coins_needed} coins but have {available_now}"
+        
         db.session.commit()
+        invalidate_active_subscription(user_id)
     
     return True, subscription
 
+@cache.memoize(timeout=86400)
+def get_country_hr(country_code, category=None):
+    """Get country HR reference data (cached for 24h, see invalidate_country_hr)"""
+    query = CountryHRData.query.filter_by(country_code=country_code)
+    if category:
+        query = query.filter_by(category=category)
+    return [data.to_dict() for data in query.all()]
+
+def invalidate_country_hr():
+    """Drop cached country HR data after CountryHRData rows are written"""
+    cache.delete_memoized(get_country_hr)
+    cache.delete_memoized(get_country_context)
+
+@cache.memoize(timeout=86400)
 def get_country_context(country_code):
-    """Get country-specific HR data"""
-    country_data = CountryHRData.query.filter_by(country_code=country_code.upper()).all()
+    """Get country-specific HR data (the built prompt context is cached alongside get_country_hr)"""
+    country_data = get_country_hr(country_code.upper())
     
-    context = ""
-    if country_data:
-        context = f"Country-specific HR information for {country_code}:\n"
-        for data in country_data:
-            context += f"- {data.category}: {data.title}\n{data.content[:500]}...\n\n"
+    if not country_data:
+        return ""
     
-    return context
+    return f"Country-specific HR information for {country_code}:\n" + "".join(
+        f"- {data['category']}: {data['title']}\n{data['content'][:500]}...\n\n"
+        for data in country_data
+    )
 
-def generate_ai_response(prompt, country_context="", response_type="query"):
-    """Generate AI response using OpenAI"""
-    try:
-        system_prompt = f"""You are an expert HR advisor specializing in country-specific labor laws and HR practices. 
+def _advisor_messages(prompt, country_context, response_type):
+    """Chat messages for an HR advisor completion"""
+    system_prompt = f"""You are an expert HR advisor specializing in country-specific labor laws and HR practices. 
         You provide accurate, practical advice for startups and companies with lean HR teams.
         
         {country_context}
@@ -66,61 +136,138 @@ def generate_ai_response(prompt, country_context="", response_type="query"):
         
         Response type: {response_type}
         """
-        
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": prompt}
+    ]
+
+def _ai_response_key(prompt, country_context, response_type):
+    """Response cache key: the normalized prompt plus everything else that shapes the answer"""
+    normalized = ' '.join(prompt.lower().split())
+    digest = hashlib.sha256(f"{response_type}\0{country_context}\0{normalized}".encode()).hexdigest()
+    return f"ai_response:{digest}"
+
+def get_cached_ai_response(prompt, country_context="", response_type="query"):
+    """A previously generated response for this prompt, or None"""
+    return cache.get(_ai_response_key(prompt, country_context, response_type))
+
+def generate_ai_response(prompt, country_context="", response_type="query"):
+    """Generate AI response using OpenAI (successful answers are cached, see AI_RESPONSE_CACHE_TTL)"""
+    key = _ai_response_key(prompt, country_context, response_type)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+    
+    try:
         response = client.chat.completions.create(
             model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": prompt}
-            ],
+            messages=_advisor_messages(prompt, country_context, response_type),
             max_tokens=1000,
             temperature=0.7
         )
         
-        return response.choices[0].message.content
+        content = response.choices[0].message.content
+        cache.set(key, content, timeout=AI_RESPONSE_CACHE_TTL)
+        return content
     except Exception as e:
         return f"I apologize, but I'm currently unable to process your request. Please try again later. Error: {str(e)}"
 
+def stream_ai_response(prompt, country_context="", response_type="query"):
+    """Yield the AI response text as OpenAI streams it"""
+    try:
+        stream = client.chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=_advisor_messages(prompt, country_context, response_type),
+            max_tokens=1000,
+            temperature=0.7,
+            stream=True
+        )
+        
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    except Exception as e:
+        yield f"I apologize, but I'm currently unable to process your request. Please try again later. Error: {str(e)}"
+
+def record_prompt(user_id, prompt_text, response_text, country, coins_consumed):
+    """Append a prompt history row and commit (Core insert: a log row needs no ORM object)"""
+    db.session.execute(insert(PromptHistory), {
+        'user_id': user_id,
+        'prompt_text': prompt_text,
+        'response_text': response_text,
+        'country_context': country,
+        'coins_consumed': coins_consumed
+    })
+    db.session.commit()
+
+def _sse(data, event=None):
+    """One server-sent event frame with a JSON payload"""
+    frame = b'data: ' + orjson.dumps(data) + b'\n\n'
+    return b'event: ' + event.encode() + b'\n' + frame if event else frame
+
+def _stream_query(user_id, query, country, country_context, coins_needed, cached_response=None):
+    """SSE body for a streamed /query: text deltas, then a 'done' event once history is saved"""
+    parts = []
+    chunks = [cached_response] if cached_response is not None else stream_ai_response(query, country_context, "query")
+    for text in chunks:
+        parts.append(text)
+        yield _sse({'delta': text})
+    
+    try:
+        # Save to prompt history once the full response is known
+        record_prompt(user_id, query, ''.join(parts), country, coins_needed)
+    except Exception as e:
+        db.session.rollback()
+        yield _sse({'error': str(e)}, event='error')
+        return
+    
+    yield _sse({
+        'country_context': country,
+        'coins_consumed': coins_needed,
+        'resources': []  # TODO: Add relevant resources
+    }, event='done')
+
 @hr_advisor_bp.route('/query', methods=['POST'])
 @jwt_required()
 def hr_query():
     try:
         current_user_id = get_jwt_identity()
-        data = request.get_json()
+        data = request_json()
         
         if not data or not data.get('query'):
-            return jsonify({'error': 'Query is required'}), 400
+            return ojson({'error': 'Query is required'}), 400
         
         country = data.get('country', 'US')
         query = data['query']
         
+        # Get country-specific context
+        country_context = get_country_context(country)
+        
+        # Repeat questions are answered from the response cache without OpenAI
+        cached_response = get_cached_ai_response(query, country_context, "query")
+        
         # Check subscription and coins
         coins_needed = len(query.split()) // 10 + 1  # Variable coin consumption based on query length
         valid, result = check_subscription_and_coins(current_user_id, coins_needed)
         
         if not valid:
-            return jsonify({'error': result}), 403
+            return ojson({'error': result}), 403
         
-        # Get country-specific context
-        country_context = get_country_context(country)
+        # Opt-in streaming: first tokens reach the client without waiting for the full completion
+        if data.get('stream'):
+            return Response(
+                stream_with_context(_stream_query(current_user_id, query, country, country_context, coins_needed, cached_response)),
+                mimetype='text/event-stream',
+                headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+            )
         
         # Generate AI response
-        ai_response = generate_ai_response(query, country_context, "query")
+        ai_response = cached_response if cached_response is not None else generate_ai_response(query, country_context, "query")
         
         # Save to prompt history
-        prompt_history = PromptHistory(
-            user_id=current_user_id,
-            prompt_text=query,
-            response_text=ai_response,
-            country_context=country,
-            resource_links=[],  # TODO: Add relevant resource links
-            coins_consumed=coins_needed
-        )
-        
-        db.session.add(prompt_history)
-        db.session.commit()
+        record_prompt(current_user_id, query, ai_response, country, coins_needed)
         
-        return jsonify({
+        return ojson({
             'response': ai_response,
             'country_context': country,
             'coins_consumed': coins_needed,
@@ -129,19 +276,19 @@ def hr_query():
         
     except Exception as e:
         db.session.rollback()
-        return jsonify({'error': str(e)}), 500
+        return ojson({'error': str(e)}), 500
 
 @hr_advisor_bp.route('/template', methods=['POST'])
 @jwt_required()
 def generate_template():
     try:
         current_user_id = get_jwt_identity()
-        data = request.get_json()
+        data = request_json()
         
         required_fields = ['type', 'country']
         for field in required_fields:
             if not data.get(field):
-                return jsonify({'error': f'{field} is required'}), 400
+                return ojson({'error': f'{field} is required'}), 400
         
         template_type = data['type']
         country = data['country']
@@ -152,7 +299,7 @@ def generate_template():
         valid, result = check_subscription_and_coins(current_user_id, coins_needed)
         
         if not valid:
-            return jsonify({'error': result}), 403
+            return ojson({'error': result}), 403
         
         # Get country-specific context
         country_context = get_country_context(country)
@@ -168,19 +315,9 @@ def generate_template():
         template_content = generate_ai_response(prompt, country_context, "template")
         
         # Save to prompt history
-        prompt_history = PromptHistory(
-            user_id=current_user_id,
-            prompt_text=f"Template request: {template_type} for {country}",
-            response_text=template_content,
-            country_context=country,
-            resource_links=[],
-            coins_consumed=coins_needed
-        )
-        
-        db.session.add(prompt_history)
-        db.session.commit()
+        record_prompt(current_user_id, f"Template request: {template_type} for {country}", template_content, country, coins_needed)
         
-        return jsonify({
+        return ojson({
             'template_content': template_content,
             'template_type': template_type,
             'country_context': country,
@@ -189,19 +326,19 @@ def generate_template():
         
     except Exception as e:
         db.session.rollback()
-        return jsonify({'error': str(e)}), 500
+        return ojson({'error': str(e)}), 500
 
 @hr_advisor_bp.route('/workflow', methods=['POST'])
 @jwt_required()
 def create_workflow():
     try:
         current_user_id = get_jwt_identity()
-        data = request.get_json()
+        data = request_json()
         
         required_fields = ['type', 'country']
         for field in required_fields:
             if not data.get(field):
-                return jsonify({'error': f'{field} is required'}), 400
+                return ojson({'error': f'{field} is required'}), 400
         
         workflow_type = data['type']
         country = data['country']
@@ -212,7 +349,7 @@ def create_workflow():
         valid, result = check_subscription_and_coins(current_user_id, coins_needed)
         
         if not valid:
-            return jsonify({'error': result}), 403
+            return ojson({'error': result}), 403
         
         # Get country-specific context
         country_context = get_country_context(country)
@@ -234,23 +371,13 @@ def create_workflow():
         # Generate AI response
         workflow_content = generate_ai_response(prompt, country_context, "workflow")
         
-        # Parse workflow into steps (simple parsing)
-        workflow_steps = [step.strip() for step in workflow_content.split('\n') if step.strip() and (step.strip().startswith(('1.', '2.', '3.', '4.', '5.', '6.', '7.', '8.', '9.', '-', '•')))]
+        # Parse workflow into steps (simple parsing, one regex pass over the response)
+        workflow_steps = [match.group().strip() for match in WORKFLOW_STEP_RE.finditer(workflow_content)]
         
         # Save to prompt history
-        prompt_history = PromptHistory(
-            user_id=current_user_id,
-            prompt_text=f"Workflow request: {workflow_type} for {country}",
-            response_text=workflow_content,
-            country_context=country,
-            resource_links=[],
-            coins_consumed=coins_needed
-        )
-        
-        db.session.add(prompt_history)
-        db.session.commit()
+        record_prompt(current_user_id, f"Workflow request: {workflow_type} for {country}", workflow_content, country, coins_needed)
         
-        return jsonify({
+        return ojson({
             'workflow_content': workflow_content,
             'workflow_steps': workflow_steps,
             'workflow_type': workflow_type,
@@ -260,7 +387,17 @@ def create_workflow():
         
     except Exception as e:
         db.session.rollback()
-        return jsonify({'error': str(e)}), 500
+        return ojson({'error': str(e)}), 500
+
+@hr_advisor_bp.before_app_request
+def start_coin_flusher():
+    """Make sure this worker writes Redis coin spends back to the DB"""
+    ensure_coin_flusher(current_app._get_current_object())
+
+@hr_advisor_bp.cli.command('flush-coins')
+def flush_coins_command():
+    """Persist coins spent through the Redis fast path"""
+    print(f"Flushed coin deltas for {flush_coin_deltas()} users")
 
 @hr_advisor_bp.route('/countries', methods=['GET'])
 @jwt_required()
@@ -274,11 +411,11 @@ def get_supported_countries():
         if not country_list:
             country_list = ['US', 'GB', 'SG', 'AU', 'CA', 'DE', 'FR', 'IN', 'JP']
         
-        return jsonify({
+        return ojson({
             'supported_countries': country_list,
             'total_countries': len(country_list)
         }), 200
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return ojson({'error': str(e)}), 500
 
@@ -1,27 +1,49 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from src.models.user import User, db
 from src.models.subscription import Subscription
 from src.models.prompt_history import PromptHistory
+from src.cache import cache
+from src.responses import ojson, conditional_ojson, request_json
+from src.pagination import decode_cursor, keyset_page
+from sqlalchemy import tuple_, select, and_, or_
+from datetime import datetime
 
 user_bp = Blueprint('user', __name__)
 
+# Seconds the profile/subscription bundle is reused across back-to-back page-load requests
+PROFILE_CACHE_TTL = 5
+
+@cache.memoize(timeout=PROFILE_CACHE_TTL)
+def load_profile_bundle(user_id):
+    """User and active subscription dicts from one joined query, or None (see invalidate_profile_bundle)"""
+    row = db.session.execute(
+        select(User, Subscription)
+        .outerjoin(Subscription, and_(Subscription.user_id == User.user_id, Subscription.status == 'active'))
+        .where(User.user_id == user_id)
+    ).first()
+    
+    if row is None:
+        return None
+    user, subscription = row
+    return {'user': user.to_dict(), 'subscription': subscription.to_dict() if subscription else None}
+
+def invalidate_profile_bundle(user_id):
+    """Drop a user's cached profile bundle after the user or subscription row is written"""
+    cache.delete_memoized(load_profile_bundle, user_id)
+
 @user_bp.route('/user/profile', methods=['GET'])
 @jwt_required()
 def get_profile():
     try:
-        current_user_id = get_jwt_identity()
-        user = User.query.get_or_404(current_user_id)
-        
-        # Get subscription info
-        subscription = Subscription.query.filter_by(user_id=current_user_id, status='active').first()
+        bundle = load_profile_bundle(get_jwt_identity())
         
-        profile_data = user.to_dict()
-        profile_data['subscription'] = subscription.to_dict() if subscription else None
+        if bundle is None:
+            return ojson({'error': 'User not found'}), 404
         
-        return jsonify(profile_data), 200
+        return conditional_ojson({**bundle['user'], 'subscription': bundle['subscription']})
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return ojson({'error': str(e)}), 500
 
 @user_bp.route('/user/profile', methods=['PUT'])
 @jwt_required()
@@ -29,54 +51,69 @@ def update_profile():
     try:
         current_user_id = get_jwt_identity()
         user = User.query.get_or_404(current_user_id)
-        data = request.get_json()
+        data = request_json()
         
+        # Check username and email against other users in one lookup
+        conflicts = []
         if 'username' in data:
-            # Check if username is already taken by another user
-            existing = User.query.filter_by(username=data['username']).first()
-            if existing and existing.user_id != current_user_id:
-                return jsonify({'error': 'Username already taken'}), 400
-            user.username = data['username']
+            conflicts.append(User.username == data['username'])
+        if 'email' in data:
+            conflicts.append(User.email == data['email'])
+        if conflicts:
+            taken = db.session.execute(
+                select(User.username, User.email).where(or_(*conflicts), User.user_id != current_user_id)
+            ).all()
+            if 'username' in data and any(row.username == data['username'] for row in taken):
+                return ojson({'error': 'Username already taken'}), 400
+            if 'email' in data and any(row.email == data['email'] for row in taken):
+                return ojson({'error': 'Email already taken'}), 400
         
+        if 'username' in data:
+            user.username = data['username']
         if 'email' in data:
-            # Check if email is already taken by another user
-            existing = User.query.filter_by(email=data['email']).first()
-            if existing and existing.user_id != current_user_id:
-                return jsonify({'error': 'Email already taken'}), 400
             user.email = data['email']
         
         db.session.commit()
+        invalidate_profile_bundle(current_user_id)
         
-        return jsonify({
+        return ojson({
             'message': 'Profile updated successfully',
             'user': user.to_dict()
         }), 200
         
     except Exception as e:
         db.session.rollback()
-        return jsonify({'error': str(e)}), 500
+        return ojson({'error': str(e)}), 500
 
 @user_bp.route('/history/prompts', methods=['GET'])
 @jwt_required()
 def get_prompt_history():
     try:
         current_user_id = get_jwt_identity()
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
-        
-        prompts = PromptHistory.query.filter_by(user_id=current_user_id)\
-                                   .order_by(PromptHistory.timestamp.desc())\
-                                   .paginate(page=page, per_page=per_page, error_out=False)
-        
-        return jsonify({
-            'prompts': [prompt.to_dict() for prompt in prompts.items],
-            'total': prompts.total,
-            'pages': prompts.pages,
-            'current_page': page
+        per_page = max(request.args.get('per_page', 20, type=int), 1)
+        after = request.args.get('after')
+        
+        query = PromptHistory.query.filter_by(user_id=current_user_id)
+        if after:
+            timestamp, prompt_id = decode_cursor(after)
+            query = query.filter(
+                tuple_(PromptHistory.timestamp, PromptHistory.prompt_id) < (datetime.fromisoformat(timestamp), prompt_id)
+            )
+        
+        rows = query.order_by(PromptHistory.timestamp.desc(), PromptHistory.prompt_id.desc())\
+                    .limit(per_page + 1).all()
+        prompts, next_cursor = keyset_page(rows, per_page, lambda p: (p.timestamp, p.prompt_id))
+        
+        return ojson({
+            'prompts': [prompt.to_dict() for prompt in prompts],
+            'next_cursor': next_cursor,
+            'per_page': per_page
         }), 200
         
+    except ValueError as e:
+        return ojson({'error': str(e)}), 400
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return ojson({'error': str(e)}), 500
 
 @user_bp.route('/history/prompts/recent', methods=['GET'])
 @jwt_required()
@@ -88,27 +125,26 @@ def get_recent_prompts():
                                           .order_by(PromptHistory.timestamp.desc())\
                                           .limit(10).all()
         
-        return jsonify([prompt.to_dict() for prompt in recent_prompts]), 200
+        return ojson([prompt.to_dict() for prompt in recent_prompts]), 200
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return ojson({'error': str(e)}), 500
 
 @user_bp.route('/subscriptions', methods=['GET'])
 @jwt_required()
 def get_subscription():
     try:
-        current_user_id = get_jwt_identity()
-        subscription = Subscription.query.filter_by(user_id=current_user_id, status='active').first()
+        bundle = load_profile_bundle(get_jwt_identity())
         
-        if not subscription:
-            return jsonify({'error': 'No active subscription found'}), 404
+        if not bundle or not bundle['subscription']:
+            return ojson({'error': 'No active subscription found'}), 404
         
-        return jsonify(subscription.to_dict()), 200
+        return conditional_ojson(bundle['subscription'])
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return ojson({'error': str(e)}), 500
 
 # Health check endpoint
 @user_bp.route('/health', methods=['GET'])
 def health_check():
-    return jsonify({'status': 'healthy'}), 200
+    return ojson({'status': 'healthy'}), 200
@@ -5,14 +5,38 @@ Handles automated HR workflows including 360 reviews, onboarding, offboarding, a
 
 import asyncio
 import json
+import os
+import queue
 import uuid
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Set, Tuple
 from dataclasses import dataclass, asdict
 from enum import Enum
+from types import MappingProxyType
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+import orjson
+from redis.exceptions import WatchError
+from cache import redis_client
+
+# Max notifications in flight at once when fanning out reminders
+NOTIFICATION_CONCURRENCY = 8
+
+# Redis set of workflow ids still open, scanned by send_reminders
+ACTIVE_WORKFLOWS_KEY = 'wf:active'
+
+# Step dates are kept as epoch milliseconds; day arithmetic works on these
+DAY_MS = 86_400_000
+
+# Optimistic WATCH/MULTI attempts before a contended workflow update gives up
+WORKFLOW_UPDATE_RETRIES = 10
+
+# Entries kept in the per-process snapshot/step-view caches when Redis is the store
+LOCAL_CACHE_SIZE = 1024
+
+# Keys per MGET so one huge id set doesn't become a single multi-megabyte reply
+MGET_BATCH_SIZE = 500
 
 class WorkflowType(Enum):
     ONBOARDING = "onboarding"
@@ -44,7 +68,13 @@ class StepType(Enum):
     TRAINING = "training"
     EVALUATION = "evaluation"
 
-@dataclass
+def _to_ms(dt: datetime) -> int:
+    return int(dt.timestamp() * 1000)
+
+def _from_ms(ms: Optional[int]) -> Optional[datetime]:
+    return datetime.fromtimestamp(ms / 1000) if ms is not None else None
+
+@dataclass(slots=True)
 class WorkflowStep:
     step_id: str
     title: str
@@ -52,17 +82,26 @@ class WorkflowStep:
     step_type: StepType
     assignee_role: str
     assignee_email: Optional[str]
-    due_date: datetime
+    due_date_ms: int
     dependencies: List[str]  # List of step_ids that must complete first
     form_template: Optional[Dict[str, Any]] = None
     documents_required: List[str] = None
     auto_complete: bool = False
     completed: bool = False
-    completed_date: Optional[datetime] = None
+    completed_date_ms: Optional[int] = None
     completed_by: Optional[str] = None
     notes: Optional[str] = None
+    metadata: Optional[Dict[str, Any]] = None  # Form data submitted on completion
+    
+    @property
+    def due_date(self) -> datetime:
+        return _from_ms(self.due_date_ms)
+    
+    @property
+    def completed_date(self) -> Optional[datetime]:
+        return _from_ms(self.completed_date_ms)
 
-@dataclass
+@dataclass(slots=True)
 class Workflow:
     workflow_id: str
     workflow_type: WorkflowType
@@ -83,209 +122,256 @@ class Workflow:
     metadata: Dict[str, Any]
     country: str = "US"
 
-class WorkflowAutomationAgent:
-    def __init__(self):
-        self.active_workflows: Dict[str, Workflow] = {}
-        self.workflow_templates = self._initialize_templates()
+def _initialize_templates() -> Dict[WorkflowType, Dict[str, Any]]:
+    """Initialize predefined workflow templates"""
+    return {
+        WorkflowType.ONBOARDING: {
+            "title": "Employee Onboarding Process",
+            "description": "Complete onboarding workflow for new employees",
+            "duration_days": 30,
+            "steps": [
+                {
+                    "title": "Send Welcome Email",
+                    "description": "Send welcome email with first day information",
+                    "step_type": StepType.NOTIFICATION,
+                    "assignee_role": "HR",
+                    "days_offset": -3,
+                    "auto_complete": True
+                },
+                {
+                    "title": "Prepare Workspace",
+                    "description": "Set up desk, equipment, and access credentials",
+                    "step_type": StepType.TASK,
+                    "assignee_role": "IT",
+                    "days_offset": -1,
+                    "documents_required": ["Equipment Checklist", "Access Request Form"]
+                },
+                {
+                    "title": "First Day Orientation",
+                    "description": "Conduct company orientation and introductions",
+                    "step_type": StepType.MEETING,
+                    "assignee_role": "HR",
+                    "days_offset": 0
+                },
+                {
+                    "title": "Complete New Hire Paperwork",
+                    "description": "Fill out tax forms, benefits enrollment, emergency contacts",
+                    "step_type": StepType.FORM,
+                    "assignee_role": "Employee",
+                    "days_offset": 1,
+                    "form_template": {
+                        "fields": ["tax_forms", "benefits_selection", "emergency_contacts", "bank_details"]
+                    }
+                },
+                {
+                    "title": "Department Introduction",
+                    "description": "Meet team members and understand role expectations",
+                    "step_type": StepType.MEETING,
+                    "assignee_role": "Manager",
+                    "days_offset": 2
+                },
+                {
+                    "title": "Mandatory Training Completion",
+                    "description": "Complete required compliance and safety training",
+                    "step_type": StepType.TRAINING,
+                    "assignee_role": "Employee",
+                    "days_offset": 7
+                },
+                {
+                    "title": "30-Day Check-in",
+                    "description": "Review progress and address any concerns",
+                    "step_type": StepType.EVALUATION,
+                    "assignee_role": "Manager",
+                    "days_offset": 30
+                }
+            ]
+        },
         
-    def _initialize_templates(self) -> Dict[WorkflowType, Dict[str, Any]]:
-        """Initialize predefined workflow templates"""
-        return {
-            WorkflowType.ONBOARDING: {
-                "title": "Employee Onboarding Process",
-                "description": "Complete onboarding workflow for new employees",
-                "duration_days": 30,
-                "steps": [
-                    {
-                        "title": "Send Welcome Email",
-                        "description": "Send welcome email with first day information",
-                        "step_type": StepType.NOTIFICATION,
-                        "assignee_role": "HR",
-                        "days_offset": -3,
-                        "auto_complete": True
-                    },
-                    {
-                        "title": "Prepare Workspace",
-                        "description": "Set up desk, equipment, and access credentials",
-                        "step_type": StepType.TASK,
-                        "assignee_role": "IT",
-                        "days_offset": -1,
-                        "documents_required": ["Equipment Checklist", "Access Request Form"]
-                    },
-                    {
-                        "title": "First Day Orientation",
-                        "description": "Conduct company orientation and introductions",
-                        "step_type": StepType.MEETING,
-                        "assignee_role": "HR",
-                        "days_offset": 0
-                    },
-                    {
-                        "title": "Complete New Hire Paperwork",
-                        "description": "Fill out tax forms, benefits enrollment, emergency contacts",
-                        "step_type": StepType.FORM,
-                        "assignee_role": "Employee",
-                        "days_offset": 1,
-                        "form_template": {
-                            "fields": ["tax_forms", "benefits_selection", "emergency_contacts", "bank_details"]
-                        }
-                    },
-                    {
-                        "title": "Department Introduction",
-                        "description": "Meet team members and understand role expectations",
-                        "step_type": StepType.MEETING,
-                        "assignee_role": "Manager",
-                        "days_offset": 2
-                    },
-                    {
-                        "title": "Mandatory Training Completion",
-                        "description": "Complete required compliance and safety training",
-                        "step_type": StepType.TRAINING,
-                        "assignee_role": "Employee",
-                        "days_offset": 7
-                    },
-                    {
-                        "title": "30-Day Check-in",
-                        "description": "Review progress and address any concerns",
-                        "step_type": StepType.EVALUATION,
-                        "assignee_role": "Manager",
-                        "days_offset": 30
+        WorkflowType.REVIEW_360: {
+            "title": "360-Degree Performance Review",
+            "description": "Comprehensive performance review with multi-source feedback",
+            "duration_days": 21,
+            "steps": [
+                {
+                    "title": "Initiate Review Process",
+                    "description": "Set up review cycle and notify participants",
+                    "step_type": StepType.NOTIFICATION,
+                    "assignee_role": "HR",
+                    "days_offset": 0,
+                    "auto_complete": True
+                },
+                {
+                    "title": "Self-Assessment",
+                    "description": "Employee completes self-evaluation form",
+                    "step_type": StepType.FORM,
+                    "assignee_role": "Employee",
+                    "days_offset": 3,
+                    "form_template": {
+                        "fields": ["achievements", "challenges", "goals", "development_needs", "self_rating"]
                     }
-                ]
-            },
-            
-            WorkflowType.REVIEW_360: {
-                "title": "360-Degree Performance Review",
-                "description": "Comprehensive performance review with multi-source feedback",
-                "duration_days": 21,
-                "steps": [
-                    {
-                        "title": "Initiate Review Process",
-                        "description": "Set up review cycle and notify participants",
-                        "step_type": StepType.NOTIFICATION,
-                        "assignee_role": "HR",
-                        "days_offset": 0,
-                        "auto_complete": True
-                    },
-                    {
-                        "title": "Self-Assessment",
-                        "description": "Employee completes self-evaluation form",
-                        "step_type": StepType.FORM,
-                        "assignee_role": "Employee",
-                        "days_offset": 3,
-                        "form_template": {
-                            "fields": ["achievements", "challenges", "goals", "development_needs", "self_rating"]
-                        }
-                    },
-                    {
-                        "title": "Manager Assessment",
-                        "description": "Direct manager completes performance evaluation",
-                        "step_type": StepType.FORM,
-                        "assignee_role": "Manager",
-                        "days_offset": 7,
-                        "form_template": {
-                            "fields": ["performance_rating", "achievements", "areas_for_improvement", "goals", "development_plan"]
-                        }
-                    },
-                    {
-                        "title": "Peer Feedback Collection",
-                        "description": "Collect feedback from 3-5 peer colleagues",
-                        "step_type": StepType.FORM,
-                        "assignee_role": "Peers",
-                        "days_offset": 10,
-                        "form_template": {
-                            "fields": ["collaboration", "communication", "reliability", "innovation", "peer_rating"]
-                        }
-                    },
-                    {
-                        "title": "Direct Report Feedback",
-                        "description": "Collect upward feedback from direct reports (if applicable)",
-                        "step_type": StepType.FORM,
-                        "assignee_role": "Direct Reports",
-                        "days_offset": 10,
-                        "form_template": {
-                            "fields": ["leadership", "communication", "support", "development", "leadership_rating"]
-                        }
-                    },
-                    {
-                        "title": "Review Compilation",
-                        "description": "Compile all feedback into comprehensive review",
-                        "step_type": StepType.TASK,
-                        "assignee_role": "HR",
-                        "days_offset": 14
-                    },
-                    {
-                        "title": "Review Meeting",
-                        "description": "Conduct performance review discussion",
-                        "step_type": StepType.MEETING,
-                        "assignee_role": "Manager",
-                        "days_offset": 18
-                    },
-                    {
-                        "title": "Development Plan Creation",
-                        "description": "Create personalized development plan based on feedback",
-                        "step_type": StepType.DOCUMENT,
-                        "assignee_role": "Manager",
-                        "days_offset": 21
+                },
+                {
+                    "title": "Manager Assessment",
+                    "description": "Direct manager completes performance evaluation",
+                    "step_type": StepType.FORM,
+                    "assignee_role": "Manager",
+                    "days_offset": 7,
+                    "form_template": {
+                        "fields": ["performance_rating", "achievements", "areas_for_improvement", "goals", "development_plan"]
                     }
-                ]
-            },
-            
-            WorkflowType.OFFBOARDING: {
-                "title": "Employee Offboarding Process",
-                "description": "Complete offboarding workflow for departing employees",
-                "duration_days": 14,
-                "steps": [
-                    {
-                        "title": "Resignation Acknowledgment",
-                        "description": "Acknowledge resignation and confirm last working day",
-                        "step_type": StepType.NOTIFICATION,
-                        "assignee_role": "HR",
-                        "days_offset": 0,
-                        "auto_complete": True
-                    },
-                    {
-                        "title": "Knowledge Transfer Planning",
-                        "description": "Plan knowledge transfer to team members",
-                        "step_type": StepType.TASK,
-                        "assignee_role": "Manager",
-                        "days_offset": 1
-                    },
-                    {
-                        "title": "Access Revocation",
-                        "description": "Revoke system access and collect company property",
-                        "step_type": StepType.TASK,
-                        "assignee_role": "IT",
-                        "days_offset": -1,
-                        "documents_required": ["Asset Return Checklist"]
-                    },
-                    {
-                        "title": "Exit Interview",
-                        "description": "Conduct exit interview to gather feedback",
-                        "step_type": StepType.MEETING,
-                        "assignee_role": "HR",
-                        "days_offset": -2,
-                        "form_template": {
-                            "fields": ["reason_for_leaving", "job_satisfaction", "management_feedback", "company_culture", "recommendations"]
-                        }
-                    },
-                    {
-                        "title": "Final Payroll Processing",
-                        "description": "Process final salary, benefits, and accrued leave",
-                        "step_type": StepType.TASK,
-                        "assignee_role": "Payroll",
-                        "days_offset": 0
-                    },
-                    {
-                        "title": "Documentation Update",
-                        "description": "Update employee records and close accounts",
-                        "step_type": StepType.TASK,
-                        "assignee_role": "HR",
-                        "days_offset": 1
+                },
+                {
+                    "title": "Peer Feedback Collection",
+                    "description": "Collect feedback from 3-5 peer colleagues",
+                    "step_type": StepType.FORM,
+                    "assignee_role": "Peers",
+                    "days_offset": 10,
+                    "form_template": {
+                        "fields": ["collaboration", "communication", "reliability", "innovation", "peer_rating"]
+                    }
+                },
+                {
+                    "title": "Direct Report Feedback",
+                    "description": "Collect upward feedback from direct reports (if applicable)",
+                    "step_type": StepType.FORM,
+                    "assignee_role": "Direct Reports",
+                    "days_offset": 10,
+                    "form_template": {
+                        "fields": ["leadership", "communication", "support", "development", "leadership_rating"]
+                    }
+                },
+                {
+                    "title": "Review Compilation",
+                    "description": "Compile all feedback into comprehensive review",
+                    "step_type": StepType.TASK,
+                    "assignee_role": "HR",
+                    "days_offset": 14
+                },
+                {
+                    "title": "Review Meeting",
+                    "description": "Conduct performance review discussion",
+                    "step_type": StepType.MEETING,
+                    "assignee_role": "Manager",
+                    "days_offset": 18
+                },
+                {
+                    "title": "Development Plan Creation",
+                    "description": "Create personalized development plan based on feedback",
+                    "step_type": StepType.DOCUMENT,
+                    "assignee_role": "Manager",
+                    "days_offset": 21
+                }
+            ]
+        },
+        
+        WorkflowType.OFFBOARDING: {
+            "title": "Employee Offboarding Process",
+            "description": "Complete offboarding workflow for departing employees",
+            "duration_days": 14,
+            "steps": [
+                {
+                    "title": "Resignation Acknowledgment",
+                    "description": "Acknowledge resignation and confirm last working day",
+                    "step_type": StepType.NOTIFICATION,
+                    "assignee_role": "HR",
+                    "days_offset": 0,
+                    "auto_complete": True
+                },
+                {
+                    "title": "Knowledge Transfer Planning",
+                    "description": "Plan knowledge transfer to team members",
+                    "step_type": StepType.TASK,
+                    "assignee_role": "Manager",
+                    "days_offset": 1
+                },
+                {
+                    "title": "Access Revocation",
+                    "description": "Revoke system access and collect company property",
+                    "step_type": StepType.TASK,
+                    "assignee_role": "IT",
+                    "days_offset": -1,
+                    "documents_required": ["Asset Return Checklist"]
+                },
+                {
+                    "title": "Exit Interview",
+                    "description": "Conduct exit interview to gather feedback",
+                    "step_type": StepType.MEETING,
+                    "assignee_role": "HR",
+                    "days_offset": -2,
+                    "form_template": {
+                        "fields": ["reason_for_leaving", "job_satisfaction", "management_feedback", "company_culture", "recommendations"]
                     }
-                ]
-            }
+                },
+                {
+                    "title": "Final Payroll Processing",
+                    "description": "Process final salary, benefits, and accrued leave",
+                    "step_type": StepType.TASK,
+                    "assignee_role": "Payroll",
+                    "days_offset": 0
+                },
+                {
+                    "title": "Documentation Update",
+                    "description": "Update employee records and close accounts",
+                    "step_type": StepType.TASK,
+                    "assignee_role": "HR",
+                    "days_offset": 1
+                }
+            ]
         }
-    
+    }
+
+# Built once and shared read-only by every agent instance
+_TEMPLATES = MappingProxyType(_initialize_templates())
+
+def _workflow_key(workflow_id: str) -> str:
+    return f'wf:{workflow_id}'
+
+def _employee_key(employee_id: str) -> str:
+    return f'wf:by_employee:{employee_id}'
+
+def _assignee_key(email: str) -> str:
+    return f'wf:by_assignee:{email}'
+
+def _parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+def _dump_workflow(workflow: Workflow) -> bytes:
+    """Serialize a workflow for Redis (enums as values, datetimes as ISO strings)"""
+    return orjson.dumps(asdict(workflow), default=str)
+
+def _load_workflow(data: bytes) -> Workflow:
+    """Rebuild a Workflow from _dump_workflow output"""
+    raw = orjson.loads(data)
+    raw['steps'] = [WorkflowStep(**{**step, 'step_type': StepType(step['step_type'])}) for step in raw['steps']]
+    for field in ('created_date', 'start_date', 'target_completion_date', 'actual_completion_date'):
+        raw[field] = _parse_datetime(raw[field])
+    raw['workflow_type'] = WorkflowType(raw['workflow_type'])
+    raw['status'] = WorkflowStatus(raw['status'])
+    return Workflow(**raw)
+
+class WorkflowAutomationAgent:
+    def __init__(self):
+        # Without REDIS_URL this is the store; with it the wf:* keys are, and nothing is kept here
+        self.active_workflows: Dict[str, Workflow] = {}
+        self.workflow_templates = _TEMPLATES
+        # Per-workflow lookups so dependency checks are set membership, not step rescans
+        # (in-process store only; under Redis they are built per read, see _lookups)
+        self._step_index: Dict[str, Dict[str, WorkflowStep]] = {}
+        self._completed_ids: Dict[str, Set[str]] = {}
+        # employee_id -> workflow ids, assignee email -> (workflow_id, step_id) of its open steps;
+        # mirrored by the wf:by_employee:* / wf:by_assignee:* sets when Redis is configured
+        self._by_employee: Dict[str, Set[str]] = {}
+        self._by_assignee_email: Dict[str, Set[Tuple[str, str]]] = {}
+        # workflow_id -> (stored blob or None, asdict() snapshot) reused by get_workflow while unchanged
+        self._serialized_cache: Dict[str, Tuple[Optional[bytes], Dict[str, Any]]] = {}
+        # step_id -> the step's static fields as they appear in task/next-step listings
+        self._step_views: Dict[str, Dict[str, Any]] = {}
+        # Pool of SMTP connections, one per concurrent notification slot; None
+        # marks a slot whose connection hasn't been opened yet (or was dropped)
+        self._smtp_pool: "queue.Queue[Optional[smtplib.SMTP]]" = queue.Queue(maxsize=NOTIFICATION_CONCURRENCY)
+        for _ in range(NOTIFICATION_CONCURRENCY):
+            self._smtp_pool.put(None)
+        
     async def create_workflow(self, workflow_type: WorkflowType, employee_data: Dict[str, Any], 
                             custom_params: Optional[Dict[str, Any]] = None) -> str:
         """Create a new workflow instance"""
@@ -300,6 +386,7 @@ class WorkflowAutomationAgent:
         target_completion = start_date + timedelta(days=template['duration_days'])
         
         # Create workflow steps
+        role_emails = self._get_role_emails(employee_data)
         steps = []
         for step_template in template['steps']:
             step_id = str(uuid.uuid4())
@@ -311,8 +398,8 @@ class WorkflowAutomationAgent:
                 description=step_template['description'],
                 step_type=StepType(step_template['step_type']),
                 assignee_role=step_template['assignee_role'],
-                assignee_email=self._get_assignee_email(step_template['assignee_role'], employee_data),
-                due_date=due_date,
+                assignee_email=role_emails.get(step_template['assignee_role']),
+                due_date_ms=_to_ms(due_date),
                 dependencies=step_template.get('dependencies', []),
                 form_template=step_template.get('form_template'),
                 documents_required=step_template.get('documents_required', []),
@@ -342,16 +429,140 @@ class WorkflowAutomationAgent:
             country=employee_data.get('country', 'US')
         )
         
-        self.active_workflows[workflow_id] = workflow
+        self._store_new(workflow)
         
         # Auto-complete any auto-complete steps
         await self._process_auto_complete_steps(workflow_id)
         
         return workflow_id
     
-    def _get_assignee_email(self, role: str, employee_data: Dict[str, Any]) -> Optional[str]:
-        """Get assignee email based on role"""
-        role_mapping = {
+    def _store_new(self, workflow: Workflow):
+        """Store a new workflow and register it under its employee and each open step under its assignee"""
+        workflow_id = workflow.workflow_id
+        open_steps = [s for s in workflow.steps if s.assignee_email and not s.completed]
+        if redis_client is None:
+            self.active_workflows[workflow_id] = workflow
+            self._step_index[workflow_id] = {s.step_id: s for s in workflow.steps}
+            self._completed_ids[workflow_id] = {s.step_id for s in workflow.steps if s.completed}
+            self._by_employee.setdefault(workflow.employee_id, set()).add(workflow_id)
+            for step in open_steps:
+                self._by_assignee_email.setdefault(step.assignee_email, set()).add((workflow_id, step.step_id))
+            return
+        pipe = redis_client.pipeline()
+        pipe.set(_workflow_key(workflow_id), _dump_workflow(workflow))
+        pipe.sadd(ACTIVE_WORKFLOWS_KEY, workflow_id)
+        pipe.sadd(_employee_key(workflow.employee_id), workflow_id)
+        for step in open_steps:
+            pipe.sadd(_assignee_key(step.assignee_email), f'{workflow_id}:{step.step_id}')
+        pipe.execute()
+    
+    def _get(self, workflow_id: str) -> Optional[Workflow]:
+        """Workflow by id, read from Redis when configured"""
+        if redis_client is None:
+            return self.active_workflows.get(workflow_id)
+        data = redis_client.get(_workflow_key(workflow_id))
+        return _load_workflow(data) if data is not None else None
+    
+    def _get_many(self, workflow_ids) -> List[Workflow]:
+        """Workflows for a set of ids in one round trip; unknown ids are skipped"""
+        workflow_ids = list(workflow_ids)
+        if redis_client is None:
+            return [self.active_workflows[wid] for wid in workflow_ids if wid in self.active_workflows]
+        workflows = []
+        for i in range(0, len(workflow_ids), MGET_BATCH_SIZE):
+            keys = [_workflow_key(wid) for wid in workflow_ids[i:i + MGET_BATCH_SIZE]]
+            workflows.extend(_load_workflow(data) for data in redis_client.mget(keys) if data)
+        return workflows
+    
+    def _lookups(self, workflow: Workflow) -> Tuple[Dict[str, WorkflowStep], Set[str]]:
+        """Step index and completed-id set of a workflow: the maintained ones in-process, fresh ones for a Redis copy"""
+        if redis_client is None:
+            return self._step_index[workflow.workflow_id], self._completed_ids[workflow.workflow_id]
+        return {s.step_id: s for s in workflow.steps}, {s.step_id for s in workflow.steps if s.completed}
+    
+    def _remember(self, cache: Dict[Any, Any], key: Any, value: Any) -> Any:
+        """Store into a per-process cache, evicting the oldest entries under Redis so it stays bounded"""
+        cache[key] = value
+        if redis_client is not None:
+            while len(cache) > LOCAL_CACHE_SIZE:
+                del cache[next(iter(cache))]
+        return value
+    
+    def _update_workflow(self, workflow_id: str, mutate) -> Any:
+        """
+        Apply mutate(workflow, step_index, completed_ids) and persist the result.
+        
+        Steps that mutate completes leave the assignee index, and the workflow is
+        closed once every step is done. Under Redis the read, write and index
+        updates form one WATCH/MULTI transaction, retried when another worker
+        changed the workflow in between, so concurrent completions never overwrite
+        each other. Returns None for an unknown workflow, else mutate's result.
+        """
+        if redis_client is None:
+            workflow = self.active_workflows.get(workflow_id)
+            if workflow is None:
+                return None
+            step_index, completed_ids = self._lookups(workflow)
+            before = set(completed_ids)
+            result = mutate(workflow, step_index, completed_ids)
+            for step_id in completed_ids - before:
+                step = step_index[step_id]
+                if step.assignee_email:
+                    self._by_assignee_email.get(step.assignee_email, set()).discard((workflow_id, step_id))
+            self._close_if_done(workflow, completed_ids)
+            self._serialized_cache.pop(workflow_id, None)
+            return result
+        
+        key = _workflow_key(workflow_id)
+        with redis_client.pipeline() as pipe:
+            for attempt in range(WORKFLOW_UPDATE_RETRIES):
+                try:
+                    pipe.watch(key)
+                    data = pipe.get(key)
+                    if data is None:
+                        pipe.unwatch()
+                        return None
+                    workflow = _load_workflow(data)
+                    step_index, completed_ids = self._lookups(workflow)
+                    before = set(completed_ids)
+                    result = mutate(workflow, step_index, completed_ids)
+                    closed = self._close_if_done(workflow, completed_ids)
+                    
+                    pipe.multi()
+                    pipe.set(key, _dump_workflow(workflow))
+                    for step_id in completed_ids - before:
+                        step = step_index[step_id]
+                        if step.assignee_email:
+                            pipe.srem(_assignee_key(step.assignee_email), f'{workflow_id}:{step_id}')
+                    if closed:
+                        pipe.srem(ACTIVE_WORKFLOWS_KEY, workflow_id)
+                    pipe.execute()
+                    return result
+                except WatchError:
+                    if attempt == WORKFLOW_UPDATE_RETRIES - 1:
+                        raise
+    
+    def _close_if_done(self, workflow: Workflow, completed_ids: Set[str]) -> bool:
+        """Mark the workflow completed once all of its steps are; True if this call closed it"""
+        if len(completed_ids) < len(workflow.steps) or workflow.status == WorkflowStatus.COMPLETED:
+            return False
+        workflow.status = WorkflowStatus.COMPLETED
+        workflow.actual_completion_date = datetime.now()
+        return True
+    
+    def _employee_workflow_ids(self, employee_id: str) -> Set[str]:
+        if redis_client is None:
+            return self._by_employee.get(employee_id, set())
+        return {wid.decode() for wid in redis_client.smembers(_employee_key(employee_id))}
+    
+    def _assignee_open_steps(self, assignee_email: str) -> Set[Tuple[str, str]]:
+        if redis_client is None:
+            return self._by_assignee_email.get(assignee_email, set())
+        return {tuple(entry.decode().split(':', 1)) for entry in redis_client.smembers(_assignee_key(assignee_email))}
+    
+    def _get_role_emails(self, employee_data: Dict[str, Any]) -> Dict[str, Optional[str]]:
+        """Map each assignee role to its email for one employee's workflow"""
+        return {
             'Employee': employee_data.get('email'),
             'Manager': employee_data.get('manager_email'),
             'HR': employee_data.get('hr_contact', 'hr@company.com'),
@@ -360,82 +571,139 @@ class WorkflowAutomationAgent:
             'Peers': None,  # Will be handled separately
             'Direct Reports': None  # Will be handled separately
         }
-        return role_mapping.get(role)
+    
+    def _get_assignee_email(self, role: str, employee_data: Dict[str, Any]) -> Optional[str]:
+        """Get assignee email based on role"""
+        return self._get_role_emails(employee_data).get(role)
     
     async def _process_auto_complete_steps(self, workflow_id: str):
         """Process steps that can be auto-completed"""
-        workflow = self.active_workflows[workflow_id]
+        workflow = self._get(workflow_id)
+        if workflow is None:
+            return
+        steps = [
+            step for step in workflow.steps
+            if step.auto_complete and not step.completed and step.step_type == StepType.NOTIFICATION
+        ]
         
-        for step in workflow.steps:
-            if step.auto_complete and not step.completed:
-                if step.step_type == StepType.NOTIFICATION:
-                    # Send notification
-                    await self._send_notification(workflow, step)
-                    step.completed = True
-                    step.completed_date = datetime.now()
-                    step.completed_by = "System"
+        # Send notifications concurrently; only steps whose notification went out are completed
+        results = await self._gather_limited(self._send_notification(workflow, step) for step in steps)
+        sent = {step.step_id for step, result in zip(steps, results) if not isinstance(result, Exception)}
+        if not sent:
+            return
+        
+        def mark_sent(workflow, step_index, completed_ids):
+            for step_id in sent:
+                step = step_index[step_id]
+                if not step.completed:
+                    self._mark_completed(step, "System", completed_ids)
+        
+        self._update_workflow(workflow_id, mark_sent)
+    
+    async def _gather_limited(self, coros) -> List[Any]:
+        """Run coroutines concurrently, at most NOTIFICATION_CONCURRENCY at a time; failures are returned, not raised"""
+        sem = asyncio.Semaphore(NOTIFICATION_CONCURRENCY)
+        
+        async def _run(coro):
+            async with sem:
+                return await coro
+        
+        return await asyncio.gather(*(_run(c) for c in coros), return_exceptions=True)
+    
+    def _mark_completed(self, step: WorkflowStep, completed_by: str, completed_ids: Set[str]):
+        """Mark a step completed and record it in its workflow's completed set"""
+        step.completed = True
+        step.completed_date_ms = _to_ms(datetime.now())
+        step.completed_by = completed_by
+        completed_ids.add(step.step_id)
+        self._step_views.pop(step.step_id, None)
     
     async def _send_notification(self, workflow: Workflow, step: WorkflowStep):
         """Send email notification for workflow step"""
-        # This would integrate with your email service
         print(f"Sending notification: {step.title} for workflow {workflow.title}")
-        # Implementation would use SMTP or email service API
+        await self._send_email(step.assignee_email, f"{workflow.title}: {step.title}", step.description)
+    
+    async def _send_email(self, to_email: Optional[str], subject: str, body: str):
+        """Send an email off the event loop; no-op without a recipient or SMTP credentials"""
+        if not to_email or not os.getenv('SMTP_USERNAME') or not os.getenv('SMTP_PASSWORD'):
+            return
+        await asyncio.to_thread(self._deliver_email, to_email, subject, body)
+    
+    def _deliver_email(self, to_email: str, subject: str, body: str):
+        """Blocking send over a pooled SMTP connection, reconnecting once if it was dropped"""
+        msg = MIMEMultipart('alternative')
+        msg['Subject'] = subject
+        msg['From'] = os.getenv('FROM_EMAIL', os.getenv('SMTP_USERNAME'))
+        msg['To'] = to_email
+        msg.attach(MIMEText(body, 'plain'))
+        
+        server = self._smtp_pool.get()
+        try:
+            for attempt in range(2):
+                if server is None:
+                    conn = smtplib.SMTP(os.getenv('SMTP_SERVER', 'smtp.gmail.com'), int(os.getenv('SMTP_PORT', '587')))
+                    conn.starttls()
+                    conn.login(os.getenv('SMTP_USERNAME'), os.getenv('SMTP_PASSWORD'))
+                    server = conn
+                try:
+                    server.send_message(msg)
+                    return
+                except (smtplib.SMTPServerDisconnected, ConnectionError):
+                    server = None
+                    if attempt:
+                        raise
+        finally:
+            self._smtp_pool.put(server)
     
     async def complete_step(self, workflow_id: str, step_id: str, completed_by: str, 
                           form_data: Optional[Dict[str, Any]] = None, notes: Optional[str] = None) -> bool:
         """Mark a workflow step as completed"""
-        if workflow_id not in self.active_workflows:
-            return False
-        
-        workflow = self.active_workflows[workflow_id]
-        
-        # Find the step
-        step = None
-        for s in workflow.steps:
-            if s.step_id == step_id:
-                step = s
-                break
-        
-        if not step or step.completed:
-            return False
-        
-        # Check dependencies
-        for dep_id in step.dependencies:
-            dep_step = next((s for s in workflow.steps if s.step_id == dep_id), None)
-            if not dep_step or not dep_step.completed:
+        def complete(workflow, step_index, completed_ids):
+            # Find the step
+            step = step_index.get(step_id)
+            
+            if not step or step.completed:
+                return False
+            
+            # Check dependencies
+            if not completed_ids.issuperset(step.dependencies):
                 return False  # Dependencies not met
+            
+            # Complete the step
+            self._mark_completed(step, completed_by, completed_ids)
+            step.notes = notes
+            
+            if form_data:
+                step.metadata = form_data
+            return True
         
-        # Complete the step
-        step.completed = True
-        step.completed_date = datetime.now()
-        step.completed_by = completed_by
-        step.notes = notes
-        
-        if form_data:
-            step.metadata = form_data
-        
-        # Check if workflow is complete
-        if all(s.completed for s in workflow.steps):
-            workflow.status = WorkflowStatus.COMPLETED
-            workflow.actual_completion_date = datetime.now()
-        
-        return True
+        return bool(self._update_workflow(workflow_id, complete))
     
     def get_workflow(self, workflow_id: str) -> Optional[Dict[str, Any]]:
         """Get workflow details"""
-        if workflow_id not in self.active_workflows:
+        # Under Redis the stored blob doubles as the snapshot's version
+        if redis_client is None:
+            workflow, version = self.active_workflows.get(workflow_id), None
+        else:
+            version = redis_client.get(_workflow_key(workflow_id))
+            workflow = _load_workflow(version) if version is not None else None
+        if workflow is None:
             return None
         
-        workflow = self.active_workflows[workflow_id]
+        now = datetime.now()
+        cached = self._serialized_cache.get(workflow_id)
+        if cached is None or cached[0] != version:
+            cached = self._remember(self._serialized_cache, workflow_id, (version, asdict(workflow)))
         return {
-            'workflow': asdict(workflow),
-            'progress': self._calculate_progress(workflow),
-            'overdue_steps': self._get_overdue_steps(workflow),
+            'workflow': dict(cached[1]),
+            'progress': self._calculate_progress(workflow, now),
+            'overdue_steps': self._get_overdue_steps(workflow, now),
             'next_steps': self._get_next_steps(workflow)
         }
     
-    def _calculate_progress(self, workflow: Workflow) -> Dict[str, Any]:
+    def _calculate_progress(self, workflow: Workflow, now: Optional[datetime] = None) -> Dict[str, Any]:
         """Calculate workflow progress"""
+        now = now or datetime.now()
         total_steps = len(workflow.steps)
         completed_steps = sum(1 for s in workflow.steps if s.completed)
         
@@ -443,118 +711,139 @@ class WorkflowAutomationAgent:
             'total_steps': total_steps,
             'completed_steps': completed_steps,
             'progress_percentage': (completed_steps / total_steps) * 100 if total_steps > 0 else 0,
-            'days_remaining': (workflow.target_completion_date - datetime.now()).days
+            'days_remaining': (workflow.target_completion_date - now).days
         }
     
-    def _get_overdue_steps(self, workflow: Workflow) -> List[Dict[str, Any]]:
+    def _get_overdue_steps(self, workflow: Workflow, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
         """Get overdue steps"""
-        now = datetime.now()
+        now_ms = _to_ms(now or datetime.now())
         overdue = []
         
         for step in workflow.steps:
-            if not step.completed and step.due_date < now:
+            if not step.completed and step.due_date_ms < now_ms:
                 overdue.append({
                     'step_id': step.step_id,
                     'title': step.title,
                     'assignee_role': step.assignee_role,
-                    'days_overdue': (now - step.due_date).days
+                    'days_overdue': (now_ms - step.due_date_ms) // DAY_MS
                 })
         
         return overdue
     
+    def _step_view(self, step: WorkflowStep) -> Dict[str, Any]:
+        """Listing fields of a step, built once (enum value and ISO date included) and reused"""
+        view = self._step_views.get(step.step_id)
+        if view is None:
+            view = self._remember(self._step_views, step.step_id, {
+                'step_id': step.step_id,
+                'title': step.title,
+                'description': step.description,
+                'assignee_role': step.assignee_role,
+                'due_date': step.due_date.isoformat(),
+                'step_type': step.step_type.value
+            })
+        return view
+    
     def _get_next_steps(self, workflow: Workflow) -> List[Dict[str, Any]]:
         """Get next actionable steps"""
         next_steps = []
+        _, completed_ids = self._lookups(workflow)
         
         for step in workflow.steps:
             if not step.completed:
                 # Check if dependencies are met
-                deps_met = all(
-                    any(s.step_id == dep_id and s.completed for s in workflow.steps)
-                    for dep_id in step.dependencies
-                )
-                
-                if deps_met:
-                    next_steps.append({
-                        'step_id': step.step_id,
-                        'title': step.title,
-                        'description': step.description,
-                        'assignee_role': step.assignee_role,
-                        'due_date': step.due_date.isoformat(),
-                        'step_type': step.step_type.value
-                    })
+                if completed_ids.issuperset(step.dependencies):
+                    next_steps.append(dict(self._step_view(step)))
         
         return next_steps
     
-    def get_employee_workflows(self, employee_id: str) -> List[Dict[str, Any]]:
-        """Get all workflows for an employee"""
+    def get_employee_workflows(self, employee_id: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Get all workflows for an employee (the newest `limit` when given)"""
         employee_workflows = []
+        now = datetime.now()
         
-        for workflow in self.active_workflows.values():
-            if workflow.employee_id == employee_id:
-                employee_workflows.append({
-                    'workflow_id': workflow.workflow_id,
-                    'title': workflow.title,
-                    'type': workflow.workflow_type.value,
-                    'status': workflow.status.value,
-                    'progress': self._calculate_progress(workflow),
-                    'created_date': workflow.created_date.isoformat(),
-                    'target_completion': workflow.target_completion_date.isoformat()
-                })
+        for workflow in self._get_many(self._employee_workflow_ids(employee_id)):
+            employee_workflows.append({
+                'workflow_id': workflow.workflow_id,
+                'title': workflow.title,
+                'type': workflow.workflow_type.value,
+                'status': workflow.status.value,
+                'progress': self._calculate_progress(workflow, now),
+                'created_date': workflow.created_date.isoformat(),
+                'target_completion': workflow.target_completion_date.isoformat()
+            })
+        
+        employee_workflows.sort(key=lambda w: w['created_date'])
+        if limit is not None:
+            employee_workflows = employee_workflows[-limit:] if limit > 0 else []
         
         return employee_workflows
     
-    def get_pending_tasks(self, assignee_email: str) -> List[Dict[str, Any]]:
-        """Get pending tasks for a specific assignee"""
+    def get_pending_tasks(self, assignee_email: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Get pending tasks for a specific assignee (the `limit` soonest due when given)"""
         pending_tasks = []
+        now_ms = _to_ms(datetime.now())
         
-        for workflow in self.active_workflows.values():
-            if workflow.status in [WorkflowStatus.ACTIVE, WorkflowStatus.IN_PROGRESS]:
-                for step in workflow.steps:
-                    if (not step.completed and 
-                        step.assignee_email == assignee_email and
-                        all(any(s.step_id == dep_id and s.completed for s in workflow.steps) 
-                            for dep_id in step.dependencies)):
-                        
-                        pending_tasks.append({
-                            'workflow_id': workflow.workflow_id,
-                            'workflow_title': workflow.title,
-                            'step_id': step.step_id,
-                            'step_title': step.title,
-                            'description': step.description,
-                            'due_date': step.due_date.isoformat(),
-                            'employee_name': workflow.employee_name,
-                            'step_type': step.step_type.value,
-                            'overdue': step.due_date < datetime.now()
-                        })
-        
-        return pending_tasks
+        open_steps = self._assignee_open_steps(assignee_email)
+        workflows = {w.workflow_id: w for w in self._get_many({wid for wid, _ in open_steps})}
+        lookups = {wid: self._lookups(w) for wid, w in workflows.items()}
+        
+        for workflow_id, step_id in open_steps:
+            workflow = workflows.get(workflow_id)
+            if workflow is None or workflow.status not in [WorkflowStatus.ACTIVE, WorkflowStatus.IN_PROGRESS]:
+                continue
+            step_index, completed_ids = lookups[workflow_id]
+            step = step_index.get(step_id)
+            if step and not step.completed and completed_ids.issuperset(step.dependencies):
+                view = self._step_view(step)
+                pending_tasks.append({
+                    'workflow_id': workflow.workflow_id,
+                    'workflow_title': workflow.title,
+                    'step_id': view['step_id'],
+                    'step_title': view['title'],
+                    'description': view['description'],
+                    'due_date': view['due_date'],
+                    'employee_name': workflow.employee_name,
+                    'step_type': view['step_type'],
+                    'overdue': step.due_date_ms < now_ms
+                })
+        
+        pending_tasks.sort(key=lambda t: t['due_date'])
+        return pending_tasks if limit is None else pending_tasks[:limit]
     
     async def send_reminders(self):
         """Send reminders for overdue and upcoming tasks"""
         # This would be called by a scheduled job
-        for workflow in self.active_workflows.values():
+        reminders = []
+        now_ms = _to_ms(datetime.now())
+        if redis_client is None:
+            workflows = list(self.active_workflows.values())
+        else:
+            workflows = self._get_many(wid.decode() for wid in redis_client.smembers(ACTIVE_WORKFLOWS_KEY))
+        
+        for workflow in workflows:
             if workflow.status in [WorkflowStatus.ACTIVE, WorkflowStatus.IN_PROGRESS]:
-                overdue_steps = self._get_overdue_steps(workflow)
-                
-                for overdue in overdue_steps:
-                    # Send overdue reminder
-                    await self._send_reminder_notification(workflow, overdue, "overdue")
-                
-                # Check for upcoming due dates (within 2 days)
-                upcoming_steps = [
-                    s for s in workflow.steps 
-                    if not s.completed and 
-                    0 <= (s.due_date - datetime.now()).days <= 2
-                ]
-                
-                for step in upcoming_steps:
-                    await self._send_reminder_notification(workflow, step, "upcoming")
+                for step in workflow.steps:
+                    if step.completed:
+                        continue
+                    if step.due_date_ms < now_ms:
+                        # Send overdue reminder
+                        reminders.append(self._send_reminder_notification(workflow, step, "overdue"))
+                    elif (step.due_date_ms - now_ms) // DAY_MS <= 2:
+                        # Due within 2 days
+                        reminders.append(self._send_reminder_notification(workflow, step, "upcoming"))
+        
+        # One failed send shouldn't stop the rest of the batch
+        await self._gather_limited(reminders)
     
-    async def _send_reminder_notification(self, workflow: Workflow, step: Any, reminder_type: str):
+    async def _send_reminder_notification(self, workflow: Workflow, step: WorkflowStep, reminder_type: str):
         """Send reminder notification"""
-        # Implementation would send actual email/notification
-        print(f"Sending {reminder_type} reminder for {step['title'] if isinstance(step, dict) else step.title}")
+        print(f"Sending {reminder_type} reminder for {step.title}")
+        await self._send_email(
+            step.assignee_email,
+            f"Reminder ({reminder_type}): {step.title}",
+            f"{step.description}\n\nWorkflow: {workflow.title}\nDue: {step.due_date.date().isoformat()}"
+        )
 
 # Global instance
 workflow_agent = WorkflowAutomationAgent()